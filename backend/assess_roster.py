@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Batch ACL risk assessment for Dear, Tear
+Scores a list of athletes (or the whole roster) in one pass, e.g. for nightly reports
+"""
+
+import argparse
+import sys
+import time
+
+# Import the engine and the assessment from the API modules (uses DATABASE_URL like the API)
+sys.path.append('.')
+from database import SessionLocal
+from runtime import shutdown_cpu_executor
+from main import run_roster_assessment
+
+def main():
+    parser = argparse.ArgumentParser(description="Assess ACL risk for many athletes at once")
+    parser.add_argument("athlete_ids", nargs="*", type=int, help="Athlete IDs to assess (default: every athlete)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        results = run_roster_assessment(db, args.athlete_ids or None)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+
+    high_risk = sum(1 for r in results if r["overall_risk_score"] >= 0.7)
+    print(f"✓ Assessed {len(results)} athletes in {elapsed:.2f}s ({high_risk} high risk)")
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        import asyncio
+        asyncio.run(shutdown_cpu_executor())
@@ -0,0 +1,371 @@
+"""
+Password hashing, access tokens and the caller resolution every route goes through
+"""
+
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.exceptions import WebSocketException
+from fastapi.concurrency import run_in_threadpool
+from starlette.requests import HTTPConnection
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from datetime import datetime, timedelta
+from typing import Optional, Dict
+import os
+import time
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from passlib.context import CryptContext
+from jose import JWTError, jwt
+import bcrypt
+
+from runtime import CPU_POOL_WORKERS, TTLCache, metrics_sources, summarize_durations
+from database import SessionLocal, User, UserRole, get_db
+from schemas import CurrentUser, Token, UserCreate, UserLogin
+
+# Password hashing
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# JWT settings
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+# Authentication: with AUTH_REQUIRED every route outside AUTH_PUBLIC_PATHS needs a bearer token (WebSockets and
+# GETs under AUTH_QUERY_TOKEN_PREFIXES, e.g. <img src>, may pass it as ?token=); the user and role come from the
+# verified claims, cached until the token expires. Sign-up stays public, but only an admin can create other roles.
+# AUTH_ROLE_REVALIDATE_SECONDS > 0 rechecks roles against the database in the background at that interval
+AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", "false").lower() == "true"
+AUTH_PUBLIC_PATHS = {"/", "/auth/login", "/users"}
+AUTH_QUERY_TOKEN_PREFIXES = ("/xray/images/",)
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_ROLE_REVALIDATE_SECONDS = float(os.getenv("AUTH_ROLE_REVALIDATE_SECONDS", "0"))
+
+# Password hashing: bcrypt runs on its own thread pool (it releases the GIL), at most PASSWORD_HASH_WORKERS
+# at once and PASSWORD_HASH_MAX_PENDING waiting (further logins get 503); hashes whose cost differs from
+# BCRYPT_ROUNDS are re-hashed on the next successful login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, CPU_POOL_WORKERS))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+router = APIRouter()
+
+# Password hashing functions
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash"""
+    try:
+        password_bytes = plain_password.encode('utf-8')[:72]  # Truncate to 72 bytes
+        return bcrypt.checkpw(password_bytes, hashed_password.encode('utf-8'))
+    except Exception:
+        return False
+
+def get_password_hash(password: str) -> str:
+    """Hash a password (bcrypt has a 72 byte limit, so we truncate if needed)"""
+    # Bcrypt has a 72 byte limit - ensure password fits
+    if isinstance(password, str):
+        password_bytes = password.encode('utf-8')
+        if len(password_bytes) > 72:
+            # Truncate to 72 bytes exactly
+            password = password_bytes[:72].decode('utf-8', errors='ignore')
+            # Ensure it's exactly 72 bytes or less
+            while len(password.encode('utf-8')) > 72:
+                password = password[:-1]
+    # Use bcrypt directly to ensure proper handling
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+    password_bytes = password.encode('utf-8')[:72]  # Final truncation to 72 bytes
+    hashed = bcrypt.hashpw(password_bytes, salt)
+    return hashed.decode('utf-8')
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when a bcrypt hash ($2b$<cost>$...) was made with a cost other than BCRYPT_ROUNDS"""
+    parts = hashed_password.split("$")
+    return len(parts) >= 4 and parts[2].isdigit() and int(parts[2]) != BCRYPT_ROUNDS
+
+class PasswordHasher:
+    """Bounded bcrypt executor: at most `workers` hashes run at once and at most max_pending wait;
+    beyond that callers get 503 instead of piling up behind a login rush"""
+    
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.unfinished = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.durations_ms = {step: deque(maxlen=1000) for step in ("queued", "hash")}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks = set()
+    
+    @classmethod
+    def from_settings(cls) -> "PasswordHasher":
+        return cls(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+    
+    @property
+    def running(self) -> int:
+        return min(self.unfinished, self.workers)
+    
+    @property
+    def pending(self) -> int:
+        return self.unfinished - self.running
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+        return self._executor
+    
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Too many sign-ins in progress, retry shortly")
+        
+        def timed():
+            return time.perf_counter(), func(*args)
+        
+        self.unfinished += 1
+        queued = time.perf_counter()
+        try:
+            started, result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), timed)
+        finally:
+            self.unfinished -= 1
+        self.completed += 1
+        self.durations_ms["queued"].append((started - queued) * 1000)
+        self.durations_ms["hash"].append((time.perf_counter() - started) * 1000)
+        return result
+    
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+    
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._run(verify_password, password, hashed_password)
+    
+    def upgrade_in_background(self, user_id: int, password: str, hashed_password: str):
+        """Re-hash at the current BCRYPT_ROUNDS after a successful login, off the response path"""
+        if self.pending:
+            return  # busy: leave it for a later login
+        task = asyncio.create_task(self._upgrade(user_id, password, hashed_password))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _upgrade(self, user_id: int, password: str, hashed_password: str):
+        try:
+            new_hash = await self.hash(password)
+            if await run_in_threadpool(self._save_upgrade, user_id, hashed_password, new_hash):
+                self.rehashed += 1
+        except Exception as e:
+            print(f"Error upgrading password hash for user {user_id}: {str(e)}")
+    
+    @staticmethod
+    def _save_upgrade(user_id: int, hashed_password: str, new_hash: str) -> bool:
+        db = SessionLocal()
+        try:
+            # Only if the password did not change in the meantime
+            updated = db.query(User).filter(
+                User.id == user_id, User.hashed_password == hashed_password
+            ).update({User.hashed_password: new_hash}, synchronize_session=False)
+            db.commit()
+            return updated > 0
+        finally:
+            db.close()
+    
+    def metrics(self) -> Dict:
+        return {
+            "pending": self.pending,
+            "running": self.running,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "bcrypt_rounds": BCRYPT_ROUNDS,
+            "timings": {step: summarize_durations(values) for step, values in self.durations_ms.items()},
+        }
+    
+    def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+password_hasher = PasswordHasher.from_settings()
+metrics_sources["password_hashing"] = password_hasher.metrics
+
+@router.on_event("shutdown")
+async def stop_password_hasher():
+    password_hasher.stop()
+
+# JWT token functions
+def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
+    """Create a JWT access token"""
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.utcnow() + expires_delta
+    else:
+        expire = datetime.utcnow() + timedelta(minutes=15)
+    to_encode.update({"exp": expire})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+def get_user_by_email(db: Session, email: str):
+    """Get user by email"""
+    return db.query(User).filter(User.email == email).first()
+
+# Authentication
+verified_tokens = TTLCache(maxsize=AUTH_TOKEN_CACHE_SIZE, ttl_seconds=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+# user_id -> role from the database ("" once the user is gone), refreshed every AUTH_ROLE_REVALIDATE_SECONDS
+user_roles = TTLCache(maxsize=AUTH_TOKEN_CACHE_SIZE, ttl_seconds=AUTH_ROLE_REVALIDATE_SECONDS)
+_role_checks: Dict[int, asyncio.Task] = {}
+
+def verify_access_token(token: str) -> Optional[CurrentUser]:
+    """Claims of a valid token, from cache when it was verified before (no DB access)"""
+    user = verified_tokens.get(token)
+    if user is None:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            user = CurrentUser(user_id=payload["user_id"], email=payload["sub"], role=payload["role"])
+        except (JWTError, KeyError, ValidationError):
+            return None
+        # Tokens without an exp claim fall back to the cache's own TTL.
+        verified_tokens.set(token, user, expires_at=payload.get("exp"))
+    return user
+
+def load_user_role(user_id: int) -> str:
+    db = SessionLocal()
+    try:
+        return db.scalar(select(User.role).where(User.id == user_id)) or ""
+    finally:
+        db.close()
+
+async def _revalidate_role(user_id: int):
+    try:
+        user_roles.set(user_id, await run_in_threadpool(load_user_role, user_id))
+    except Exception as e:
+        print(f"Error revalidating role for user {user_id}: {str(e)}")
+    finally:
+        _role_checks.pop(user_id, None)
+
+def current_role(user: CurrentUser) -> Optional[str]:
+    """Role to act on: the token's, or the database's once revalidated (None if the user was deleted).
+    A stale role is served while the recheck runs so no request waits on the database."""
+    if AUTH_ROLE_REVALIDATE_SECONDS <= 0:
+        return user.role
+    role = user_roles.get(user.user_id)
+    if role is None:
+        if user.user_id not in _role_checks:
+            _role_checks[user.user_id] = asyncio.create_task(_revalidate_role(user.user_id))
+        return user.role
+    return role or None
+
+def bearer_token(conn: HTTPConnection) -> Optional[str]:
+    scheme, _, token = conn.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token.strip()
+    if conn.scope["type"] == "websocket" or (
+            conn.scope.get("method") == "GET" and conn.url.path.startswith(AUTH_QUERY_TOKEN_PREFIXES)):
+        # Browsers cannot set headers on a WebSocket handshake or an <img src> request
+        return conn.query_params.get("token")
+    return None
+
+async def get_current_user(conn: HTTPConnection) -> Optional[CurrentUser]:
+    """Authenticated caller from the bearer token, or None (only when AUTH_REQUIRED is off or on public paths).
+    Resolved once per request; WebSocket handshakes without a valid token are refused"""
+    if hasattr(conn.state, "user"):
+        return conn.state.user
+    token = bearer_token(conn)
+    user = verify_access_token(token) if token else None
+    role = current_role(user) if user is not None else None
+    if role is None:
+        user = None
+    elif role != user.role:
+        user = user.model_copy(update={"role": role})
+    if user is None and AUTH_REQUIRED and conn.url.path not in AUTH_PUBLIC_PATHS:
+        detail = "Invalid or expired token" if token else "Not authenticated"
+        if conn.scope["type"] == "websocket":
+            raise WebSocketException(code=1008, reason=detail)
+        raise HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+    conn.state.user = user
+    return user
+
+async def require_user(user: Optional[CurrentUser] = Depends(get_current_user)) -> CurrentUser:
+    """Dependency for routes that need a caller even while AUTH_REQUIRED is off"""
+    if user is None:
+        raise HTTPException(status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"})
+    return user
+
+# Security: every route resolves the caller from its bearer token (see get_current_user)
+async def authenticate(conn: HTTPConnection):
+    await get_current_user(conn)
+
+@router.post("/users", response_model=dict)
+async def create_user(user: UserCreate, db: Session = Depends(get_db),
+                      caller: Optional[CurrentUser] = Depends(get_current_user)):
+    """Create a new user (athlete, coach, provider, etc.); with AUTH_REQUIRED, anyone may sign up as an athlete
+    but other roles need an admin's token"""
+    if AUTH_REQUIRED and user.role != UserRole.ATHLETE and (caller is None or caller.role != UserRole.ADMIN.value):
+        raise HTTPException(status_code=403, detail=f"Only an admin can create {user.role.value} accounts")
+    try:
+        # Check if user already exists
+        db_user = await run_in_threadpool(get_user_by_email, db, user.email)
+        if db_user:
+            raise HTTPException(status_code=400, detail="Email already registered")
+        
+        # Hash password
+        hashed_password = await password_hasher.hash(user.password)
+        
+        # Create user
+        db_user = User(
+            email=user.email,
+            name=user.name,
+            role=user.role.value,
+            hashed_password=hashed_password,
+            age=user.age,
+            gender=user.gender,
+            bmi=user.bmi,
+            location=user.location,
+            is_rural=user.is_rural
+        )
+        
+        def save_user():
+            db.add(db_user)
+            db.commit()
+            db.refresh(db_user)
+        
+        await run_in_threadpool(save_user)
+        return {"id": db_user.id, "email": db_user.email, "role": db_user.role, "name": db_user.name}
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+        print(f"Error creating user: {str(e)}")
+        print(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"Error creating user: {str(e)}")
+
+@router.post("/auth/login", response_model=Token)
+async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+    """Authenticate user and return JWT token"""
+    # Get user by email
+    db_user = await run_in_threadpool(get_user_by_email, db, user_credentials.email)
+    if not db_user:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    
+    # Verify password
+    if not await password_hasher.verify(user_credentials.password, db_user.hashed_password):
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    if password_needs_rehash(db_user.hashed_password):
+        password_hasher.upgrade_in_background(db_user.id, user_credentials.password, db_user.hashed_password)
+    
+    # Create access token
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": db_user.email, "user_id": db_user.id, "role": db_user.role},
+        expires_delta=access_token_expires
+    )
+    
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user_id": db_user.id,
+        "role": db_user.role,
+        "name": db_user.name
+    }
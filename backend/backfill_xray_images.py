@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+X-ray image backfill for Dear, Tear
+Moves X-rays uploaded before images were stored by content hash onto content-addressed storage, so
+their analyses get image URLs and thumbnail/preview renditions (rendered on first request).
+"""
+
+import argparse
+import sys
+import time
+
+# Import the engine from the API modules (uses DATABASE_URL like the API)
+sys.path.append('.')
+from database import SessionLocal
+from xray_storage import adopt_legacy_xray_images, XRAY_STORAGE_DIR
+
+def main():
+    parser = argparse.ArgumentParser(description="Move X-rays stored before content hashing onto content-addressed storage")
+    parser.parse_args()
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    try:
+        totals = adopt_legacy_xray_images(db)
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+
+    print(f"✓ Moved {totals['analyses']} analyses onto {totals['images']} new images under {XRAY_STORAGE_DIR} "
+          f"in {elapsed:.2f}s ({totals['missing']} image files missing)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Biomechanics storage size and session read time: raw rows vs. compacted blocks vs. archive files
+
+Ingests synthetic 100 Hz sessions (smooth joint angles with sensor noise) into a
+throwaway SQLite database, compacts them, then archives them. Reports the database
+size after VACUUM (plus the archive files), bytes per sample and the time to read
+one whole session, and checks that movement counts and the session timeline match
+at every stage. For archived sessions it also reports reading the per-second
+aggregates, which stay in the database.
+
+Usage:
+    python benchmarks/biomechanics_storage.py --sessions 20 --samples 60000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("BIOMECHANICS_ARCHIVE_DIR", tempfile.mkdtemp())
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from sqlalchemy import select, text
+
+def synthetic_session(rng: np.random.Generator, start: datetime, n: int):
+    """100 Hz samples: slow joint angle cycles plus noise, occasional valgus / impact spikes"""
+    import biomechanics_storage
+    t = np.arange(n) / 100.0
+    def signal(mean, amplitude, period, noise):
+        return np.round(mean + amplitude * np.sin(2 * np.pi * t / period) + rng.normal(0, noise, n), 2)
+    movements = np.array(["landing", "cutting", "pivoting", "running"], dtype=object)
+    return biomechanics_storage.BiomechanicsColumns(
+        timestamps=[start + timedelta(milliseconds=10 * i) for i in range(n)],
+        knee_angle=signal(150, 25, 1.2, 1.0),
+        hip_angle=signal(165, 10, 1.2, 0.5),
+        ankle_angle=signal(90, 12, 1.2, 0.5),
+        knee_valgus=signal(8, 6, 7.0, 1.5),
+        ground_reaction_force=np.abs(signal(2.0, 1.2, 0.6, 0.2)),
+        movement_type=movements[(t // 5).astype(np.int64) % len(movements)],
+    )
+
+def database_mb() -> float:
+    import database
+    # In WAL mode VACUUM writes to the WAL; the checkpoint after it shrinks the file
+    with database.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM"))
+        connection.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    return os.path.getsize(database.engine.url.database) / 1e6
+
+def read_sessions(session_ids: list, load=None) -> tuple:
+    """(median ms to read one session, the sessions' columns)"""
+    import biomechanics_storage
+    import database
+    durations, columns = [], []
+    db = database.SessionLocal()
+    try:
+        for session_id in session_ids:
+            started = time.perf_counter()
+            columns.append((load or biomechanics_storage.load_session_columns)(db, session_id))
+            durations.append((time.perf_counter() - started) * 1000)
+    finally:
+        db.close()
+    return float(np.median(durations)), columns
+
+def movement_counts(session_ids: list) -> tuple:
+    import database
+    import main
+    db = database.SessionLocal()
+    try:
+        return main.get_risk_model().query_movement_counts(db, session_ids)
+    finally:
+        db.close()
+
+def archive_mb() -> float:
+    import database
+    db = database.SessionLocal()
+    try:
+        return sum(db.scalars(select(database.BiomechanicsArchive.size_bytes))) / 1e6
+    finally:
+        db.close()
+
+def compare(before_columns, after_columns, stage: str) -> list:
+    failures = []
+    for before, after in zip(before_columns, after_columns):
+        if before.timestamps != after.timestamps or list(before.movement_type) != list(after.movement_type):
+            failures.append(f"{stage}: timestamps or movement types differ")
+            break
+        for field in ("knee_angle", "hip_angle", "ankle_angle", "knee_valgus", "ground_reaction_force", "risk_score"):
+            if not np.allclose(getattr(before, field), getattr(after, field), rtol=1e-6, atol=1e-6, equal_nan=True):
+                failures.append(f"{stage}: {field} differs beyond float32 precision")
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=60000, help="Samples per session (100 Hz)")
+    args = parser.parse_args()
+    
+    import biomechanics_storage
+    import database
+    import main as api
+    if not database.engine.url.get_backend_name() == "sqlite":
+        sys.exit("SQLite only: the size is measured on the database file")
+    
+    rng = np.random.default_rng(0)
+    db = database.SessionLocal()
+    try:
+        user = database.User(email="bench@example.com", name="Bench", role="athlete", hashed_password="x")
+        db.add(user)
+        db.flush()
+        session_ids = []
+        for s in range(args.sessions):
+            start = datetime(2026, 1, 1) + timedelta(days=s)
+            session = database.TrainingSession(athlete_id=user.id, session_type="practice", sport="soccer",
+                                               duration_minutes=args.samples // 6000, start_time=start)
+            db.add(session)
+            db.flush()
+            api.ingest_biomechanics(db, session, synthetic_session(rng, start, args.samples))
+            session.end_time = start + timedelta(seconds=args.samples / 100)
+            session_ids.append(session.id)
+            db.commit()
+    finally:
+        db.close()
+    
+    samples = args.sessions * args.samples
+    raw_mb = database_mb()
+    raw_ms, raw_columns = read_sessions(session_ids)
+    raw_counts = movement_counts(session_ids)
+    
+    started = time.perf_counter()
+    db = database.SessionLocal()
+    try:
+        for session_id in session_ids:
+            biomechanics_storage.compact_session_samples(db, session_id)
+    finally:
+        db.close()
+    compact_s = time.perf_counter() - started
+    
+    block_mb = database_mb()
+    block_ms, block_columns = read_sessions(session_ids)
+    block_counts = movement_counts(session_ids)
+    block_seconds_ms, block_seconds = read_sessions(session_ids, biomechanics_storage.load_session_seconds)
+    
+    started = time.perf_counter()
+    db = database.SessionLocal()
+    try:
+        for session_id in session_ids:
+            biomechanics_storage.archive_session_samples(db, session_id)
+    finally:
+        db.close()
+    archive_s = time.perf_counter() - started
+    
+    archived_mb = database_mb()
+    files_mb = archive_mb()
+    archived_ms, archived_columns = read_sessions(session_ids)
+    archived_counts = movement_counts(session_ids)
+    seconds_ms, archived_seconds = read_sessions(session_ids, biomechanics_storage.load_session_seconds)
+    
+    print(f"{args.sessions} sessions x {args.samples} samples ({samples} total), "
+          f"compacted in {compact_s:.1f}s, archived in {archive_s:.1f}s\n")
+    print(f"{'layout':<8} {'DB MB':>8} {'files MB':>9} {'bytes/sample':>13} {'read session ms':>16} {'read seconds ms':>16}")
+    print(f"{'rows':<8} {raw_mb:>8.1f} {0:>9.1f} {raw_mb * 1e6 / samples:>13.1f} {raw_ms:>16.1f} {'':>16}")
+    print(f"{'blocks':<8} {block_mb:>8.1f} {0:>9.1f} {block_mb * 1e6 / samples:>13.1f} {block_ms:>16.1f} "
+          f"{block_seconds_ms:>16.1f}")
+    print(f"{'archive':<8} {archived_mb:>8.1f} {files_mb:>9.1f} {(archived_mb + files_mb) * 1e6 / samples:>13.1f} "
+          f"{archived_ms:>16.1f} {seconds_ms:>16.1f}")
+    
+    failures = []
+    if raw_counts != block_counts:
+        failures.append(f"blocks: movement counts differ: {raw_counts} vs {block_counts}")
+    if raw_counts != archived_counts:
+        failures.append(f"archive: movement counts differ: {raw_counts} vs {archived_counts}")
+    failures += compare(raw_columns, block_columns, "blocks")
+    failures += compare(raw_columns, archived_columns, "archive")
+    failures += compare(block_seconds, archived_seconds, "archive per-second aggregates")
+    if failures:
+        print("\nFAIL:\n  " + "\n  ".join(sorted(set(failures))))
+        sys.exit(1)
+    print("\nOK: movement counts, session samples and per-second aggregates match")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Cold-start import time of the API module, with a regression budget
+
+Runs `python -X importtime -c "import main"` in fresh interpreters against a
+throwaway database, reports the median cumulative import time of main and its
+slowest top-level dependencies, and exits 1 if the median exceeds the budget or
+if any lazily loaded library (OpenCV, PIL, scikit-learn, joblib, and Alembic
+once the schema is current) is imported eagerly again.
+
+Usage:
+    python benchmarks/import_time.py --repeats 5 --budget-ms 1500
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ["cv2", "PIL", "sklearn", "joblib", "alembic"]
+
+def import_once(db_dir: str):
+    """Return ({top-level module: cumulative us}, main cumulative us, eagerly imported lazy modules)"""
+    code = (
+        "import sys; sys.path.insert(0, %r); import main; "
+        "print(','.join(m for m in %r if m in sys.modules))" % (BACKEND_DIR, LAZY_MODULES)
+    )
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_dir}/bench.db", WARMUP_ON_STARTUP="false")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, cwd=db_dir, env=env, check=True
+    )
+
+    modules = {}
+    main_us = None
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header row
+        depth = (len(name) - len(name.lstrip())) // 2
+        name = name.strip()
+        if name == "main":
+            main_us = int(cumulative)
+        elif depth == 1:
+            modules[name] = int(cumulative)
+    eager = [m for m in result.stdout.strip().split(",") if m]
+    return modules, main_us, eager
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500")))
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports to list")
+    args = parser.parse_args()
+
+    runs = []
+    with tempfile.TemporaryDirectory() as db_dir:
+        import_once(db_dir)  # first run creates the schema and warms the OS file cache
+        for _ in range(args.repeats):
+            runs.append(import_once(db_dir))
+
+    main_ms = statistics.median(r[1] for r in runs) / 1000
+    per_module = {}
+    for modules, _, _ in runs:
+        for name, us in modules.items():
+            per_module.setdefault(name, []).append(us)
+    slowest = sorted(((statistics.median(v) / 1000, k) for k, v in per_module.items()), reverse=True)
+
+    print(f"import main: {main_ms:.0f} ms median over {args.repeats} runs (budget {args.budget_ms:.0f} ms)")
+    print(f"\n{'module':<32} {'ms':>8}")
+    for ms, name in slowest[:args.top]:
+        print(f"{name:<32} {ms:>8.1f}")
+
+    failed = False
+    eager = sorted({m for r in runs for m in r[2]})
+    if eager:
+        print(f"\nFAIL: imported at startup but should be lazy: {', '.join(eager)}")
+        failed = True
+    if main_ms > args.budget_ms:
+        print(f"\nFAIL: import time {main_ms:.0f} ms exceeds budget {args.budget_ms:.0f} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\nOK")
+
+if __name__ == "__main__":
+    main()
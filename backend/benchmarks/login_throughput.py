@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Login throughput and event-loop responsiveness during a login rush
+
+Creates a set of users, then runs concurrent login clients against /auth/login
+for a fixed time while a probe keeps requesting GET / and records its latency.
+With bcrypt on its own bounded pool the probe should stay close to its idle
+latency however many logins are in flight; logins beyond the pool's backlog are
+answered with 503 instead of queueing without limit.
+
+Starts its own uvicorn server against a throwaway SQLite database unless --url
+is given (then --rounds/--workers have no effect). Requires httpx.
+
+Usage:
+    python benchmarks/login_throughput.py --clients 32 --duration 10 --rounds 12 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def start_server(port: int, rounds: int, workers: int) -> subprocess.Popen:
+    workdir = tempfile.mkdtemp(prefix="login-bench-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/bench.db",
+               BCRYPT_ROUNDS=str(rounds), PASSWORD_HASH_WORKERS=str(workers))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, interval: float = 0.02) -> list:
+    """GET / latencies in milliseconds until stop is set"""
+    latencies = []
+    while not stop.is_set():
+        sent = time.perf_counter()
+        await client.get("/")
+        latencies.append((time.perf_counter() - sent) * 1000)
+        await asyncio.sleep(interval)
+    return latencies
+
+async def login_loop(client: httpx.AsyncClient, emails: list, stop: asyncio.Event, offset: int):
+    """Log in round-robin until stop is set; returns (latencies of 200s in ms, status counts)"""
+    latencies, statuses = [], {}
+    i = offset
+    while not stop.is_set():
+        sent = time.perf_counter()
+        r = await client.post("/auth/login", json={"email": emails[i % len(emails)], "password": "bench-password"},
+                              timeout=120)
+        statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+        if r.status_code == 200:
+            latencies.append((time.perf_counter() - sent) * 1000)
+        i += 1
+    return latencies, statuses
+
+def report(label: str, latencies: list):
+    if not latencies:
+        print(f"{label:<22} no samples")
+        return
+    arr = np.array(latencies)
+    print(f"{label:<22} samples={len(arr):>6}  p50={np.percentile(arr, 50):8.2f} ms  "
+          f"p99={np.percentile(arr, 99):8.2f} ms  max={arr.max():8.2f} ms")
+
+async def run(args):
+    limits = httpx.Limits(max_connections=args.clients + 2)
+    async with httpx.AsyncClient(base_url=args.url.rstrip("/"), limits=limits) as client:
+        run_id = int(time.time())
+        emails = [f"bench-{run_id}-{i}@example.com" for i in range(args.users)]
+        for email in emails:
+            r = await client.post("/users", json={"email": email, "name": "Bench", "password": "bench-password",
+                                                  "role": "athlete"}, timeout=120)
+            r.raise_for_status()
+
+        stop = asyncio.Event()
+        idle_task = asyncio.create_task(probe(client, stop))
+        await asyncio.sleep(2)
+        stop.set()
+        idle = await idle_task
+
+        stop = asyncio.Event()
+        probe_task = asyncio.create_task(probe(client, stop))
+        clients = [asyncio.create_task(login_loop(client, emails, stop, i)) for i in range(args.clients)]
+        started = time.perf_counter()
+        await asyncio.sleep(args.duration)
+        stop.set()
+        results = await asyncio.gather(*clients)
+        elapsed = time.perf_counter() - started
+        loaded = await probe_task
+        metrics = (await client.get("/metrics")).json().get("password_hashing", {})
+
+    logins = [latency for latencies, _ in results for latency in latencies]
+    statuses = {}
+    for _, counts in results:
+        for status, count in counts.items():
+            statuses[status] = statuses.get(status, 0) + count
+
+    print(f"{args.clients} login clients for {elapsed:.1f}s: {len(logins) / elapsed:.1f} logins/s, "
+          f"responses {dict(sorted(statuses.items()))}")
+    report("login (200s)", logins)
+    report("GET / idle", idle)
+    report("GET / during rush", loaded)
+    if metrics:
+        print(f"server: workers={metrics['workers']} rounds={metrics['bcrypt_rounds']} "
+              f"rejected={metrics['rejected']} queued p99={metrics['timings']['queued'].get('p99_ms')} ms "
+              f"hash p50={metrics['timings']['hash'].get('p50_ms')} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Target an already running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of login rush")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent login clients")
+    parser.add_argument("--users", type=int, default=20, help="Distinct accounts logged in round-robin")
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS for the started server")
+    parser.add_argument("--workers", type=int, default=4, help="PASSWORD_HASH_WORKERS for the started server")
+    args = parser.parse_args()
+
+    proc = None
+    if not args.url:
+        proc = start_server(args.port, args.rounds, args.workers)
+        args.url = f"http://127.0.0.1:{args.port}"
+    try:
+        asyncio.run(run(args))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == "__main__":
+    main()
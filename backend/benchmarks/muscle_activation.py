@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Parity check and microbenchmark for the vectorized muscle activation engine
+
+Compares calculate_muscle_activation_arrays against the original per-sample loop
+on randomized sessions (including values exactly on every formula threshold),
+fails if any total/avg/peak differs, then times both implementations.
+
+Usage:
+    python benchmarks/muscle_activation.py --sizes 1000 100000 500000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from biomechanics_storage import encode_movement_types
+from main import calculate_muscle_activation_arrays
+
+MOVEMENT_TYPES = ["landing", "jumping", "cutting", "pivoting", "running", "side_step", "walking"]
+
+def legacy_muscle_activation(biomechanics_data: list) -> dict:
+    """Original per-sample loop, kept verbatim as the parity reference"""
+    if not biomechanics_data:
+        return {}
+    
+    # Initialize muscle activation counters
+    muscle_activity = {
+        "quadriceps": {"total": 0, "peak": 0, "avg": 0},
+        "hamstrings": {"total": 0, "peak": 0, "avg": 0},
+        "glutes": {"total": 0, "peak": 0, "avg": 0},
+        "calves": {"total": 0, "peak": 0, "avg": 0},
+        "hip_flexors": {"total": 0, "peak": 0, "avg": 0},
+        "hip_adductors": {"total": 0, "peak": 0, "avg": 0},
+        "hip_abductors": {"total": 0, "peak": 0, "avg": 0},
+        "core": {"total": 0, "peak": 0, "avg": 0},
+    }
+    
+    quad_values = []
+    hamstring_values = []
+    glute_values = []
+    calf_values = []
+    hip_flexor_values = []
+    hip_adductor_values = []
+    hip_abductor_values = []
+    core_values = []
+    
+    for b in biomechanics_data:
+        knee_angle_rad = b.knee_angle * (3.14159 / 180)
+        hip_angle_rad = b.hip_angle * (3.14159 / 180)
+        ankle_angle_rad = b.ankle_angle * (3.14159 / 180)
+        
+        # Quadriceps: active during knee extension and landing
+        quad_activation = 0
+        if b.movement_type in ["landing", "jumping"]:
+            # Higher activation during landing with knee flexion
+            quad_activation = (180 - b.knee_angle) / 180 * (b.ground_reaction_force / 3) * 100
+        elif b.movement_type in ["cutting", "pivoting"]:
+            quad_activation = (180 - b.knee_angle) / 180 * 60
+        quad_values.append(quad_activation)
+        muscle_activity["quadriceps"]["total"] += quad_activation
+        
+        # Hamstrings: critical for ACL protection, active during knee flexion and eccentric loading
+        hamstring_activation = 0
+        if b.knee_angle < 160:
+            hamstring_activation = (160 - b.knee_angle) / 160 * 70
+        if b.movement_type == "landing":
+            hamstring_activation += b.ground_reaction_force * 15
+        hamstring_values.append(hamstring_activation)
+        muscle_activity["hamstrings"]["total"] += hamstring_activation
+        
+        # Glutes: hip extension and stabilization
+        glute_activation = 0
+        if b.hip_angle < 170:
+            glute_activation = (170 - b.hip_angle) / 170 * 50
+        if abs(b.knee_valgus) > 10:  # Need glute strength to control valgus
+            glute_activation += abs(b.knee_valgus) * 3
+        glute_values.append(glute_activation)
+        muscle_activity["glutes"]["total"] += glute_activation
+        
+        # Calves: ankle plantarflexion during landing and jumping
+        calf_activation = 0
+        if b.movement_type in ["landing", "jumping"]:
+            calf_activation = (b.ground_reaction_force / 3) * 40
+        if b.ankle_angle < 100:
+            calf_activation += (100 - b.ankle_angle) / 100 * 30
+        calf_values.append(calf_activation)
+        muscle_activity["calves"]["total"] += calf_activation
+        
+        # Hip flexors: hip flexion during cutting and running
+        hip_flexor_activation = 0
+        if b.movement_type in ["cutting", "running"]:
+            hip_flexor_activation = (180 - b.hip_angle) / 180 * 50
+        hip_flexor_values.append(hip_flexor_activation)
+        muscle_activity["hip_flexors"]["total"] += hip_flexor_activation
+        
+        # Hip adductors: control knee valgus (important for ACL protection)
+        hip_adductor_activation = 0
+        if b.knee_valgus > 10:
+            hip_adductor_activation = b.knee_valgus * 4  # Need to control valgus
+        hip_adductor_values.append(hip_adductor_activation)
+        muscle_activity["hip_adductors"]["total"] += hip_adductor_activation
+        
+        # Hip abductors: lateral stability
+        hip_abductor_activation = 0
+        if b.knee_valgus < -5:  # Knee bowing outward
+            hip_abductor_activation = abs(b.knee_valgus) * 3
+        if b.movement_type in ["cutting", "side_step"]:
+            hip_abductor_activation += 25
+        hip_abductor_values.append(hip_abductor_activation)
+        muscle_activity["hip_abductors"]["total"] += hip_abductor_activation
+        
+        # Core: stability during all movements
+        core_activation = 20  # Base activation
+        if b.ground_reaction_force > 2.5:
+            core_activation += (b.ground_reaction_force - 2.5) * 15
+        if abs(b.knee_valgus) > 10:
+            core_activation += abs(b.knee_valgus) * 2
+        core_values.append(core_activation)
+        muscle_activity["core"]["total"] += core_activation
+    
+    # Calculate averages and peaks
+    total_data_points = len(biomechanics_data)
+    if total_data_points > 0:
+        muscle_activity["quadriceps"]["avg"] = sum(quad_values) / total_data_points if quad_values else 0
+        muscle_activity["quadriceps"]["peak"] = max(quad_values) if quad_values else 0
+        
+        muscle_activity["hamstrings"]["avg"] = sum(hamstring_values) / total_data_points if hamstring_values else 0
+        muscle_activity["hamstrings"]["peak"] = max(hamstring_values) if hamstring_values else 0
+        
+        muscle_activity["glutes"]["avg"] = sum(glute_values) / total_data_points if glute_values else 0
+        muscle_activity["glutes"]["peak"] = max(glute_values) if glute_values else 0
+        
+        muscle_activity["calves"]["avg"] = sum(calf_values) / total_data_points if calf_values else 0
+        muscle_activity["calves"]["peak"] = max(calf_values) if calf_values else 0
+        
+        muscle_activity["hip_flexors"]["avg"] = sum(hip_flexor_values) / total_data_points if hip_flexor_values else 0
+        muscle_activity["hip_flexors"]["peak"] = max(hip_flexor_values) if hip_flexor_values else 0
+        
+        muscle_activity["hip_adductors"]["avg"] = sum(hip_adductor_values) / total_data_points if hip_adductor_values else 0
+        muscle_activity["hip_adductors"]["peak"] = max(hip_adductor_values) if hip_adductor_values else 0
+        
+        muscle_activity["hip_abductors"]["avg"] = sum(hip_abductor_values) / total_data_points if hip_abductor_values else 0
+        muscle_activity["hip_abductors"]["peak"] = max(hip_abductor_values) if hip_abductor_values else 0
+        
+        muscle_activity["core"]["avg"] = sum(core_values) / total_data_points if core_values else 0
+        muscle_activity["core"]["peak"] = max(core_values) if core_values else 0
+    
+    # Normalize to 0-100 scale
+    for muscle in muscle_activity:
+        for key in ["total", "avg", "peak"]:
+            muscle_activity[muscle][key] = min(100, max(0, muscle_activity[muscle][key]))
+    
+    return muscle_activity
+
+
+def make_session(n: int, rng: np.random.Generator) -> dict:
+    columns = {
+        "knee_angle": rng.uniform(90, 185, n),
+        "hip_angle": rng.uniform(120, 185, n),
+        "ankle_angle": rng.uniform(70, 120, n),
+        "knee_valgus": rng.uniform(-20, 30, n),
+        "ground_reaction_force": rng.uniform(0, 6, n),
+    }
+    # Land some samples exactly on the thresholds the formulas branch on
+    edges = {"knee_angle": 160.0, "hip_angle": 170.0, "ankle_angle": 100.0,
+             "knee_valgus": 10.0, "ground_reaction_force": 2.5}
+    for field, value in edges.items():
+        columns[field][rng.random(n) < 0.02] = value
+    columns["knee_valgus"][rng.random(n) < 0.02] = -5.0
+    columns["knee_valgus"][rng.random(n) < 0.02] = -10.0
+    columns["movement_type"] = list(rng.choice(MOVEMENT_TYPES, n))
+    return columns
+
+def vectorized(columns: dict) -> dict:
+    codes, categories = encode_movement_types(columns["movement_type"])
+    return calculate_muscle_activation_arrays(
+        columns["knee_angle"], columns["hip_angle"], columns["ankle_angle"], columns["knee_valgus"],
+        columns["ground_reaction_force"], codes, categories
+    )
+
+def as_rows(columns: dict) -> list:
+    fields = ["knee_angle", "hip_angle", "ankle_angle", "knee_valgus", "ground_reaction_force"]
+    values = [columns[f].tolist() for f in fields] + [columns["movement_type"]]
+    return [SimpleNamespace(**dict(zip(fields + ["movement_type"], row))) for row in zip(*values)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 500000])
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+    
+    # Parity across many small sessions plus the benchmark sizes
+    for n in [1, 2, 17, 256] + args.sizes:
+        columns = make_session(n, rng)
+        expected = legacy_muscle_activation(as_rows(columns))
+        actual = vectorized(columns)
+        mismatches = [(m, k, expected[m][k], actual[m][k]) for m in expected for k in expected[m]
+                      if expected[m][k] != actual[m][k]]
+        if mismatches:
+            for mismatch in mismatches:
+                print("MISMATCH", *mismatch)
+            sys.exit(1)
+    print("parity: OK (bit-identical totals, averages and peaks)")
+    
+    print(f"{'samples':>10} {'loop ms':>10} {'vector ms':>10} {'speedup':>8}")
+    for n in args.sizes:
+        columns = make_session(n, rng)
+        rows = as_rows(columns)
+        start = time.perf_counter()
+        legacy_muscle_activation(rows)
+        loop_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        vectorized(columns)
+        vector_ms = (time.perf_counter() - start) * 1000
+        print(f"{n:>10} {loop_ms:>10.1f} {vector_ms:>10.1f} {loop_ms / vector_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
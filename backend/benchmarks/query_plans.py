@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Query-plan check: every hot endpoint reads its tables through an index
+
+Seeds a throwaway database (migrated like the API), calls each hot endpoint
+in-process, captures the SELECTs it runs and EXPLAINs them. Fails (exit 1) if
+an expected index is not used or a hot table is scanned in full.
+
+SQLite by default; set DATABASE_URL to an empty PostgreSQL database to check
+it there (sequential scans are disabled for the EXPLAIN, since small tables
+would otherwise never use an index).
+
+Usage:
+    python benchmarks/query_plans.py --athletes 50 --samples 200
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+os.environ.setdefault("WARMUP_ON_STARTUP", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, insert, text
+
+# (endpoint, path, table, index that must serve it)
+CHECKS = [
+    ("GET /sessions/{id}/analysis", "/sessions/{session_id}/analysis", "biomechanics_data",
+     "ix_biomechanics_data_session_timestamp"),
+    ("GET /sessions/{id}/analysis", "/sessions/{session_id}/analysis", "biomechanics_blocks",
+     "ix_biomechanics_blocks_session_start"),
+    ("GET /athletes/{id}/sessions", "/athletes/{athlete_id}/sessions", "training_sessions",
+     "ix_training_sessions_athlete_start"),
+    ("GET /athletes/{id}/risk-assessment", "/athletes/{athlete_id}/risk-assessment", "training_sessions",
+     "ix_training_sessions_athlete_start"),
+    ("GET /athletes/{id}/risk-assessment", "/athletes/{athlete_id}/risk-assessment", "biomechanics_data",
+     "ix_biomechanics_data_session_timestamp"),
+    ("GET /athletes/{id}/risk-assessment", "/athletes/{athlete_id}/risk-assessment", "biomechanics_blocks",
+     "ix_biomechanics_blocks_session_start"),
+    ("GET /athletes/{id}/risk-assessment", "/athletes/{athlete_id}/risk-assessment", "risk_assessments",
+     "ix_risk_assessments_athlete_date"),
+    ("GET /athletes/{id}/xray-analyses", "/athletes/{athlete_id}/xray-analyses", "xray_analyses",
+     "ix_xray_analyses_athlete_uploaded"),
+    ("GET /cues", "/cues?context=landing&driver=valgus&locale=en-US", "cues", "ix_cues_context_driver_locale"),
+    ("GET /team/heatmap", "/team/heatmap", "risk_assessments", "ix_risk_assessments_athlete_date"),
+]
+
+def seed(database, athletes: int, sessions_per_athlete: int, samples: int):
+    now = datetime.utcnow()
+    with database.engine.begin() as conn:
+        conn.execute(insert(database.User), [
+            {"email": f"athlete{i}@example.com", "name": f"Athlete {i}", "role": "athlete", "hashed_password": "x",
+             "age": 16 + i % 6, "gender": "female" if i % 2 else "male", "bmi": 22.0, "location": f"team{i % 5}"}
+            for i in range(athletes)
+        ])
+        athlete_ids = [row[0] for row in conn.execute(text("SELECT id FROM users ORDER BY id"))]
+        conn.execute(insert(database.TrainingSession), [
+            {"athlete_id": a, "session_type": "practice", "sport": "soccer", "duration_minutes": 60,
+             "start_time": now - timedelta(days=s)}
+            for a in athlete_ids for s in range(sessions_per_athlete)
+        ])
+        session_ids = [row[0] for row in conn.execute(text("SELECT id FROM training_sessions ORDER BY id"))]
+        for start in range(0, len(session_ids), 50):
+            conn.execute(insert(database.BiomechanicsData), [
+                {"session_id": sid, "timestamp": now + timedelta(milliseconds=10 * k), "knee_angle": 150.0,
+                 "hip_angle": 165.0, "ankle_angle": 90.0, "knee_valgus": float(k % 20),
+                 "ground_reaction_force": 2.0 + (k % 3), "movement_type": "landing", "risk_score": 0.4}
+                for sid in session_ids[start:start + 50] for k in range(samples)
+            ])
+        conn.execute(insert(database.RiskAssessment), [
+            {"athlete_id": a, "assessment_date": now - timedelta(days=d), "overall_risk_score": 0.5,
+             "movement_pattern_risk": 0.5, "demographic_risk": 0.5, "health_history_risk": 0.0,
+             "recommendations": "", "focus_areas": "[]"}
+            for a in athlete_ids for d in range(5)
+        ])
+        conn.execute(insert(database.XRayAnalysis), [
+            {"athlete_id": a, "image_path": "", "uploaded_at": now - timedelta(days=d), "severity": "normal",
+             "triage_recommendation": "routine", "findings": "", "educational_explanation": ""}
+            for a in athlete_ids for d in range(3)
+        ])
+        conn.execute(insert(database.Cue), [
+            {"text": f"cue {c} {d} {l}", "modality": "audio", "movement_context": c, "risk_driver": d, "locale": l}
+            for c in ("landing", "cutting", "pivoting", "decelerating") for d in ("valgus", "grf", "asymmetry")
+            for l in ("en-US", "es-US", "fr-US") for _ in range(5)
+        ])
+        if conn.dialect.name in ("sqlite", "postgresql"):
+            conn.execute(text("ANALYZE"))
+    return athlete_ids[athletes // 2], session_ids[len(session_ids) // 2]
+
+def explain(database, statement: str, parameters) -> list:
+    """Plan lines (SQLite EXPLAIN QUERY PLAN details, PostgreSQL text plan)"""
+    raw = database.engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        if database.engine.dialect.name == "postgresql":
+            cursor.execute("SET enable_seqscan = off")
+            cursor.execute("EXPLAIN " + statement, parameters)
+            return [row[0] for row in cursor.fetchall()]
+        cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+        return [row[-1] for row in cursor.fetchall()]
+    finally:
+        raw.close()
+
+def table_lines(lines: list, table: str, postgres: bool) -> list:
+    if postgres:
+        return [line for line in lines if re.search(rf"\bon {table}\b", line)]
+    return [line for line in lines if re.match(rf"(SCAN|SEARCH) {table}\b", line.strip())]
+
+def full_scan(line: str, postgres: bool) -> bool:
+    if postgres:
+        return "Seq Scan" in line
+    return line.strip().startswith("SCAN") and "USING" not in line
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--athletes", type=int, default=50)
+    parser.add_argument("--sessions", type=int, default=12, help="Sessions per athlete")
+    parser.add_argument("--samples", type=int, default=200, help="Biomechanics samples per session")
+    args = parser.parse_args()
+    
+    import database
+    import main as api
+    from fastapi.testclient import TestClient
+    
+    athlete_id, session_id = seed(database, args.athletes, args.sessions, args.samples)
+    postgres = database.engine.dialect.name == "postgresql"
+    captured = []
+    
+    @event.listens_for(database.engine, "before_cursor_execute")
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            captured.append((statement, parameters))
+    
+    failures = []
+    with TestClient(api.app) as client:
+        plans = {}
+        for endpoint, path, table, index in CHECKS:
+            if path not in plans:
+                captured.clear()
+                api.assessment_cache.clear()
+                response = client.get(path.format(athlete_id=athlete_id, session_id=session_id))
+                if response.status_code != 200:
+                    failures.append(f"{endpoint}: HTTP {response.status_code}")
+                plans[path] = [explain(database, statement, parameters) for statement, parameters in captured]
+            
+            lines = [line for plan in plans[path] for line in table_lines(plan, table, postgres)]
+            used = any(index in line for line in lines)
+            scans = [line.strip() for line in lines if full_scan(line, postgres)]
+            ok = used and not scans
+            print(f"{'ok  ' if ok else 'FAIL'} {endpoint:<36} {table:<20} {index}")
+            for line in lines:
+                print(f"       {line.strip()}")
+            if not lines:
+                failures.append(f"{endpoint}: no query on {table}")
+            elif not used:
+                failures.append(f"{endpoint}: {table} not read through {index}")
+            if scans:
+                failures.append(f"{endpoint}: full scan of {table}")
+    
+    if failures:
+        print("\nFAIL:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nOK")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Inference latency and per-worker memory of the trained ACL risk model
+
+Fits a RandomForestClassifier on synthetic features (or uses --model), times
+ACLRiskAssessmentModel.predict_overall_risk at several batch sizes, then loads
+the model in N worker processes with and without joblib memory mapping and
+reports each worker's proportional (PSS) and private memory from
+/proc/self/smaps_rollup.
+
+Usage:
+    python benchmarks/risk_model_inference.py --workers 4 --batch-sizes 1 100 1000 5000
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import joblib
+import numpy as np
+
+def synthetic_features(n: int, rng: np.random.Generator) -> np.ndarray:
+    from main import risk_features
+    total = rng.integers(0, 50_000, n)
+    return risk_features(
+        np.where(rng.random(n) < 0.5, "female", "male").astype(object),
+        rng.integers(12, 35, n).astype(np.float64),
+        rng.normal(24, 4, n),
+        rng.random(n) < 0.3,
+        (total * rng.random(n) * 0.3).astype(np.int64),
+        (total * rng.random(n) * 0.2).astype(np.int64),
+        total,
+    )
+
+def train_synthetic_model(path: str, n_estimators: int):
+    from sklearn.ensemble import RandomForestClassifier
+    rng = np.random.default_rng(0)
+    X = synthetic_features(20_000, rng)
+    y = (X[:, 0] * 0.3 + X[:, 4] + rng.random(len(X)) * 0.4 > 0.6).astype(np.int64)
+    model = RandomForestClassifier(n_estimators=n_estimators, random_state=42).fit(X, y)
+    joblib.dump(model, path)
+
+def memory_kb() -> dict:
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields
+
+def worker(path, mmap_mode, barrier, results):
+    import sklearn.ensemble  # noqa: F401 - keep library import cost out of the model delta
+    before = memory_kb()
+    model = joblib.load(path, mmap_mode=mmap_mode)
+    model.predict_proba(np.zeros((1, model.n_features_in_)))
+    barrier.wait()  # every worker holds the model before anyone measures PSS
+    after = memory_kb()
+    results.put((after["Pss"] - before["Pss"], after["Private_Dirty"] - before["Private_Dirty"]))
+    barrier.wait()
+
+def measure_workers(path: str, workers: int, mmap_mode):
+    ctx = multiprocessing.get_context("spawn")
+    barrier = ctx.Barrier(workers)
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(path, mmap_mode, barrier, results)) for _ in range(workers)]
+    for p in procs:
+        p.start()
+    samples = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return np.mean([s[0] for s in samples]), np.mean([s[1] for s in samples])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="Existing model file (default: train a synthetic one)")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 100, 1000, 5000])
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    path = args.model
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), "acl_risk_model.pkl")
+        train_synthetic_model(path, args.n_estimators)
+    print(f"Model: {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+    from main import ACLRiskAssessmentModel
+    model = ACLRiskAssessmentModel(model_path=path)
+    rng = np.random.default_rng(1)
+    print(f"\n{'batch':>7} {'p50 ms':>9} {'p99 ms':>9} {'us/athlete':>11}")
+    for size in args.batch_sizes:
+        features = synthetic_features(size, rng)
+        model.predict_overall_risk(features)  # warm-up
+        timings = []
+        for _ in range(args.repeats):
+            started = time.perf_counter()
+            model.predict_overall_risk(features)
+            timings.append(time.perf_counter() - started)
+        p50, p99 = np.percentile(timings, [50, 99]) * 1000
+        print(f"{size:>7} {p50:>9.2f} {p99:>9.2f} {p50 * 1000 / size:>11.1f}")
+
+    if not os.path.exists("/proc/self/smaps_rollup"):
+        print("\nPer-worker memory needs /proc/self/smaps_rollup (Linux); skipped")
+        return
+    print(f"\nPer-worker memory with {args.workers} workers holding the model:")
+    print(f"{'load':>10} {'PSS MB':>9} {'private MB':>11}")
+    for label, mmap_mode in [("copy", None), ("mmap", "r")]:
+        pss, private = measure_workers(path, args.workers, mmap_mode)
+        print(f"{label:>10} {pss / 1024:>9.1f} {private / 1024:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: WebSocket feedback latency while X-ray uploads run
+
+Streams biomechanics samples over /ws/biomechanics at a fixed rate and records
+the send -> feedback round trip, first on an idle server and then while several
+clients upload large X-ray images. With blocking work off the event loop the p99
+latency should stay flat between the two phases.
+
+Starts its own uvicorn server against a throwaway SQLite database unless --url
+is given. Requires httpx and websockets.
+
+Usage:
+    python benchmarks/ws_latency_under_xray_load.py --duration 10 --uploaders 4
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+import websockets
+from PIL import Image
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def make_xray(size: int) -> bytes:
+    """Random grayscale JPEG standing in for a large X-ray"""
+    pixels = (np.random.rand(size, size) * 255).astype(np.uint8)
+    buf = io.BytesIO()
+    Image.fromarray(pixels).save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+def start_server(port: int) -> subprocess.Popen:
+    workdir = tempfile.mkdtemp(prefix="ws-bench-")
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{workdir}/bench.db")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", BACKEND_DIR,
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+async def stream_samples(ws_url: str, rate_hz: int, duration: float) -> list:
+    """Send samples at rate_hz and return feedback latencies in milliseconds"""
+    latencies = []
+    interval = 1.0 / rate_hz
+    sample = ('{"timestamp": "2024-01-01T00:00:00", "knee_angle": 150, "hip_angle": 165, '
+              '"ankle_angle": 90, "knee_valgus": 16, "ground_reaction_force": 2.5, "movement_type": "landing"}')
+    async with websockets.connect(ws_url) as ws:
+        end = time.perf_counter() + duration
+        while time.perf_counter() < end:
+            sent = time.perf_counter()
+            await ws.send(sample)
+            await ws.recv()
+            latencies.append((time.perf_counter() - sent) * 1000)
+            await asyncio.sleep(max(0.0, interval - (time.perf_counter() - sent)))
+    return latencies
+
+async def upload_loop(client: httpx.AsyncClient, url: str, athlete_id: int, image: bytes, stop: asyncio.Event) -> int:
+    uploads = 0
+    while not stop.is_set():
+        await client.post(url, data={"athlete_id": str(athlete_id)},
+                          files={"file": ("xray.jpg", image, "image/jpeg")}, timeout=120)
+        uploads += 1
+    return uploads
+
+def report(label: str, latencies: list):
+    arr = np.array(latencies)
+    print(f"{label:<22} samples={len(arr):>6}  p50={np.percentile(arr, 50):7.2f} ms  "
+          f"p99={np.percentile(arr, 99):7.2f} ms  max={arr.max():8.2f} ms")
+
+async def run(args):
+    base = args.url.rstrip("/")
+    async with httpx.AsyncClient(base_url=base) as client:
+        email = f"bench-{time.time()}@example.com"
+        user = (await client.post("/users", json={"email": email, "name": "Bench", "password": "bench",
+                                                   "role": "athlete"})).json()
+        session = (await client.post("/sessions", json={"athlete_id": user["id"], "session_type": "practice",
+                                                         "sport": "soccer", "duration_minutes": 60,
+                                                         "start_time": "2024-01-01T00:00:00"})).json()
+        ws_url = base.replace("http", "ws", 1) + f"/ws/biomechanics/{session['id']}"
+        
+        idle = await stream_samples(ws_url, args.rate, args.duration)
+        
+        image = make_xray(args.image_size)
+        stop = asyncio.Event()
+        uploaders = [asyncio.create_task(upload_loop(client, f"{base}/xray/upload", user["id"], image, stop))
+                     for _ in range(args.uploaders)]
+        loaded = await stream_samples(ws_url, args.rate, args.duration)
+        stop.set()
+        uploads = sum(await asyncio.gather(*uploaders))
+    
+    report("idle", idle)
+    report(f"with {args.uploaders} uploaders", loaded)
+    print(f"x-ray uploads completed during load phase: {uploads}")
+    ratio = np.percentile(loaded, 99) / max(np.percentile(idle, 99), 1e-3)
+    print(f"p99 ratio loaded/idle: {ratio:.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Target an already running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per phase")
+    parser.add_argument("--rate", type=int, default=100, help="Samples per second on the WebSocket")
+    parser.add_argument("--uploaders", type=int, default=4, help="Concurrent X-ray upload clients")
+    parser.add_argument("--image-size", type=int, default=3000, help="X-ray edge length in pixels")
+    args = parser.parse_args()
+    
+    proc = None
+    if not args.url:
+        proc = start_server(args.port)
+        args.url = f"http://127.0.0.1:{args.port}"
+    try:
+        asyncio.run(run(args))
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Peak memory and time per X-ray analysis: original pipeline vs. the working-resolution one
+
+Writes synthetic knee-X-ray-like images (grayscale and RGB JPEG, grayscale PNG),
+then measures each pipeline in a fresh process: peak RSS growth during one
+analysis (Linux VmHWM after resetting it, minus RSS before), wall time, and the
+brightness / contrast / edge density the triage heuristics consume. The current
+pipeline is measured at the default working resolution and at full resolution
+with tiling.
+
+Usage:
+    python benchmarks/xray_memory.py --size 4096
+"""
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp()}/bench.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+def legacy_image_statistics(image_data: bytes):
+    """Original decode + OpenCV path of XRayAnalyzer.analyze_image, kept as the baseline"""
+    import cv2
+    from PIL import Image
+    img = Image.open(io.BytesIO(image_data))
+    # Convert to grayscale if needed
+    if img.mode != 'L':
+        img = img.convert('L')
+
+    # Convert PIL to OpenCV format
+    np_img = np.array(img)
+    cv_img = cv2.cvtColor(np_img, cv2.COLOR_GRAY2BGR) if len(np_img.shape) == 2 else np_img
+
+    # Enhanced image processing with OpenCV
+    gray = cv2.cvtColor(cv_img, cv2.COLOR_BGR2GRAY) if len(cv_img.shape) == 3 else cv_img
+
+    # Apply image enhancement
+    clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+    enhanced = clahe.apply(gray)
+
+    # Edge detection for fracture detection
+    edges = cv2.Canny(enhanced, 50, 150)
+
+    # Calculate statistics
+    brightness = np.mean(gray)
+    contrast = np.std(gray)
+    edge_density = np.sum(edges > 0) / edges.size
+    return float(brightness), float(contrast), float(edge_density)
+
+def synthetic_xray(size: int, rgb: bool) -> np.ndarray:
+    """Dark background, two bright bone shafts with soft edges, film grain"""
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:size, 0:size].astype(np.float32) / size
+    image = 40 + 30 * y
+    for centre in (0.35, 0.65):
+        image += 150 * np.exp(-((x - centre) / 0.08) ** 2)
+    image += rng.normal(0, 12, (size, size)).astype(np.float32)
+    image = np.clip(image, 0, 255).astype(np.uint8)
+    return np.dstack([image] * 3) if rgb else image
+
+def rss_kb(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise KeyError(field)
+
+def run_child(variant: str, path: str):
+    with open(path, "rb") as f:
+        image_data = f.read()
+    import cv2  # noqa: F401 - library import cost stays out of the measurement
+    from PIL import Image, ImageStat  # noqa: F401
+    from xray_jobs import get_xray_analyzer
+    analyzer = get_xray_analyzer()
+
+    # Reset the high-water mark to the current RSS so only this analysis counts
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    before = rss_kb("VmRSS")
+    started = time.perf_counter()
+    if variant == "original":
+        stats = legacy_image_statistics(image_data)
+    else:
+        stats = analyzer.image_statistics(image_data)[:3]
+    elapsed = time.perf_counter() - started
+    peak_growth_kb = rss_kb("VmHWM") - before
+    print(json.dumps({"peak_mb": peak_growth_kb / 1024, "ms": elapsed * 1000, "stats": stats}))
+
+def measure(variant: str, path: str, env: dict) -> dict:
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", variant, path],
+        capture_output=True, text=True, env=dict(os.environ, **env), check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=4096, help="Image side in pixels")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(*args.child)
+        return
+
+    from PIL import Image
+    workdir = tempfile.mkdtemp()
+    images = {}
+    for name, rgb, fmt in [("gray.jpg", False, "JPEG"), ("rgb.jpg", True, "JPEG"), ("gray.png", False, "PNG")]:
+        path = os.path.join(workdir, name)
+        Image.fromarray(synthetic_xray(args.size, rgb)).save(path, format=fmt, quality=95)
+        images[name] = path
+
+    variants = [
+        ("original", "original", {}),
+        ("working-res", "current", {}),
+        ("full-res tiled", "current", {"XRAY_WORKING_MAX_SIDE": "0"}),
+    ]
+    print(f"{args.size}x{args.size} images; peak RSS growth and time for one analysis\n")
+    print(f"{'image':<10} {'pipeline':<16} {'peak MB':>8} {'ms':>8} {'brightness':>11} {'contrast':>9} {'edges':>7}")
+    for name, path in images.items():
+        for label, variant, env in variants:
+            r = measure(variant, path, env)
+            brightness, contrast, edges = r["stats"]
+            print(f"{name:<10} {label:<16} {r['peak_mb']:>8.1f} {r['ms']:>8.0f} "
+                  f"{brightness:>11.2f} {contrast:>9.2f} {edges:>7.4f}")
+
+if __name__ == "__main__":
+    main()
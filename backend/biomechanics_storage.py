@@ -0,0 +1,739 @@
+"""
+Biomechanics sample storage: column batches, compaction of closed sessions into blocks, retention into
+archives, and reading samples back from whichever of those holds them
+"""
+
+from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+from typing import List, Optional, Dict, Tuple
+import numpy as np
+import os
+import time
+import asyncio
+import threading
+import uuid
+import zlib
+from collections import deque
+import struct
+
+from runtime import metrics_sources, summarize_durations
+from database import (BiomechanicsAggregate, BiomechanicsArchive, BiomechanicsBlock, BiomechanicsData, MovementType,
+                      SessionLocal, TrainingSession, engine)
+from schemas import BiomechanicsDataPoint
+
+# Bulk ingest settings (rows per executemany round trip)
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", "5000"))
+
+# Compact biomechanics storage: once a session is closed its samples move from biomechanics_data into
+# zlib-compressed float32 column blocks of up to BIOMECHANICS_BLOCK_SAMPLES samples (see compact_session_samples);
+# reads merge blocks with any raw rows, so analysis and risk assessment see the same samples either way
+BIOMECHANICS_BLOCK_SAMPLES = int(os.getenv("BIOMECHANICS_BLOCK_SAMPLES", "6000"))
+BIOMECHANICS_COMPACT_ON_CLOSE = os.getenv("BIOMECHANICS_COMPACT_ON_CLOSE", "true").lower() == "true"
+BIOMECHANICS_BLOCK_COMPRESSION = 6  # zlib level
+
+# Biomechanics retention: every BIOMECHANICS_RETENTION_INTERVAL_SECONDS, all samples of sessions that ended more
+# than BIOMECHANICS_RETENTION_DAYS ago (0 disables) move to a compressed .npz archive under BIOMECHANICS_ARCHIVE_DIR;
+# per-second aggregates stay in the database and analysis reads the archive on demand
+BIOMECHANICS_RETENTION_DAYS = float(os.getenv("BIOMECHANICS_RETENTION_DAYS", "0"))
+BIOMECHANICS_RETENTION_INTERVAL_SECONDS = float(os.getenv("BIOMECHANICS_RETENTION_INTERVAL_SECONDS", "3600"))
+BIOMECHANICS_ARCHIVE_DIR = os.getenv("BIOMECHANICS_ARCHIVE_DIR", "archive/biomechanics")
+
+# Movement risk thresholds: knee valgus in degrees, ground reaction force in body weight multiples
+HIGH_VALGUS_THRESHOLD = float(os.getenv("HIGH_VALGUS_THRESHOLD", "15.0"))
+HIGH_IMPACT_THRESHOLD = float(os.getenv("HIGH_IMPACT_THRESHOLD", "3.0"))
+
+router = APIRouter()
+
+# Column batches
+BIOMECHANICS_VALUE_FIELDS = ("knee_angle", "hip_angle", "ankle_angle", "knee_valgus", "ground_reaction_force")
+
+class BiomechanicsColumns:
+    """Column-oriented batch of biomechanics samples (one array per field)"""
+    
+    def __init__(self, timestamps: List[datetime], knee_angle: np.ndarray, hip_angle: np.ndarray,
+                 ankle_angle: np.ndarray, knee_valgus: np.ndarray, ground_reaction_force: np.ndarray,
+                 movement_type: np.ndarray, risk_score: Optional[np.ndarray] = None):
+        self.timestamps = timestamps
+        self.knee_angle = knee_angle
+        self.hip_angle = hip_angle
+        self.ankle_angle = ankle_angle
+        self.knee_valgus = knee_valgus
+        self.ground_reaction_force = ground_reaction_force
+        self.movement_type = movement_type
+        self.risk_score = risk_score
+    
+    def __len__(self) -> int:
+        return len(self.timestamps)
+    
+    @classmethod
+    def from_points(cls, points: List[BiomechanicsDataPoint]) -> "BiomechanicsColumns":
+        """Build columns from validated Pydantic data points"""
+        n = len(points)
+        
+        def column(field: str) -> np.ndarray:
+            return np.fromiter((getattr(p, field) for p in points), dtype=np.float64, count=n)
+        
+        return cls(
+            timestamps=[p.timestamp for p in points],
+            knee_angle=column("knee_angle"),
+            hip_angle=column("hip_angle"),
+            ankle_angle=column("ankle_angle"),
+            knee_valgus=column("knee_valgus"),
+            ground_reaction_force=column("ground_reaction_force"),
+            movement_type=np.array([p.movement_type for p in points], dtype=object),
+        )
+    
+    @classmethod
+    def from_codes(cls, timestamps: List[datetime], values: Dict[str, np.ndarray], movement_codes: np.ndarray,
+                   movement_categories: List[str]) -> "BiomechanicsColumns":
+        """Build columns from dictionary-encoded movement types"""
+        categories = np.array(movement_categories, dtype=object)
+        if len(movement_codes) and int(movement_codes.max()) >= len(categories):
+            raise HTTPException(status_code=422, detail="Movement type code out of range")
+        return cls(
+            timestamps=timestamps,
+            knee_angle=values["knee_angle"],
+            hip_angle=values["hip_angle"],
+            ankle_angle=values["ankle_angle"],
+            knee_valgus=values["knee_valgus"],
+            ground_reaction_force=values["ground_reaction_force"],
+            movement_type=categories[movement_codes],
+        )
+
+def epoch_to_datetimes(epoch_us: np.ndarray) -> List[datetime]:
+    """Convert int64 microseconds since the epoch to naive UTC datetimes"""
+    return epoch_us.astype("datetime64[us]").tolist()
+
+def score_biomechanics(knee_valgus: np.ndarray, ground_reaction_force: np.ndarray):
+    """Vectorized per-sample risk scoring; returns (risk_scores, high_risk_count)"""
+    high_valgus = knee_valgus > HIGH_VALGUS_THRESHOLD
+    high_impact = ground_reaction_force > HIGH_IMPACT_THRESHOLD
+    risk_scores = np.minimum(high_valgus * 0.5 + high_impact * 0.5, 1.0)
+    high_risk_count = int(np.count_nonzero(high_valgus) + np.count_nonzero(high_impact))
+    return risk_scores, high_risk_count
+
+def encode_movement_types(movement_types) -> tuple:
+    """Dictionary-encode movement type strings; returns (codes, categories)"""
+    lookup: Dict[str, int] = {}
+    codes = np.fromiter((lookup.setdefault(t, len(lookup)) for t in movement_types), dtype=np.int32,
+                        count=len(movement_types))
+    return codes, list(lookup)
+
+# Compact biomechanics storage
+# Block payload (zlib-compressed): uint8 format version | uint32 sample count, then each column byte-shuffled
+# (first byte of every value, then every second byte, ...) so the slowly changing high bytes compress well:
+#   int64 microseconds since the previous sample (the first since the block's start_time),
+#   float32 per BLOCK_FLOAT_FIELDS (NaN for NULL), uint16 movement type id (0 for NULL)
+BLOCK_FORMAT_VERSION = 1
+BLOCK_FLOAT_FIELDS = BIOMECHANICS_VALUE_FIELDS + ("risk_score",)
+BLOCK_COLUMNS = [("timestamp", np.dtype("<i8"))] + [(field, np.dtype("<f4")) for field in BLOCK_FLOAT_FIELDS] + [
+    ("movement_type", np.dtype("<u2"))
+]
+
+def _shuffle_bytes(values: np.ndarray) -> bytes:
+    return values.view(np.uint8).reshape(len(values), values.itemsize).T.tobytes()
+
+def encode_biomechanics_block(offsets_us: np.ndarray, values: Dict[str, np.ndarray], movement_codes: np.ndarray) -> bytes:
+    """Pack one block's columns; offsets_us are sample times in microseconds from the block's start_time"""
+    columns = {"timestamp": np.diff(offsets_us, prepend=0), **values, "movement_type": movement_codes}
+    parts = [struct.pack("<BI", BLOCK_FORMAT_VERSION, len(offsets_us))]
+    parts += [_shuffle_bytes(np.ascontiguousarray(columns[name], dtype=dtype)) for name, dtype in BLOCK_COLUMNS]
+    return zlib.compress(b"".join(parts), BIOMECHANICS_BLOCK_COMPRESSION)
+
+def decode_biomechanics_block(data: bytes) -> Dict[str, np.ndarray]:
+    """Unpack a block: "timestamp" as microsecond offsets from start_time, float32 values, movement type ids"""
+    payload = zlib.decompress(data)
+    version, n = struct.unpack_from("<BI", payload)
+    if version != BLOCK_FORMAT_VERSION:
+        raise ValueError(f"Unsupported biomechanics block format {version}")
+    columns, offset = {}, struct.calcsize("<BI")
+    for name, dtype in BLOCK_COLUMNS:
+        size = n * dtype.itemsize
+        shuffled = np.frombuffer(payload, dtype=np.uint8, count=size, offset=offset)
+        columns[name] = shuffled.reshape(dtype.itemsize, n).T.copy().view(dtype).ravel()
+        offset += size
+    columns["timestamp"] = np.cumsum(columns["timestamp"])
+    return columns
+
+class MovementTypeLookup:
+    """Process-wide cache of the movement_types table (name <-> small-int id), read and extended on its own
+    connections so new ids are committed and visible whatever the caller's transaction does"""
+    
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names = np.array([None], dtype=object)  # indexed by id; 0 stands for NULL
+        self._lock = threading.Lock()
+    
+    def _load(self):
+        with engine.connect() as connection:
+            rows = connection.execute(select(MovementType.id, MovementType.name)).all()
+        names = np.full(max((row[0] for row in rows), default=0) + 1, None, dtype=object)
+        for movement_type_id, name in rows:
+            names[movement_type_id] = name
+        with self._lock:
+            self._ids = {name: movement_type_id for movement_type_id, name in rows}
+            self._names = names
+    
+    def ids(self, names) -> Dict[str, int]:
+        """Ids for the given names, adding unknown names to movement_types"""
+        missing = {name for name in names if name is not None} - self._ids.keys()
+        if missing:
+            self._load()
+            missing -= self._ids.keys()
+        for name in sorted(missing):
+            try:
+                with engine.begin() as connection:
+                    connection.execute(MovementType.__table__.insert(), {"name": name})
+            except IntegrityError:
+                pass  # added concurrently
+        if missing:
+            self._load()
+        return self._ids
+    
+    def names(self, codes: np.ndarray) -> np.ndarray:
+        """Object array of names for ids (None for 0)"""
+        if len(codes) and int(codes.max()) >= len(self._names):
+            self._load()  # added by another process since the last load
+        return self._names[codes]
+
+movement_types = MovementTypeLookup()
+
+def compact_session_samples(db: Session, session_id: int) -> Dict[str, int]:
+    """Move a session's raw samples into compressed blocks, one transaction per block
+    
+    Each block's rows are deleted in the transaction that inserts it, so readers see every sample exactly
+    once; a block whose rows were already moved by a concurrent compaction is rolled back. Rows without a
+    timestamp stay in biomechanics_data.
+    """
+    query = select(
+        BiomechanicsData.id, BiomechanicsData.timestamp, *(getattr(BiomechanicsData, field) for field in BLOCK_FLOAT_FIELDS),
+        BiomechanicsData.movement_type
+    ).where(BiomechanicsData.session_id == session_id, BiomechanicsData.timestamp.isnot(None)).order_by(
+        BiomechanicsData.timestamp, BiomechanicsData.id
+    )
+    
+    # Encode everything first (blocks are small); the read cursor cannot stay open across commits
+    blocks = []
+    result = db.execute(query.execution_options(yield_per=BIOMECHANICS_BLOCK_SAMPLES))
+    for rows in result.partitions():
+        ids, timestamps, *values, names = zip(*rows)
+        epoch_us = np.array(timestamps, dtype="datetime64[us]").astype(np.int64)
+        floats = {field: np.array(column, dtype=np.float64) for field, column in zip(BLOCK_FLOAT_FIELDS, values)}
+        lookup = movement_types.ids(set(names))
+        codes = np.fromiter((0 if name is None else lookup[name] for name in names), dtype=np.uint16, count=len(names))
+        blocks.append((list(ids), {
+            "session_id": session_id,
+            "start_time": timestamps[0],
+            "end_time": timestamps[-1],
+            "sample_count": len(ids),
+            "valgus_threshold": HIGH_VALGUS_THRESHOLD,
+            "impact_threshold": HIGH_IMPACT_THRESHOLD,
+            "high_valgus_count": int(np.count_nonzero(floats["knee_valgus"] > HIGH_VALGUS_THRESHOLD)),
+            "high_impact_count": int(np.count_nonzero(floats["ground_reaction_force"] > HIGH_IMPACT_THRESHOLD)),
+            "data": encode_biomechanics_block(epoch_us - epoch_us[0], floats, codes),
+        }))
+    db.rollback()  # end the read transaction
+    
+    moved = {"samples": 0, "blocks": 0, "bytes": 0}
+    table = BiomechanicsData.__table__
+    for ids, block in blocks:
+        deleted = 0
+        for start in range(0, len(ids), BULK_INSERT_CHUNK_SIZE):
+            deleted += db.execute(table.delete().where(table.c.id.in_(ids[start:start + BULK_INSERT_CHUNK_SIZE]))).rowcount
+        if deleted != len(ids):
+            db.rollback()
+            continue
+        db.execute(BiomechanicsBlock.__table__.insert(), block)
+        db.commit()
+        moved["samples"] += len(ids)
+        moved["blocks"] += 1
+        moved["bytes"] += len(block["data"])
+    return moved
+
+class BiomechanicsCompactor:
+    """Compacts closed sessions in the background (one run per session at a time)"""
+    
+    def __init__(self):
+        self._running: Dict[int, asyncio.Task] = {}
+        self.sessions = 0
+        self.samples = 0
+        self.blocks = 0
+        self.stored_bytes = 0
+        self.failed = 0
+        self.durations_ms = deque(maxlen=1000)
+    
+    def compact_in_background(self, session_id: int):
+        if session_id not in self._running:
+            task = asyncio.create_task(self._compact(session_id))
+            self._running[session_id] = task
+            task.add_done_callback(lambda _: self._running.pop(session_id, None))
+    
+    async def _compact(self, session_id: int):
+        started = time.perf_counter()
+        try:
+            moved = await run_in_threadpool(self.compact, session_id)
+        except Exception as e:
+            self.failed += 1
+            print(f"Error compacting biomechanics of session {session_id}: {str(e)}")
+            return
+        self.durations_ms.append((time.perf_counter() - started) * 1000)
+        self.sessions += 1
+        self.samples += moved["samples"]
+        self.blocks += moved["blocks"]
+        self.stored_bytes += moved["bytes"]
+    
+    @staticmethod
+    def compact(session_id: int) -> Dict[str, int]:
+        db = SessionLocal()
+        try:
+            return compact_session_samples(db, session_id)
+        finally:
+            db.close()
+    
+    def metrics(self) -> Dict:
+        return {
+            "running": len(self._running),
+            "sessions": self.sessions,
+            "samples": self.samples,
+            "blocks": self.blocks,
+            "bytes_per_sample": round(self.stored_bytes / self.samples, 2) if self.samples else None,
+            "failed": self.failed,
+            "timings": summarize_durations(self.durations_ms),
+        }
+    
+    def stop(self):
+        for task in list(self._running.values()):
+            task.cancel()
+
+biomechanics_compactor = BiomechanicsCompactor()
+metrics_sources["biomechanics_storage"] = biomechanics_compactor.metrics
+
+@router.on_event("shutdown")
+async def stop_biomechanics_compactor():
+    biomechanics_compactor.stop()
+
+def compact_after_close(session_id: int):
+    """Compact a just-closed session in the background, unless BIOMECHANICS_COMPACT_ON_CLOSE is off"""
+    if BIOMECHANICS_COMPACT_ON_CLOSE:
+        biomechanics_compactor.compact_in_background(session_id)
+
+# Biomechanics retention and archive
+# Archive files (.npz, one per session): "timestamp" int64 microseconds since the epoch, float32 per
+# BLOCK_FLOAT_FIELDS (NaN for NULL), "movement_type" uint16 codes into "movement_types" (code 0 for NULL, k for
+# movement_types[k - 1]); readable with np.load alone
+AGGREGATE_PEAK_FIELDS = ("knee_valgus", "ground_reaction_force")
+
+def archive_file_path(relative_path: str) -> str:
+    return os.path.join(BIOMECHANICS_ARCHIVE_DIR, relative_path)
+
+def write_archive(session_id: int, samples: Dict[str, np.ndarray]) -> Tuple[str, int]:
+    """Write samples to a new archive file (atomically); returns (path relative to the archive dir, size)"""
+    names = samples["movement_type"]
+    categories = sorted({name for name in names.tolist() if name is not None})
+    index = {name: code for code, name in enumerate(categories, start=1)}
+    codes = np.fromiter((0 if name is None else index[name] for name in names.tolist()), dtype=np.uint16,
+                        count=len(names))
+    
+    # A new name each time, so a reader of the previous archive is unaffected until it is deleted
+    relative_path = os.path.join(str(session_id // 1000), f"{session_id}-{uuid.uuid4().hex[:12]}.npz")
+    path = archive_file_path(relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez_compressed(
+            f, timestamp=samples["timestamp"].astype(np.int64),
+            **{field: samples[field].astype(np.float32) for field in BLOCK_FLOAT_FIELDS},
+            movement_type=codes, movement_types=np.array(categories, dtype=str),
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return relative_path, os.path.getsize(path)
+
+def read_archive(relative_path: str) -> Dict[str, np.ndarray]:
+    """Samples of an archive file (see write_archive)"""
+    with np.load(archive_file_path(relative_path), allow_pickle=False) as archive:
+        samples = {field: archive[field] for field in ("timestamp",) + BLOCK_FLOAT_FIELDS}
+        names = np.array([None] + archive["movement_types"].tolist(), dtype=object)
+        samples["movement_type"] = names[archive["movement_type"]]
+    return samples
+
+def load_archived_samples(db: Session, session_id: int, start: Optional[datetime] = None,
+                          end: Optional[datetime] = None) -> List[Dict[str, np.ndarray]]:
+    """The session's archived samples within start..end (the file is only read when the range overlaps it)"""
+    query = select(BiomechanicsArchive.path).where(BiomechanicsArchive.session_id == session_id)
+    if start is not None:
+        query = query.where(BiomechanicsArchive.end_time >= start.replace(tzinfo=None))
+    if end is not None:
+        query = query.where(BiomechanicsArchive.start_time <= end.replace(tzinfo=None))
+    path = db.scalar(query)
+    return [] if path is None else [trim_samples(read_archive(path), start, end)]
+
+def aggregate_samples(samples: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Per-second, per-movement-type buckets: "timestamp" (second start), sample_count, means of
+    BLOCK_FLOAT_FIELDS ignoring NULLs (NaN when all are NULL), peak_ fields and movement_type"""
+    if not len(samples["timestamp"]):
+        return {"timestamp": samples["timestamp"], "sample_count": np.zeros(0, dtype=np.int64),
+                **{field: np.zeros(0) for field in BLOCK_FLOAT_FIELDS},
+                **{f"peak_{field}": np.zeros(0) for field in AGGREGATE_PEAK_FIELDS},
+                "movement_type": np.zeros(0, dtype=object)}
+    codes, categories = encode_movement_types(samples["movement_type"].tolist())
+    # Buckets within a second in movement type name order (None first), however the samples were windowed
+    by_name = sorted(range(len(categories)), key=lambda code: (categories[code] is not None, categories[code] or ""))
+    ranks = np.empty(len(categories), dtype=np.int64)
+    ranks[by_name] = np.arange(len(categories))
+    codes, categories = ranks[codes], [categories[code] for code in by_name]
+    seconds = samples["timestamp"] // 1_000_000
+    order = np.lexsort((codes, seconds))
+    seconds, codes = seconds[order], codes[order]
+    starts = np.flatnonzero(np.r_[True, (np.diff(seconds) != 0) | (np.diff(codes) != 0)])
+    buckets = {
+        "timestamp": seconds[starts] * 1_000_000,
+        "sample_count": np.diff(np.r_[starts, len(order)]),
+        "movement_type": np.array(categories, dtype=object)[codes[starts]],
+    }
+    for field in BLOCK_FLOAT_FIELDS:
+        values = samples[field][order].astype(np.float64)
+        present = ~np.isnan(values)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            buckets[field] = np.add.reduceat(np.where(present, values, 0.0), starts) / np.add.reduceat(present, starts)
+    for field in AGGREGATE_PEAK_FIELDS:
+        buckets[f"peak_{field}"] = np.fmax.reduceat(samples[field][order].astype(np.float64), starts)
+    return buckets
+
+def load_aggregated_samples(db: Session, session_id: int, start: Optional[datetime] = None,
+                            end: Optional[datetime] = None) -> List[Dict[str, np.ndarray]]:
+    """Stored per-second aggregates of the session's archived samples within start..end"""
+    query = select(
+        BiomechanicsAggregate.bucket_start, *(getattr(BiomechanicsAggregate, field) for field in BLOCK_FLOAT_FIELDS),
+        BiomechanicsAggregate.movement_type_id
+    ).where(BiomechanicsAggregate.session_id == session_id)
+    if start is not None:
+        query = query.where(BiomechanicsAggregate.bucket_start >= start.replace(tzinfo=None))
+    if end is not None:
+        query = query.where(BiomechanicsAggregate.bucket_start <= end.replace(tzinfo=None))
+    rows = db.execute(query.order_by(BiomechanicsAggregate.bucket_start, BiomechanicsAggregate.id)).all()
+    if not rows:
+        return []
+    timestamps, *values, movement_type_ids = zip(*rows)
+    codes = np.fromiter((code or 0 for code in movement_type_ids), dtype=np.uint16, count=len(rows))
+    return [{
+        "timestamp": np.array(timestamps, dtype="datetime64[us]").astype(np.int64),
+        **{field: np.array(column, dtype=np.float64) for field, column in zip(BLOCK_FLOAT_FIELDS, values)},
+        "movement_type": movement_types.names(codes),
+    }]
+
+def load_session_seconds(db: Session, session_id: int, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None) -> BiomechanicsColumns:
+    """Per-second, per-movement-type means of a session's samples, as columns ordered by time
+    
+    Seconds starting within start..end are returned whole. Archived samples come from their stored
+    aggregates, so the archive file is not read.
+    """
+    parts = load_aggregated_samples(db, session_id, start, end)
+    last = None if end is None else end.replace(microsecond=0) + timedelta(microseconds=999_999)
+    recent = load_session_columns(db, session_id, start, last, archived=False)
+    if len(recent):
+        parts.append(trim_samples(aggregate_samples(columns_to_samples(recent)), start, end))
+    if not parts:
+        return recent
+    return samples_to_columns(merge_samples(parts))
+
+def archive_session_samples(db: Session, session_id: int) -> Dict[str, int]:
+    """Move every sample of a session (raw rows, blocks and any earlier archive) into one archive file,
+    keep per-second aggregates in the database and delete the rows and blocks, in one transaction
+    
+    Rolled back, and the new file removed, if rows or blocks were moved concurrently (e.g. by compaction);
+    the next run retries.
+    """
+    moved = {"samples": 0, "bytes": 0}
+    rows = db.execute(select(
+        BiomechanicsData.id, BiomechanicsData.timestamp,
+        *(getattr(BiomechanicsData, field) for field in BLOCK_FLOAT_FIELDS), BiomechanicsData.movement_type
+    ).where(BiomechanicsData.session_id == session_id, BiomechanicsData.timestamp.isnot(None))
+     .order_by(BiomechanicsData.timestamp, BiomechanicsData.id)).all()
+    blocks = db.execute(
+        select(BiomechanicsBlock.id, BiomechanicsBlock.start_time, BiomechanicsBlock.data)
+        .where(BiomechanicsBlock.session_id == session_id)
+        .order_by(BiomechanicsBlock.start_time, BiomechanicsBlock.id)
+    ).all()
+    if not rows and not blocks:
+        return moved
+    
+    archive = db.get(BiomechanicsArchive, session_id)
+    previous_path = archive.path if archive is not None else None
+    previous_count = archive.sample_count if archive is not None else 0
+    parts = [read_archive(previous_path)] if previous_path else []
+    for _, start_time, data in blocks:
+        block = decode_biomechanics_block(data)
+        block["timestamp"] = block["timestamp"] + np.datetime64(start_time, "us").astype(np.int64)
+        block["movement_type"] = movement_types.names(block["movement_type"])
+        parts.append(block)
+    row_ids = [row[0] for row in rows]
+    if rows:
+        _, timestamps, *values, names = zip(*rows)
+        parts.append({
+            "timestamp": np.array(timestamps, dtype="datetime64[us]").astype(np.int64),
+            **{field: np.array(column, dtype=np.float64) for field, column in zip(BLOCK_FLOAT_FIELDS, values)},
+            "movement_type": np.array(names, dtype=object),
+        })
+    samples = merge_samples(parts)
+    buckets = aggregate_samples(samples)
+    lookup = movement_types.ids(set(buckets["movement_type"].tolist()))
+    
+    relative_path, size = write_archive(session_id, samples)
+    try:
+        data_table, block_table = BiomechanicsData.__table__, BiomechanicsBlock.__table__
+        deleted = 0
+        for start in range(0, len(row_ids), BULK_INSERT_CHUNK_SIZE):
+            chunk = row_ids[start:start + BULK_INSERT_CHUNK_SIZE]
+            deleted += db.execute(data_table.delete().where(data_table.c.id.in_(chunk))).rowcount
+        block_ids = [block[0] for block in blocks]
+        if block_ids:
+            deleted += db.execute(block_table.delete().where(block_table.c.id.in_(block_ids))).rowcount
+        if deleted != len(row_ids) + len(block_ids):
+            db.rollback()
+            os.remove(archive_file_path(relative_path))
+            return moved
+        
+        db.execute(BiomechanicsAggregate.__table__.delete().where(BiomechanicsAggregate.session_id == session_id))
+        bucket_starts = epoch_to_datetimes(buckets["timestamp"])
+        aggregates = [
+            {
+                "session_id": session_id,
+                "bucket_start": bucket_starts[i],
+                "movement_type_id": lookup.get(buckets["movement_type"][i]),
+                "sample_count": int(buckets["sample_count"][i]),
+                **{field: None if np.isnan(buckets[field][i]) else float(buckets[field][i])
+                   for field in BLOCK_FLOAT_FIELDS + tuple(f"peak_{f}" for f in AGGREGATE_PEAK_FIELDS)},
+            }
+            for i in range(len(bucket_starts))
+        ]
+        for start in range(0, len(aggregates), BULK_INSERT_CHUNK_SIZE):
+            db.execute(BiomechanicsAggregate.__table__.insert(), aggregates[start:start + BULK_INSERT_CHUNK_SIZE])
+        
+        if archive is None:
+            archive = BiomechanicsArchive(session_id=session_id)
+            db.add(archive)
+        archive.path = relative_path
+        archive.start_time, archive.end_time = epoch_to_datetimes(samples["timestamp"][[0, -1]])
+        archive.sample_count = len(samples["timestamp"])
+        archive.size_bytes = size
+        archive.archived_at = datetime.utcnow()
+        archive.valgus_threshold = HIGH_VALGUS_THRESHOLD
+        archive.impact_threshold = HIGH_IMPACT_THRESHOLD
+        archive.high_valgus_count = int(np.count_nonzero(samples["knee_valgus"] > HIGH_VALGUS_THRESHOLD))
+        archive.high_impact_count = int(np.count_nonzero(samples["ground_reaction_force"] > HIGH_IMPACT_THRESHOLD))
+        db.commit()
+    except Exception:
+        db.rollback()
+        os.remove(archive_file_path(relative_path))
+        raise
+    
+    if previous_path:
+        try:
+            os.remove(archive_file_path(previous_path))
+        except FileNotFoundError:
+            pass
+    moved["samples"] = len(samples["timestamp"]) - previous_count
+    moved["bytes"] = size
+    return moved
+
+def sessions_due_for_archive(db: Session, cutoff: datetime) -> List[int]:
+    """Sessions that ended (or, never closed, started) before cutoff and still have rows or blocks"""
+    ended = func.coalesce(TrainingSession.end_time, TrainingSession.start_time)
+    return db.scalars(
+        select(TrainingSession.id)
+        .where(ended < cutoff)
+        .where(or_(
+            select(BiomechanicsData.id).where(BiomechanicsData.session_id == TrainingSession.id).exists(),
+            select(BiomechanicsBlock.id).where(BiomechanicsBlock.session_id == TrainingSession.id).exists(),
+        ))
+        .order_by(TrainingSession.id)
+    ).all()
+
+class BiomechanicsRetention:
+    """Background job archiving sessions older than the retention age, every interval_seconds"""
+    
+    def __init__(self, retention_days: float, interval_seconds: float):
+        self.retention_days = retention_days
+        self.interval_seconds = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.sessions = 0
+        self.samples = 0
+        self.archive_bytes = 0
+        self.failed = 0
+        self.last_run: Optional[datetime] = None
+        self.durations_ms = deque(maxlen=1000)
+    
+    def start(self):
+        if self.retention_days > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop())
+    
+    async def _loop(self):
+        while True:
+            try:
+                await run_in_threadpool(self.run_once)
+            except Exception as e:
+                print(f"Error in biomechanics retention: {str(e)}")
+            await asyncio.sleep(self.interval_seconds)
+    
+    def run_once(self, retention_days: Optional[float] = None) -> Dict[str, int]:
+        """Archive every session past the retention age; returns sessions, samples and bytes archived"""
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days if retention_days is None else retention_days)
+        totals = {"sessions": 0, "samples": 0, "bytes": 0}
+        db = SessionLocal()
+        try:
+            session_ids = sessions_due_for_archive(db, cutoff)
+            db.rollback()
+            for session_id in session_ids:
+                started = time.perf_counter()
+                try:
+                    moved = archive_session_samples(db, session_id)
+                except Exception as e:
+                    self.failed += 1
+                    print(f"Error archiving biomechanics of session {session_id}: {str(e)}")
+                    continue
+                self.durations_ms.append((time.perf_counter() - started) * 1000)
+                if moved["samples"]:
+                    totals["sessions"] += 1
+                    totals["samples"] += moved["samples"]
+                    totals["bytes"] += moved["bytes"]
+        finally:
+            db.close()
+        self.runs += 1
+        self.last_run = datetime.utcnow()
+        self.sessions += totals["sessions"]
+        self.samples += totals["samples"]
+        self.archive_bytes += totals["bytes"]
+        return totals
+    
+    def metrics(self) -> Dict:
+        return {
+            "retention_days": self.retention_days,
+            "runs": self.runs,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "sessions": self.sessions,
+            "samples": self.samples,
+            "archive_bytes_per_sample": round(self.archive_bytes / self.samples, 2) if self.samples else None,
+            "failed": self.failed,
+            "timings": summarize_durations(self.durations_ms),
+        }
+    
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+biomechanics_retention = BiomechanicsRetention(BIOMECHANICS_RETENTION_DAYS, BIOMECHANICS_RETENTION_INTERVAL_SECONDS)
+metrics_sources["biomechanics_retention"] = biomechanics_retention.metrics
+
+@router.on_event("startup")
+async def start_biomechanics_retention():
+    biomechanics_retention.start()
+
+@router.on_event("shutdown")
+async def stop_biomechanics_retention():
+    biomechanics_retention.stop()
+
+# Reading samples
+def load_session_columns(db: Session, session_id: int, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None, archived: bool = True) -> BiomechanicsColumns:
+    """Read a session's samples as columns, ordered by time, without building ORM objects
+    
+    Archived samples (read from the archive file on demand, unless archived is False) and compacted
+    blocks overlapping start..end are merged with the session's remaining raw rows.
+    """
+    query = select(
+        BiomechanicsData.timestamp, BiomechanicsData.knee_angle, BiomechanicsData.hip_angle,
+        BiomechanicsData.ankle_angle, BiomechanicsData.knee_valgus, BiomechanicsData.ground_reaction_force,
+        BiomechanicsData.movement_type, BiomechanicsData.risk_score
+    ).where(BiomechanicsData.session_id == session_id)
+    if start is not None:
+        query = query.where(BiomechanicsData.timestamp >= start.replace(tzinfo=None))
+    if end is not None:
+        query = query.where(BiomechanicsData.timestamp <= end.replace(tzinfo=None))
+    rows = db.execute(query.order_by(BiomechanicsData.timestamp, BiomechanicsData.id)).all()
+    columns = list(zip(*rows)) if rows else [()] * 8
+    
+    def floats(values) -> np.ndarray:
+        return np.array(values, dtype=np.float64)
+    
+    raw = BiomechanicsColumns(
+        timestamps=list(columns[0]),
+        knee_angle=floats(columns[1]),
+        hip_angle=floats(columns[2]),
+        ankle_angle=floats(columns[3]),
+        knee_valgus=floats(columns[4]),
+        ground_reaction_force=floats(columns[5]),
+        movement_type=np.array(columns[6], dtype=object),
+        risk_score=floats(columns[7]),
+    )
+    parts = load_archived_samples(db, session_id, start, end) if archived else []
+    parts += load_block_samples(db, session_id, start, end)
+    if not parts:
+        return raw
+    if len(raw):
+        parts.append(columns_to_samples(raw))
+    return samples_to_columns(merge_samples(parts))
+
+# Sample parts: {"timestamp": int64 microseconds since the epoch, one array per BLOCK_FLOAT_FIELDS,
+# "movement_type": names (None for NULL)}, used to merge archived, compacted and raw samples
+def columns_to_samples(columns: BiomechanicsColumns) -> Dict[str, np.ndarray]:
+    return {
+        "timestamp": np.array(columns.timestamps, dtype="datetime64[us]").astype(np.int64),
+        **{field: getattr(columns, field) for field in BLOCK_FLOAT_FIELDS},
+        "movement_type": columns.movement_type,
+    }
+
+def samples_to_columns(samples: Dict[str, np.ndarray]) -> BiomechanicsColumns:
+    return BiomechanicsColumns(
+        timestamps=epoch_to_datetimes(samples["timestamp"]),
+        **{field: samples[field].astype(np.float64, copy=False) for field in BLOCK_FLOAT_FIELDS},
+        movement_type=samples["movement_type"].astype(object, copy=False),
+    )
+
+def merge_samples(parts: List[Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+    """Concatenate parts in time order; the sort is stable, so parts stored earlier (archive, then blocks,
+    then raw rows) keep their order at equal timestamps"""
+    epoch_us = np.concatenate([part["timestamp"] for part in parts])
+    order = np.argsort(epoch_us, kind="stable")
+    merged = {"timestamp": epoch_us[order]}
+    for field in BLOCK_FLOAT_FIELDS:
+        merged[field] = np.concatenate([part[field].astype(np.float64, copy=False) for part in parts])[order]
+    merged["movement_type"] = np.concatenate([part["movement_type"].astype(object, copy=False) for part in parts])[order]
+    return merged
+
+def trim_samples(samples: Dict[str, np.ndarray], start: Optional[datetime],
+                 end: Optional[datetime]) -> Dict[str, np.ndarray]:
+    keep = np.ones(len(samples["timestamp"]), dtype=bool)
+    if start is not None:
+        keep &= samples["timestamp"] >= np.datetime64(start.replace(tzinfo=None), "us").astype(np.int64)
+    if end is not None:
+        keep &= samples["timestamp"] <= np.datetime64(end.replace(tzinfo=None), "us").astype(np.int64)
+    if keep.all():
+        return samples
+    return {field: values[keep] for field, values in samples.items()}
+
+def load_block_samples(db: Session, session_id: int, start: Optional[datetime] = None,
+                       end: Optional[datetime] = None) -> List[Dict[str, np.ndarray]]:
+    """Decode a session's compacted blocks overlapping start..end, trimmed to that range, in time order"""
+    query = select(BiomechanicsBlock.start_time, BiomechanicsBlock.data).where(BiomechanicsBlock.session_id == session_id)
+    if start is not None:
+        query = query.where(BiomechanicsBlock.end_time >= start.replace(tzinfo=None))
+    if end is not None:
+        query = query.where(BiomechanicsBlock.start_time <= end.replace(tzinfo=None))
+    
+    blocks = []
+    for start_time, data in db.execute(query.order_by(BiomechanicsBlock.start_time, BiomechanicsBlock.id)):
+        block = decode_biomechanics_block(data)
+        block["timestamp"] = block["timestamp"] + np.datetime64(start_time, "us").astype(np.int64)
+        block = trim_samples(block, start, end)
+        block["movement_type"] = movement_types.names(block["movement_type"])
+        blocks.append(block)
+    return blocks
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Biomechanics compaction for Dear, Tear
+Moves the raw samples of closed sessions into compressed blocks, e.g. once after upgrading
+(sessions closed through the API are compacted automatically). With --archive, moves old
+sessions' samples out of the database into archive files instead.
+"""
+
+import argparse
+import sys
+import time
+
+# Import the engine from the API modules (uses DATABASE_URL like the API)
+sys.path.append('.')
+from sqlalchemy import select
+from database import SessionLocal, TrainingSession, BiomechanicsData
+from biomechanics_storage import (compact_session_samples, archive_session_samples, biomechanics_retention,
+                                  BIOMECHANICS_RETENTION_DAYS, BIOMECHANICS_ARCHIVE_DIR)
+
+def archive(session_ids: list, days: float):
+    started = time.perf_counter()
+    if session_ids:
+        totals = {"sessions": 0, "samples": 0, "bytes": 0}
+        db = SessionLocal()
+        try:
+            for session_id in session_ids:
+                moved = archive_session_samples(db, session_id)
+                totals["sessions"] += 1 if moved["samples"] else 0
+                totals["samples"] += moved["samples"]
+                totals["bytes"] += moved["bytes"]
+        finally:
+            db.close()
+    else:
+        totals = biomechanics_retention.run_once(days)
+    elapsed = time.perf_counter() - started
+
+    per_sample = totals["bytes"] / totals["samples"] if totals["samples"] else 0
+    print(f"✓ Archived {totals['samples']} samples from {totals['sessions']} sessions to {BIOMECHANICS_ARCHIVE_DIR} "
+          f"in {elapsed:.2f}s ({per_sample:.1f} bytes/sample)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact the biomechanics samples of closed sessions")
+    parser.add_argument("session_ids", nargs="*", type=int,
+                        help="Session IDs to compact (default: every closed session with raw samples)")
+    parser.add_argument("--archive", action="store_true",
+                        help="Archive the samples to files, keeping per-second aggregates in the database")
+    parser.add_argument("--days", type=float, default=BIOMECHANICS_RETENTION_DAYS or 90,
+                        help="With --archive and no session IDs: archive sessions older than this "
+                             "(default: BIOMECHANICS_RETENTION_DAYS, or 90)")
+    args = parser.parse_args()
+    if args.archive:
+        return archive(args.session_ids, args.days)
+
+    db = SessionLocal()
+    started = time.perf_counter()
+    totals = {"samples": 0, "blocks": 0, "bytes": 0}
+    try:
+        session_ids = args.session_ids or db.scalars(
+            select(TrainingSession.id)
+            .where(TrainingSession.end_time.isnot(None))
+            .where(select(BiomechanicsData.id).where(BiomechanicsData.session_id == TrainingSession.id).exists())
+            .order_by(TrainingSession.id)
+        ).all()
+        for session_id in session_ids:
+            moved = compact_session_samples(db, session_id)
+            for key in totals:
+                totals[key] += moved[key]
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - started
+
+    per_sample = totals["bytes"] / totals["samples"] if totals["samples"] else 0
+    print(f"✓ Compacted {totals['samples']} samples from {len(session_ids)} sessions into {totals['blocks']} blocks "
+          f"in {elapsed:.2f}s ({per_sample:.1f} bytes/sample)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,460 @@
+"""
+Database engine and sessions, ORM models and schema migrations
+"""
+
+from sqlalchemy import create_engine, inspect, text, event, Column, Integer, String, Float, DateTime, Boolean, Text, LargeBinary, ForeignKey, Index
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.pool import QueuePool
+from datetime import datetime
+from typing import Optional, Dict
+from enum import Enum
+import os
+import time
+import threading
+from collections import deque
+
+from runtime import DB_THREADPOOL_SIZE, metrics_sources, summarize_durations
+
+# Connection pool: DB_POOL_SIZE kept open plus DB_MAX_OVERFLOW on demand (together sized to the DB thread pool,
+# so threads do not queue for connections); a checkout waits at most DB_POOL_TIMEOUT seconds.
+# PostgreSQL connections are recycled after DB_POOL_RECYCLE seconds and pinged before reuse when DB_POOL_PRE_PING
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", str(max(DB_THREADPOOL_SIZE - DB_POOL_SIZE, 0))))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# SQLite: WAL lets readers run alongside the single writer and NORMAL sync only fsyncs at checkpoints
+# (safe against app crashes, may lose the last commits on power loss); writers wait SQLITE_BUSY_TIMEOUT_MS
+# for the lock instead of failing with "database is locked"
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+# Schema migrations (Alembic, see migrations/): applied at import unless DB_MIGRATE_ON_STARTUP is false,
+# e.g. when a release step runs `alembic upgrade head` once before starting several workers. Workers migrating
+# at once take turns (PostgreSQL advisory lock, SQLite write lock); other databases need the release step
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "true").lower() == "true"
+SCHEMA_REVISION = "0005_assessment_versions"  # latest revision in migrations/versions
+MIGRATION_LOCK_KEY = 0x41434C4D  # pg_advisory_xact_lock key serializing startup migrations
+
+# Database setup
+# Railway and other platforms provide DATABASE_URL automatically
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./aclguard.db")
+
+class PoolStats:
+    """Checkout wait times and timeouts, shared by every pool the engine (re)creates.
+    Updated from whichever thread checks a connection out, so every access holds the lock."""
+    
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_ms = deque(maxlen=1000)
+        self._lock = threading.Lock()
+    
+    def checked_out(self, wait_ms: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_ms.append(wait_ms)
+    
+    def timed_out(self):
+        with self._lock:
+            self.timeouts += 1
+    
+    def metrics(self) -> Dict:
+        with self._lock:
+            checkouts, timeouts, wait_ms = self.checkouts, self.timeouts, list(self.wait_ms)
+        return {"checkouts": checkouts, "timeouts": timeouts, "wait": summarize_durations(wait_ms)}
+
+pool_stats = PoolStats()
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_stats.timed_out()
+            raise
+        pool_stats.checked_out((time.perf_counter() - started) * 1000)
+        return connection
+
+def create_db_engine(url: str):
+    """Engine with the pool and connection settings of the database's profile"""
+    pool_options = dict(poolclass=InstrumentedQueuePool, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW,
+                        pool_timeout=DB_POOL_TIMEOUT)
+    
+    # Handle both PostgreSQL (production) and SQLite (development)
+    if url.startswith("postgres"):
+        # PostgreSQL connection
+        return create_engine(url, pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=DB_POOL_PRE_PING, **pool_options)
+    
+    # SQLite connection (local development)
+    in_memory = url.rstrip("/").endswith(":memory:") or url.rstrip("/") == "sqlite:"
+    sqlite_engine = create_engine(
+        url, connect_args={"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000},
+        **({} if in_memory else pool_options)
+    )
+    
+    @event.listens_for(sqlite_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if not in_memory:
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+    
+    return sqlite_engine
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+Base = declarative_base()
+
+# Dependency
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def db_pool_metrics() -> Dict:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    capacity = pool.size() + max(DB_MAX_OVERFLOW, 0)
+    return {
+        "size": pool.size(),
+        "max_overflow": DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "utilization": round(pool.checkedout() / capacity, 3) if capacity else None,
+        **pool_stats.metrics(),
+    }
+
+metrics_sources["db_pool"] = db_pool_metrics
+
+# Database Models
+class UserRole(str, Enum):
+    ATHLETE = "athlete"
+    COACH = "coach"
+    TRAINER = "trainer"
+    PROVIDER = "provider"
+    PARENT = "parent"
+    ADMIN = "admin"
+
+class User(Base):
+    __tablename__ = "users"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String, unique=True, index=True)
+    name = Column(String)
+    role = Column(String)
+    hashed_password = Column(String)
+    age = Column(Integer, nullable=True)
+    gender = Column(String, nullable=True)
+    bmi = Column(Float, nullable=True)
+    location = Column(String, nullable=True)  # Louisiana parish/city
+    is_rural = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    # Bumped in the same transaction as any change to the athlete's assessment inputs; every API worker checks
+    # it before serving a cached assessment
+    assessment_version = Column(Integer, nullable=False, default=0, server_default="0")
+    
+    # Relationships
+    sessions = relationship("TrainingSession", back_populates="athlete")
+    assessments = relationship("RiskAssessment", back_populates="athlete")
+    rehabilitation_plans = relationship("RehabilitationPlan", foreign_keys="RehabilitationPlan.athlete_id", back_populates="athlete")
+
+class TrainingSession(Base):
+    __tablename__ = "training_sessions"
+    __table_args__ = (
+        # An athlete's sessions newest first (session lists, recent sessions for risk assessment)
+        Index("ix_training_sessions_athlete_start", "athlete_id", "start_time"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    athlete_id = Column(Integer, ForeignKey("users.id"))
+    session_type = Column(String)  # practice, game, training
+    sport = Column(String)  # football, soccer, etc.
+    duration_minutes = Column(Integer)
+    start_time = Column(DateTime)
+    end_time = Column(DateTime)
+    
+    # Biomechanics data summary
+    high_risk_movements = Column(Integer, default=0)
+    avg_knee_valgus = Column(Float, nullable=True)
+    avg_landing_force = Column(Float, nullable=True)
+    peak_impact_force = Column(Float, nullable=True)
+    
+    athlete = relationship("User", back_populates="sessions")
+
+class SessionAnalytics(Base):
+    __tablename__ = "session_analytics"
+    
+    # Incrementally maintained rollup of a session's biomechanics samples
+    session_id = Column(Integer, ForeignKey("training_sessions.id"), primary_key=True)
+    sample_count = Column(Integer, default=0)
+    high_risk_count = Column(Integer, default=0)  # samples with risk_score > 0.7
+    knee_valgus_sum = Column(Float, default=0.0)
+    ground_reaction_force_sum = Column(Float, default=0.0)
+    peak_ground_reaction_force = Column(Float, nullable=True)
+    movement_types = Column(Text)  # JSON {movement_type: count}
+    muscle_totals = Column(Text)  # JSON {muscle: sum of per-sample activation}
+    muscle_peaks = Column(Text)  # JSON {muscle: peak activation}
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+class BiomechanicsData(Base):
+    __tablename__ = "biomechanics_data"
+    __table_args__ = (
+        # A session's samples in time order (session analysis, movement counts)
+        Index("ix_biomechanics_data_session_timestamp", "session_id", "timestamp", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("training_sessions.id"))
+    timestamp = Column(DateTime)
+    
+    # IMU sensor data (normalized)
+    knee_angle = Column(Float)
+    hip_angle = Column(Float)
+    ankle_angle = Column(Float)
+    knee_valgus = Column(Float)  # Critical for ACL risk
+    ground_reaction_force = Column(Float)
+    movement_type = Column(String)  # landing, cutting, pivoting, etc.
+    risk_score = Column(Float)  # 0-1
+
+class MovementType(Base):
+    __tablename__ = "movement_types"
+    
+    # Small-int codes for movement type names in compacted biomechanics blocks
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+class BiomechanicsBlock(Base):
+    __tablename__ = "biomechanics_blocks"
+    __table_args__ = (
+        # A session's blocks in time order (session analysis, movement counts)
+        Index("ix_biomechanics_blocks_session_start", "session_id", "start_time"),
+    )
+    
+    # Compacted samples of one session time range, stored column-wise (see encode_biomechanics_block)
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey("training_sessions.id"), nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+    
+    # High-risk sample counts at the thresholds in effect when the block was written
+    valgus_threshold = Column(Float, nullable=False)
+    impact_threshold = Column(Float, nullable=False)
+    high_valgus_count = Column(Integer, nullable=False)
+    high_impact_count = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+class BiomechanicsArchive(Base):
+    __tablename__ = "biomechanics_archives"
+    
+    # A session's samples moved to an archive file by the retention job (see archive_session_samples)
+    session_id = Column(Integer, ForeignKey("training_sessions.id"), primary_key=True)
+    path = Column(String, nullable=False)  # relative to BIOMECHANICS_ARCHIVE_DIR
+    start_time = Column(DateTime, nullable=False)
+    end_time = Column(DateTime, nullable=False)
+    sample_count = Column(Integer, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+    
+    # High-risk sample counts at the thresholds in effect when the archive was written
+    valgus_threshold = Column(Float, nullable=False)
+    impact_threshold = Column(Float, nullable=False)
+    high_valgus_count = Column(Integer, nullable=False)
+    high_impact_count = Column(Integer, nullable=False)
+
+class BiomechanicsAggregate(Base):
+    __tablename__ = "biomechanics_aggregates"
+    __table_args__ = (
+        # A session's seconds in time order (per-second timelines of archived sessions)
+        Index("ix_biomechanics_aggregates_session_bucket", "session_id", "bucket_start"),
+    )
+    
+    # Per-second, per-movement-type summary of archived samples: means, count and peaks
+    id = Column(Integer, primary_key=True)
+    session_id = Column(Integer, ForeignKey("training_sessions.id"), nullable=False)
+    bucket_start = Column(DateTime, nullable=False)
+    movement_type_id = Column(Integer, ForeignKey("movement_types.id"), nullable=True)
+    sample_count = Column(Integer, nullable=False)
+    knee_angle = Column(Float)
+    hip_angle = Column(Float)
+    ankle_angle = Column(Float)
+    knee_valgus = Column(Float)
+    ground_reaction_force = Column(Float)
+    risk_score = Column(Float)
+    peak_knee_valgus = Column(Float)
+    peak_ground_reaction_force = Column(Float)
+
+class RiskAssessment(Base):
+    __tablename__ = "risk_assessments"
+    __table_args__ = (
+        # Latest assessment per athlete (team heatmap, dashboards)
+        Index("ix_risk_assessments_athlete_date", "athlete_id", "assessment_date"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    athlete_id = Column(Integer, ForeignKey("users.id"))
+    assessment_date = Column(DateTime, default=datetime.utcnow)
+    
+    # Risk factors
+    overall_risk_score = Column(Float)  # 0-1
+    movement_pattern_risk = Column(Float)
+    demographic_risk = Column(Float)
+    health_history_risk = Column(Float)
+    
+    # Recommendations
+    recommendations = Column(Text)
+    focus_areas = Column(Text)  # JSON array
+    
+    athlete = relationship("User", back_populates="assessments")
+
+class InjuryHistory(Base):
+    __tablename__ = "injury_history"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    athlete_id = Column(Integer, ForeignKey("users.id"))
+    injury_type = Column(String)
+    injury_date = Column(DateTime)
+    recovery_status = Column(String)  # recovered, recovering, ongoing
+    notes = Column(Text)
+
+class RehabilitationPlan(Base):
+    __tablename__ = "rehabilitation_plans"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    athlete_id = Column(Integer, ForeignKey("users.id"))
+    provider_id = Column(Integer, ForeignKey("users.id"))
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    phase = Column(String)  # acute, recovery, return_to_sport
+    exercises = Column(Text)  # JSON array
+    duration_weeks = Column(Integer)
+    progress_percentage = Column(Float, default=0.0)
+    is_active = Column(Boolean, default=True)
+    
+    athlete = relationship("User", foreign_keys=[athlete_id], back_populates="rehabilitation_plans")
+    provider = relationship("User", foreign_keys=[provider_id])
+
+class XRayAnalysis(Base):
+    __tablename__ = "xray_analyses"
+    __table_args__ = (
+        # An athlete's X-ray history newest first
+        Index("ix_xray_analyses_athlete_uploaded", "athlete_id", "uploaded_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    athlete_id = Column(Integer, ForeignKey("users.id"))
+    image_path = Column(String)  # Path to stored image
+    uploaded_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Analysis results
+    has_fracture = Column(Boolean, default=False)
+    has_alignment_issue = Column(Boolean, default=False)
+    joint_spacing_abnormal = Column(Boolean, default=False)
+    severity = Column(String)  # normal|minor|moderate|severe|critical
+    triage_recommendation = Column(String)  # routine|urgent|emergency
+    
+    # Detailed findings (JSON stored as text)
+    findings = Column(Text)
+    educational_explanation = Column(Text)
+    confidence_score = Column(Float, nullable=True)
+    
+    # Integration
+    injury_history_id = Column(Integer, ForeignKey("injury_history.id"), nullable=True)
+
+class XRayImage(Base):
+    """One stored X-ray image per content hash, with its analysis reused by duplicate uploads"""
+    __tablename__ = "xray_images"
+    
+    sha256 = Column(String(64), primary_key=True)
+    image_path = Column(String)
+    content_type = Column(String, nullable=True)
+    size_bytes = Column(Integer)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    analysis_result = Column(Text, nullable=True)  # JSON from XRayAnalyzer.analyze_image
+
+# Cueing models
+class Cue(Base):
+    __tablename__ = "cues"
+    __table_args__ = (
+        # Cue lookup by context, then driver, then locale
+        Index("ix_cues_context_driver_locale", "movement_context", "risk_driver", "locale"),
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    text = Column(String)
+    modality = Column(String)  # audio|haptic|visual
+    movement_context = Column(String)  # landing|cutting|decelerating|pivoting
+    risk_driver = Column(String)  # valgus|grf|asymmetry|fatigue
+    culture_tags = Column(String, nullable=True)  # comma-separated
+    locale = Column(String, default="en-US")
+
+class CueEvent(Base):
+    __tablename__ = "cue_events"
+    id = Column(Integer, primary_key=True, index=True)
+    athlete_id = Column(Integer, ForeignKey("users.id"))
+    session_id = Column(Integer, ForeignKey("training_sessions.id"), nullable=True)
+    timestamp = Column(DateTime, default=datetime.utcnow)
+    movement_context = Column(String)
+    risk_driver = Column(String)
+    cue_id = Column(Integer, ForeignKey("cues.id"))
+    # simple outcome metrics placeholders
+    delta_valgus = Column(Float, nullable=True)
+    delta_grf = Column(Float, nullable=True)
+
+# Create tables
+def schema_revision(connection) -> Optional[str]:
+    if not inspect(connection).has_table("alembic_version"):
+        return None
+    return connection.scalar(text("SELECT version_num FROM alembic_version"))
+
+def migrate_database(revision: str = "head"):
+    """Bring the schema up to date with Alembic. Databases created before migrations existed are adopted
+    by the baseline revision, which only adds what they are missing."""
+    with engine.connect() as connection:
+        if revision == "head" and schema_revision(connection) == SCHEMA_REVISION:
+            return  # common case: skip loading Alembic
+    from alembic import command
+    from alembic.config import Config
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    config = Config(os.path.join(backend_dir, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(backend_dir, "migrations"))
+    if engine.dialect.name == "sqlite":
+        # BEGIN IMMEDIATE takes the write lock before Alembic reads the current revision, so other processes
+        # wait (SQLITE_BUSY_TIMEOUT_MS) and then find the schema current; SQLite DDL is transactional
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            dbapi_connection = connection.connection.dbapi_connection
+            try:
+                config.attributes["connection"] = connection
+                command.upgrade(config, revision)
+            except BaseException:
+                if dbapi_connection.in_transaction:
+                    connection.exec_driver_sql("ROLLBACK")
+                raise
+            if dbapi_connection.in_transaction:
+                connection.exec_driver_sql("COMMIT")
+        return
+    with engine.begin() as connection:
+        if engine.dialect.name == "postgresql":
+            # Held until this transaction commits; other workers then see the upgraded revision
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": MIGRATION_LOCK_KEY})
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+if DB_MIGRATE_ON_STARTUP:
+    migrate_database()
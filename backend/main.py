@@ -1,50 +1,74 @@
-from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect, Request, Query
+from fastapi.exceptions import RequestValidationError
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship, foreign
-from pydantic import BaseModel, EmailStr
-from datetime import datetime, timedelta
-from typing import List, Optional, Dict
-from enum import Enum
+from sqlalchemy import select, func, and_, case, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from pydantic import TypeAdapter, ValidationError
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Dict, Tuple, AsyncIterator
+from abc import ABC, abstractmethod
 import numpy as np
-from sklearn.ensemble import RandomForestClassifier
-import joblib
 import os
 import base64
-from PIL import Image
-import io
-from passlib.context import CryptContext
-from jose import JWTError, jwt
-import bcrypt
-try:
-    import cv2
-    CV2_AVAILABLE = True
-except ImportError:
-    CV2_AVAILABLE = False
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-# JWT settings
-SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production")
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-# Database setup
-# Railway and other platforms provide DATABASE_URL automatically
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./aclguard.db")
-
-# Handle both PostgreSQL (production) and SQLite (development)
-if SQLALCHEMY_DATABASE_URL.startswith("postgres"):
-    # PostgreSQL connection
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
-else:
-    # SQLite connection (local development)
-    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+import json
+import time
+import asyncio
+import threading
+import anyio
+import struct
+from array import array
+
+from runtime import (CPU_POOL_WORKERS, DB_THREADPOOL_SIZE, TTLCache, cpu_worker_ready, get_cpu_executor,
+                     lazy_init_lock, metrics_sources, shutdown_cpu_executor)
+from database import (BiomechanicsArchive, BiomechanicsBlock, BiomechanicsData, Cue, CueEvent, InjuryHistory,
+                      RehabilitationPlan, RiskAssessment, SessionAnalytics, SessionLocal, TrainingSession, User,
+                      UserRole, get_db)
+from schemas import (BiomechanicsDataPoint, CueCreate, CueEventCreate, CueOut, RiskAssessmentResponse,
+                     RosterAssessmentRequest, RosterAssessmentResult, TrainingSessionCreate, naive_utc)
+from auth import authenticate, router as auth_router
+from biomechanics_storage import (BIOMECHANICS_VALUE_FIELDS, BULK_INSERT_CHUNK_SIZE, HIGH_IMPACT_THRESHOLD,
+                                  HIGH_VALGUS_THRESHOLD, BiomechanicsColumns, aggregate_samples, columns_to_samples,
+                                  compact_after_close, decode_biomechanics_block, encode_movement_types,
+                                  epoch_to_datetimes, load_session_columns, load_session_seconds, read_archive,
+                                  samples_to_columns, score_biomechanics, router as biomechanics_router)
+from xray_storage import router as xray_storage_router
+from xray_jobs import get_xray_analyzer, load_cv2, router as xray_jobs_router
+
+# WebSocket write buffering
+# "buffered" flushes every WS_FLUSH_MAX_SAMPLES samples or WS_FLUSH_INTERVAL_MS, whichever comes first;
+# "sample" commits every received sample
+WS_DURABILITY_MODE = os.getenv("WS_DURABILITY_MODE", "buffered")
+WS_FLUSH_MAX_SAMPLES = int(os.getenv("WS_FLUSH_MAX_SAMPLES", "200"))
+WS_FLUSH_INTERVAL_MS = int(os.getenv("WS_FLUSH_INTERVAL_MS", "500"))
+
+# Live risk broadcast to coaches
+HUB_COALESCE_MS = int(os.getenv("HUB_COALESCE_MS", "100"))
+HUB_SUBSCRIBER_QUEUE_SIZE = int(os.getenv("HUB_SUBSCRIBER_QUEUE_SIZE", "256"))
+
+# Response caching (0 disables)
+HEATMAP_CACHE_TTL_SECONDS = float(os.getenv("HEATMAP_CACHE_TTL_SECONDS", "0"))
+
+# Load the risk model, X-ray libraries and process pool in the background at startup instead of on first use
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+
+# Movement risk: sessions per athlete that feed it (thresholds in biomechanics_storage)
+RISK_RECENT_SESSIONS = 10
+
+# Trained risk model: memory-mapped from RISK_MODEL_PATH when present (rule-based scoring otherwise),
+# reloaded when the file changes and scored in batches of RISK_MODEL_BATCH_SIZE
+RISK_MODEL_PATH = os.getenv("RISK_MODEL_PATH", "models/acl_risk_model.pkl")
+RISK_MODEL_RELOAD_SECONDS = float(os.getenv("RISK_MODEL_RELOAD_SECONDS", "5"))
+RISK_MODEL_BATCH_SIZE = int(os.getenv("RISK_MODEL_BATCH_SIZE", "4096"))
+
+# Batch roster assessment: athletes per process-pool task
+ROSTER_CHUNK_SIZE = int(os.getenv("ROSTER_CHUNK_SIZE", "500"))
+
+# Risk assessment caching: cached results are dropped when an athlete's inputs change or after the TTL;
+# a new RiskAssessment row is written only when the result changes or the last one is older than the interval
+ASSESSMENT_CACHE_TTL_SECONDS = float(os.getenv("ASSESSMENT_CACHE_TTL_SECONDS", "3600"))
+ASSESSMENT_PERSIST_INTERVAL_HOURS = float(os.getenv("ASSESSMENT_PERSIST_INTERVAL_HOURS", "24"))
 
 # FastAPI app
 app = FastAPI(title="Dear, Tear. API", version="1.0.0")
@@ -65,273 +89,120 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Security
-security = HTTPBearer()
-
-# Database Models
-class UserRole(str, Enum):
-    ATHLETE = "athlete"
-    COACH = "coach"
-    TRAINER = "trainer"
-    PROVIDER = "provider"
-    PARENT = "parent"
-    ADMIN = "admin"
-
-class User(Base):
-    __tablename__ = "users"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True)
-    name = Column(String)
-    role = Column(String)
-    hashed_password = Column(String)
-    age = Column(Integer, nullable=True)
-    gender = Column(String, nullable=True)
-    bmi = Column(Float, nullable=True)
-    location = Column(String, nullable=True)  # Louisiana parish/city
-    is_rural = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    # Relationships
-    sessions = relationship("TrainingSession", back_populates="athlete")
-    assessments = relationship("RiskAssessment", back_populates="athlete")
-    rehabilitation_plans = relationship("RehabilitationPlan", foreign_keys="RehabilitationPlan.athlete_id", back_populates="athlete")
-
-class TrainingSession(Base):
-    __tablename__ = "training_sessions"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    athlete_id = Column(Integer, ForeignKey("users.id"))
-    session_type = Column(String)  # practice, game, training
-    sport = Column(String)  # football, soccer, etc.
-    duration_minutes = Column(Integer)
-    start_time = Column(DateTime)
-    end_time = Column(DateTime)
-    
-    # Biomechanics data summary
-    high_risk_movements = Column(Integer, default=0)
-    avg_knee_valgus = Column(Float, nullable=True)
-    avg_landing_force = Column(Float, nullable=True)
-    peak_impact_force = Column(Float, nullable=True)
-    
-    athlete = relationship("User", back_populates="sessions")
-
-class BiomechanicsData(Base):
-    __tablename__ = "biomechanics_data"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("training_sessions.id"))
-    timestamp = Column(DateTime)
-    
-    # IMU sensor data (normalized)
-    knee_angle = Column(Float)
-    hip_angle = Column(Float)
-    ankle_angle = Column(Float)
-    knee_valgus = Column(Float)  # Critical for ACL risk
-    ground_reaction_force = Column(Float)
-    movement_type = Column(String)  # landing, cutting, pivoting, etc.
-    risk_score = Column(Float)  # 0-1
-
-class RiskAssessment(Base):
-    __tablename__ = "risk_assessments"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    athlete_id = Column(Integer, ForeignKey("users.id"))
-    assessment_date = Column(DateTime, default=datetime.utcnow)
-    
-    # Risk factors
-    overall_risk_score = Column(Float)  # 0-1
-    movement_pattern_risk = Column(Float)
-    demographic_risk = Column(Float)
-    health_history_risk = Column(Float)
-    
-    # Recommendations
-    recommendations = Column(Text)
-    focus_areas = Column(Text)  # JSON array
-    
-    athlete = relationship("User", back_populates="assessments")
-
-class InjuryHistory(Base):
-    __tablename__ = "injury_history"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    athlete_id = Column(Integer, ForeignKey("users.id"))
-    injury_type = Column(String)
-    injury_date = Column(DateTime)
-    recovery_status = Column(String)  # recovered, recovering, ongoing
-    notes = Column(Text)
-
-class RehabilitationPlan(Base):
-    __tablename__ = "rehabilitation_plans"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    athlete_id = Column(Integer, ForeignKey("users.id"))
-    provider_id = Column(Integer, ForeignKey("users.id"))
-    created_at = Column(DateTime, default=datetime.utcnow)
-    
-    phase = Column(String)  # acute, recovery, return_to_sport
-    exercises = Column(Text)  # JSON array
-    duration_weeks = Column(Integer)
-    progress_percentage = Column(Float, default=0.0)
-    is_active = Column(Boolean, default=True)
-    
-    athlete = relationship("User", foreign_keys=[athlete_id], back_populates="rehabilitation_plans")
-    provider = relationship("User", foreign_keys=[provider_id])
-
-class XRayAnalysis(Base):
-    __tablename__ = "xray_analyses"
-    
-    id = Column(Integer, primary_key=True, index=True)
-    athlete_id = Column(Integer, ForeignKey("users.id"))
-    image_path = Column(String)  # Path to stored image
-    uploaded_at = Column(DateTime, default=datetime.utcnow)
-    
-    # Analysis results
-    has_fracture = Column(Boolean, default=False)
-    has_alignment_issue = Column(Boolean, default=False)
-    joint_spacing_abnormal = Column(Boolean, default=False)
-    severity = Column(String)  # normal|minor|moderate|severe|critical
-    triage_recommendation = Column(String)  # routine|urgent|emergency
-    
-    # Detailed findings (JSON stored as text)
-    findings = Column(Text)
-    educational_explanation = Column(Text)
-    confidence_score = Column(Float, nullable=True)
-    
-    # Integration
-    injury_history_id = Column(Integer, ForeignKey("injury_history.id"), nullable=True)
-
-# Cueing models
-class Cue(Base):
-    __tablename__ = "cues"
-    id = Column(Integer, primary_key=True, index=True)
-    text = Column(String)
-    modality = Column(String)  # audio|haptic|visual
-    movement_context = Column(String)  # landing|cutting|decelerating|pivoting
-    risk_driver = Column(String)  # valgus|grf|asymmetry|fatigue
-    culture_tags = Column(String, nullable=True)  # comma-separated
-    locale = Column(String, default="en-US")
-
-class CueEvent(Base):
-    __tablename__ = "cue_events"
-    id = Column(Integer, primary_key=True, index=True)
-    athlete_id = Column(Integer, ForeignKey("users.id"))
-    session_id = Column(Integer, ForeignKey("training_sessions.id"), nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    movement_context = Column(String)
-    risk_driver = Column(String)
-    cue_id = Column(Integer, ForeignKey("cues.id"))
-    # simple outcome metrics placeholders
-    delta_valgus = Column(Float, nullable=True)
-    delta_grf = Column(Float, nullable=True)
-
-# Create tables
-Base.metadata.create_all(bind=engine)
-
-# Pydantic Models
-class UserCreate(BaseModel):
-    email: EmailStr
-    name: str
-    password: str
-    role: UserRole
-    age: Optional[int] = None
-    gender: Optional[str] = None
-    bmi: Optional[float] = None
-    location: Optional[str] = None
-    is_rural: bool = False
-
-class UserLogin(BaseModel):
-    email: EmailStr
-    password: str
-
-class Token(BaseModel):
-    access_token: str
-    token_type: str
-    user_id: int
-    role: str
-    name: str
-
-class TokenData(BaseModel):
-    email: Optional[str] = None
-
-class TrainingSessionCreate(BaseModel):
-    athlete_id: int
-    session_type: str
-    sport: str
-    duration_minutes: int
-    start_time: datetime
-
-class BiomechanicsDataPoint(BaseModel):
-    timestamp: datetime
-    knee_angle: float
-    hip_angle: float
-    ankle_angle: float
-    knee_valgus: float
-    ground_reaction_force: float
-    movement_type: str
-
-class RiskAssessmentResponse(BaseModel):
-    overall_risk_score: float
-    movement_pattern_risk: float
-    demographic_risk: float
-    health_history_risk: float
-    recommendations: str
-    focus_areas: List[str]
-
-class CueCreate(BaseModel):
-    text: str
-    modality: str
-    movement_context: str
-    risk_driver: str
-    culture_tags: Optional[str] = None
-    locale: str = "en-US"
-
-class CueOut(BaseModel):
-    id: int
-    text: str
-    modality: str
-    movement_context: str
-    risk_driver: str
-    culture_tags: Optional[str]
-    locale: str
-
-class CueEventCreate(BaseModel):
-    athlete_id: int
-    session_id: Optional[int] = None
-    movement_context: str
-    risk_driver: str
-    cue_id: int
-    delta_valgus: Optional[float] = None
-    delta_grf: Optional[float] = None
-
-class XRayAnalysisResponse(BaseModel):
-    id: int
-    athlete_id: int
-    has_fracture: bool
-    has_alignment_issue: bool
-    joint_spacing_abnormal: bool
-    severity: str
-    triage_recommendation: str
-    findings: str
-    educational_explanation: str
-    confidence_score: Optional[float]
-    uploaded_at: datetime
+# Security: every route resolves the caller from its bearer token (see auth.get_current_user); routers
+# only pick up app dependencies when included, so this comes first
+app.router.dependencies.append(Depends(authenticate))
+
+# Subsystem routes and their startup/shutdown hooks
+for subsystem_router in (auth_router, biomechanics_router, xray_storage_router, xray_jobs_router):
+    app.include_router(subsystem_router)
+
+@app.on_event("startup")
+async def configure_thread_pool():
+    # Sync endpoints, sync dependencies and run_in_threadpool all share this limiter
+    anyio.to_thread.current_default_thread_limiter().total_tokens = DB_THREADPOOL_SIZE
+
+@app.on_event("shutdown")
+async def stop_cpu_executor():
+    await shutdown_cpu_executor()
+
+@app.get("/metrics")
+def get_metrics():
+    """Current queue depths, concurrency and timings per subsystem"""
+    return {name: source() for name, source in metrics_sources.items()}
 
 # AI Risk Assessment Model
+RISK_MODEL_FEATURES = ["female", "age", "bmi", "rural", "high_valgus_rate", "high_impact_rate", "log_movements"]
+
+def risk_features(gender: np.ndarray, age: np.ndarray, bmi: np.ndarray, is_rural: np.ndarray,
+                  high_valgus_count: np.ndarray, high_impact_count: np.ndarray,
+                  total_movements: np.ndarray) -> np.ndarray:
+    """Model feature matrix (RISK_MODEL_FEATURES columns, one row per athlete); missing age/BMI are NaN"""
+    total = np.asarray(total_movements, dtype=np.float64)
+    observed = np.maximum(total, 1.0)
+    return np.column_stack([
+        (gender == "female").astype(np.float64),
+        np.nan_to_num(age, nan=-1.0),
+        np.nan_to_num(bmi, nan=-1.0),
+        np.asarray(is_rural, dtype=np.float64),
+        high_valgus_count / observed,
+        high_impact_count / observed,
+        np.log1p(total),
+    ])
+
 class ACLRiskAssessmentModel:
-    def __init__(self):
-        # In production, load a trained model
-        # For now, use a simple rule-based approach
-        self.model = None
+    def __init__(self, valgus_threshold: float = HIGH_VALGUS_THRESHOLD,
+                 impact_threshold: float = HIGH_IMPACT_THRESHOLD, model_path: str = RISK_MODEL_PATH):
+        # Trained model if one has been fitted (see train_risk_model.py), otherwise rule-based; held as
+        # (model, predict_proba column of the positive class) so readers see both from the same file
+        self._predictor: Optional[Tuple[object, int]] = None
+        self.model_path = model_path
+        self.valgus_threshold = valgus_threshold
+        self.impact_threshold = impact_threshold
+        self._model_signature = None
+        self._reload_lock = threading.Lock()
+        self._next_reload_check = time.monotonic() + RISK_MODEL_RELOAD_SECONDS
         self.load_model()
     
-    def load_model(self):
-        model_path = "models/acl_risk_model.pkl"
-        if os.path.exists(model_path):
-            self.model = joblib.load(model_path)
+    def load_model(self) -> bool:
+        """Load the model file if it changed; returns True when the active model was replaced"""
+        try:
+            stat = os.stat(self.model_path)
+        except FileNotFoundError:
+            replaced = self._predictor is not None
+            self._predictor, self._model_signature = None, None
+            return replaced
+        
+        signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        if signature == self._model_signature:
+            return False
+        try:
+            import joblib
+            # Read-only memory map: every worker loading the same file shares its array pages
+            model = joblib.load(self.model_path, mmap_mode="r")
+        except Exception as e:
+            print(f"Error loading risk model {self.model_path}: {str(e)}")
+            return False
+        self._model_signature = signature
+        classes = list(getattr(model, "classes_", []))
+        if getattr(model, "n_features_in_", None) != len(RISK_MODEL_FEATURES):
+            print(f"Ignoring risk model {self.model_path}: expected {len(RISK_MODEL_FEATURES)} features")
+            self._predictor = None
+        elif 1 not in classes:
+            print(f"Ignoring risk model {self.model_path}: no injury (1) class among {classes}")
+            self._predictor = None
         else:
-            # Initialize with default parameters
-            self.model = RandomForestClassifier(n_estimators=100, random_state=42)
+            self._predictor = (model, classes.index(1))
+        return True
+    
+    @property
+    def model(self):
+        return self._predictor[0] if self._predictor is not None else None
+    
+    def reload_if_changed(self):
+        """Hot-reload the model file, checking at most every RISK_MODEL_RELOAD_SECONDS"""
+        now = time.monotonic()
+        if now < self._next_reload_check:
+            return
+        with self._reload_lock:
+            if now < self._next_reload_check:
+                return
+            self._next_reload_check = now + RISK_MODEL_RELOAD_SECONDS
+            if self.load_model():
+                assessment_cache.clear()
+    
+    def predict_overall_risk(self, features: np.ndarray) -> Optional[np.ndarray]:
+        """Injury probability per feature row from the trained model; None when no model is loaded"""
+        self.reload_if_changed()
+        if self._predictor is None:
+            return None
+        
+        model, positive = self._predictor
+        probabilities = np.empty(len(features))
+        for start in range(0, len(features), RISK_MODEL_BATCH_SIZE):
+            stop = start + RISK_MODEL_BATCH_SIZE
+            probabilities[start:stop] = model.predict_proba(features[start:stop])[:, positive]
+        return probabilities
     
     def calculate_demographic_risk(self, user: User) -> float:
         """Calculate risk based on demographics"""
@@ -358,37 +229,76 @@ class ACLRiskAssessmentModel:
         
         return min(risk, 1.0)
     
-    def calculate_movement_risk(self, biomechanics_data: List[BiomechanicsData]) -> float:
-        """Calculate risk based on movement patterns"""
-        if not biomechanics_data:
+    def movement_risk_from_counts(self, high_valgus_count: int, high_impact_count: int,
+                                  total_movements: int) -> float:
+        """Movement risk from high-risk sample counts"""
+        if total_movements == 0:
             return 0.5  # Default moderate risk
         
-        valgus_values = [d.knee_valgus for d in biomechanics_data]
-        high_valgus_count = sum(1 for v in valgus_values if v > 15.0)  # Degrees
-        
-        impact_forces = [d.ground_reaction_force for d in biomechanics_data]
-        high_impact_count = sum(1 for f in impact_forces if f > 3.0)  # Body weight multiples
-        
         high_risk_movements = high_valgus_count + high_impact_count
-        total_movements = len(biomechanics_data)
+        return min(high_risk_movements / total_movements, 1.0)
+    
+    def movement_counts(self, biomechanics_data) -> Tuple[int, int, int]:
+        """(high_valgus, high_impact, total) over rows or column arrays with NumPy"""
+        if isinstance(biomechanics_data, list):
+            n = len(biomechanics_data)
+            valgus_values = np.fromiter((np.nan if d.knee_valgus is None else d.knee_valgus
+                                         for d in biomechanics_data), dtype=np.float64, count=n)
+            impact_forces = np.fromiter((np.nan if d.ground_reaction_force is None else d.ground_reaction_force
+                                         for d in biomechanics_data), dtype=np.float64, count=n)
+        else:
+            valgus_values = np.asarray(biomechanics_data.knee_valgus, dtype=np.float64)
+            impact_forces = np.asarray(biomechanics_data.ground_reaction_force, dtype=np.float64)
         
-        if total_movements == 0:
-            return 0.5
+        return (
+            int(np.count_nonzero(valgus_values > self.valgus_threshold)),
+            int(np.count_nonzero(impact_forces > self.impact_threshold)),
+            len(valgus_values)
+        )
+    
+    def query_movement_counts(self, db: Session, session_ids: List[int]) -> Tuple[int, int, int]:
+        """(high_valgus, high_impact, total) from aggregate queries that only return counts"""
+        if not session_ids:
+            return 0, 0, 0
         
-        risk_score = min(high_risk_movements / total_movements, 1.0)
-        return risk_score
+        sessions = select(
+            TrainingSession.id.label("session_id"), TrainingSession.athlete_id.label("key")
+        ).where(TrainingSession.id.in_(session_ids)).subquery()
+        counts = movement_counts_by(db, sessions, self.valgus_threshold, self.impact_threshold)
+        high_valgus, high_impact, total = np.sum(list(counts.values()) or [[0, 0, 0]], axis=0).tolist()
+        return high_valgus, high_impact, total
+    
+    def calculate_movement_risk(self, biomechanics_data) -> float:
+        """Calculate risk based on movement patterns (NumPy path over rows or column arrays)"""
+        return self.movement_risk_from_counts(*self.movement_counts(biomechanics_data))
     
-    def assess_risk(self, user: User, recent_sessions: List[TrainingSession], 
-                    recent_biomechanics: List[BiomechanicsData]) -> RiskAssessmentResponse:
+    def query_movement_risk(self, db: Session, session_ids: List[int]) -> float:
+        """Calculate movement risk with an aggregate query that only returns counts"""
+        return self.movement_risk_from_counts(*self.query_movement_counts(db, session_ids))
+    
+    def assess_risk(self, user: User, recent_sessions: List[TrainingSession], recent_biomechanics=None,
+                    movement_counts: Optional[Tuple[int, int, int]] = None) -> RiskAssessmentResponse:
         """Comprehensive risk assessment"""
+        if movement_counts is None:
+            movement_counts = self.movement_counts(recent_biomechanics or [])
+        high_valgus, high_impact, total = movement_counts
         demographic_risk = self.calculate_demographic_risk(user)
-        movement_risk = self.calculate_movement_risk(recent_biomechanics)
+        movement_risk = self.movement_risk_from_counts(high_valgus, high_impact, total)
         
         # Health history risk (simplified - would query injury_history in production)
         health_risk = 0.1  # Default low
         
-        # Weighted overall risk
+        # Weighted overall risk, or the trained model's injury probability when one is loaded
         overall_risk = (demographic_risk * 0.3 + movement_risk * 0.5 + health_risk * 0.2)
+        predicted = self.predict_overall_risk(risk_features(
+            np.array([user.gender], dtype=object),
+            np.array([np.nan if user.age is None else user.age], dtype=np.float64),
+            np.array([np.nan if user.bmi is None else user.bmi], dtype=np.float64),
+            np.array([bool(user.is_rural)]),
+            np.array([high_valgus]), np.array([high_impact]), np.array([total])
+        ))
+        if predicted is not None:
+            overall_risk = float(predicted[0])
         
         # Generate recommendations
         recommendations = self.generate_recommendations(overall_risk, movement_risk, demographic_risk)
@@ -403,6 +313,36 @@ class ACLRiskAssessmentModel:
             focus_areas=focus_areas
         )
     
+    def assess_roster(self, gender: np.ndarray, age: np.ndarray, bmi: np.ndarray, is_rural: np.ndarray,
+                      high_valgus_count: np.ndarray, high_impact_count: np.ndarray,
+                      total_movements: np.ndarray) -> Dict[str, np.ndarray]:
+        """Vectorized assess_risk over a roster; missing age/BMI are NaN"""
+        demographic_risk = np.zeros(len(gender))
+        demographic_risk += np.where(gender == "female", 0.25, 0.0)
+        demographic_risk += np.where((age >= 15) & (age <= 18), 0.15, 0.0)
+        demographic_risk += np.where(bmi >= 30, 0.20, np.where(bmi >= 25, 0.10, 0.0))
+        demographic_risk += np.where(is_rural, 0.10, 0.0)
+        demographic_risk = np.minimum(demographic_risk, 1.0)
+        
+        high_risk_movements = high_valgus_count + high_impact_count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            movement_risk = np.where(
+                total_movements == 0, 0.5, np.minimum(high_risk_movements / total_movements, 1.0)
+            )
+        
+        health_risk = np.full(len(gender), 0.1)
+        overall_risk = self.predict_overall_risk(risk_features(
+            gender, age, bmi, is_rural, high_valgus_count, high_impact_count, total_movements
+        ))
+        if overall_risk is None:
+            overall_risk = demographic_risk * 0.3 + movement_risk * 0.5 + health_risk * 0.2
+        return {
+            "overall_risk_score": overall_risk,
+            "movement_pattern_risk": movement_risk,
+            "demographic_risk": demographic_risk,
+            "health_history_risk": health_risk,
+        }
+    
     def generate_recommendations(self, overall_risk: float, movement_risk: float, 
                                 demographic_risk: float) -> str:
         """Generate personalized recommendations"""
@@ -438,58 +378,219 @@ class ACLRiskAssessmentModel:
         
         return areas
 
-# Initialize AI model
-risk_model = ACLRiskAssessmentModel()
+# AI model, built on first use
+_risk_model: Optional[ACLRiskAssessmentModel] = None
 
-# Dependency
-def get_db():
-    db = SessionLocal()
+def get_risk_model() -> ACLRiskAssessmentModel:
+    global _risk_model
+    if _risk_model is None:
+        with lazy_init_lock:
+            if _risk_model is None:
+                _risk_model = ACLRiskAssessmentModel()
+    return _risk_model
+
+# Risk assessment cache: athlete_id -> (User.assessment_version it was computed at, assessment). Changes to an
+# athlete's sessions, biomechanics, injury history or demographics bump the version in the database, so cached
+# assessments go stale in every worker, and the writing worker also drops its copy on commit
+assessment_cache = TTLCache(maxsize=10000, ttl_seconds=ASSESSMENT_CACHE_TTL_SECONDS)
+
+def mark_assessment_inputs_changed(db: Session, athlete_id: Optional[int]):
+    """Bump the athlete's assessment version when this DB session commits (and drop the local copy after)"""
+    if athlete_id is not None:
+        db.info.setdefault("assessment_inputs_changed", set()).add(athlete_id)
+
+@event.listens_for(Session, "after_flush")
+def _track_assessment_inputs(db: Session, flush_context):
+    for obj in list(db.new) + list(db.dirty) + list(db.deleted):
+        if isinstance(obj, (TrainingSession, InjuryHistory)):
+            mark_assessment_inputs_changed(db, obj.athlete_id)
+    for obj in db.dirty:
+        if isinstance(obj, User):
+            mark_assessment_inputs_changed(db, obj.id)
+
+@event.listens_for(Session, "before_commit")
+def _bump_assessment_versions(db: Session):
+    db.flush()  # track ORM changes still pending in this commit
+    changed = db.info.get("assessment_inputs_changed")
+    if changed:
+        users = User.__table__
+        db.execute(users.update().where(users.c.id.in_(sorted(changed)))
+                   .values(assessment_version=users.c.assessment_version + 1))
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_assessments(db: Session):
+    for athlete_id in db.info.pop("assessment_inputs_changed", ()):
+        assessment_cache.pop(athlete_id)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_assessments(db: Session):
+    db.info.pop("assessment_inputs_changed", None)
+
+# Upload formats for POST /sessions/{session_id}/biomechanics
+NDJSON_CONTENT_TYPES = {"application/x-ndjson", "application/jsonl"}
+BINARY_CONTENT_TYPES = {"application/x-biomechanics-f32", "application/octet-stream"}
+
+# Packed little-endian record stream:
+#   header  b"BIO2" | float64 base epoch seconds (UTC) | uint8 n_types | n_types x (uint8 len, utf-8 name)
+#   records int64 microseconds since base, five float32 values, uint8 movement type code (29 bytes each)
+# b"BIO1" streams (float32 seconds since base, 25-byte records) are still accepted; their offsets lose
+# precision as captures grow (about 1 ms after three hours), so new clients should send BIO2.
+BINARY_RECORD_DTYPES = {
+    b"BIO1": np.dtype([("t", "<f4")] + [(field, "<f4") for field in BIOMECHANICS_VALUE_FIELDS] + [("movement_type", "u1")]),
+    b"BIO2": np.dtype([("t", "<i8")] + [(field, "<f4") for field in BIOMECHANICS_VALUE_FIELDS] + [("movement_type", "u1")]),
+}
+
+_data_points_adapter = TypeAdapter(List[BiomechanicsDataPoint])
+
+def parse_biomechanics_json(payload: bytes) -> BiomechanicsColumns:
+    """Parse the original JSON array of data points"""
     try:
-        yield db
-    finally:
-        db.close()
+        points = _data_points_adapter.validate_json(payload)
+    except ValidationError as e:
+        # Same error shape as a declared List[BiomechanicsDataPoint] body parameter
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)])
+    return BiomechanicsColumns.from_points(points)
 
-# Password hashing functions
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
+def parse_biomechanics_binary(payload: bytes) -> BiomechanicsColumns:
+    """Parse a packed float32 record stream straight into arrays"""
     try:
-        password_bytes = plain_password.encode('utf-8')[:72]  # Truncate to 72 bytes
-        return bcrypt.checkpw(password_bytes, hashed_password.encode('utf-8'))
-    except Exception:
-        return False
-
-def get_password_hash(password: str) -> str:
-    """Hash a password (bcrypt has a 72 byte limit, so we truncate if needed)"""
-    # Bcrypt has a 72 byte limit - ensure password fits
-    if isinstance(password, str):
-        password_bytes = password.encode('utf-8')
-        if len(password_bytes) > 72:
-            # Truncate to 72 bytes exactly
-            password = password_bytes[:72].decode('utf-8', errors='ignore')
-            # Ensure it's exactly 72 bytes or less
-            while len(password.encode('utf-8')) > 72:
-                password = password[:-1]
-    # Use bcrypt directly to ensure proper handling
-    salt = bcrypt.gensalt()
-    password_bytes = password.encode('utf-8')[:72]  # Final truncation to 72 bytes
-    hashed = bcrypt.hashpw(password_bytes, salt)
-    return hashed.decode('utf-8')
-
-# JWT token functions
-def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Create a JWT access token"""
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
+        record_dtype = BINARY_RECORD_DTYPES.get(payload[:4])
+        if record_dtype is None:
+            raise ValueError("bad magic")
+        (base_epoch,) = struct.unpack_from("<d", payload, 4)
+        offset = 12
+        n_types = payload[offset]
+        offset += 1
+        categories = []
+        for _ in range(n_types):
+            length = payload[offset]
+            categories.append(payload[offset + 1:offset + 1 + length].decode("utf-8"))
+            offset += 1 + length
+        records = np.frombuffer(payload, dtype=record_dtype, offset=offset)
+    except (ValueError, IndexError, struct.error, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=422, detail=f"Invalid binary biomechanics payload: {str(e)}")
+    
+    offsets_us = records["t"]
+    if offsets_us.dtype.kind == "f":
+        offsets_us = np.round(offsets_us.astype(np.float64) * 1e6)
+    epoch_us = np.int64(round(base_epoch * 1e6)) + offsets_us.astype(np.int64)
+    return BiomechanicsColumns.from_codes(
+        timestamps=epoch_to_datetimes(epoch_us),
+        values={field: records[field].astype(np.float64) for field in BIOMECHANICS_VALUE_FIELDS},
+        movement_codes=records["movement_type"],
+        movement_categories=categories,
+    )
 
-def get_user_by_email(db: Session, email: str):
-    """Get user by email"""
-    return db.query(User).filter(User.email == email).first()
+async def parse_biomechanics_ndjson(stream: AsyncIterator[bytes]) -> BiomechanicsColumns:
+    """Parse newline-delimited JSON objects incrementally as the body streams in"""
+    timestamps: List[datetime] = []
+    values = {field: array("d") for field in BIOMECHANICS_VALUE_FIELDS}
+    codes = array("H")
+    categories: Dict[str, int] = {}
+    line_number = 0
+    
+    def add_line(line: bytes):
+        nonlocal line_number
+        line_number += 1
+        if not line.strip():
+            return
+        try:
+            record = json.loads(line)
+            timestamp = record["timestamp"]
+            if isinstance(timestamp, (int, float)):
+                timestamp = datetime.fromtimestamp(timestamp, timezone.utc)
+            else:
+                timestamp = datetime.fromisoformat(timestamp)
+            timestamp = naive_utc(timestamp)
+            row = [float(record[field]) for field in BIOMECHANICS_VALUE_FIELDS]
+            movement_type = str(record["movement_type"])
+        except (ValueError, KeyError, TypeError, OverflowError, OSError) as e:
+            raise HTTPException(status_code=422, detail=f"Invalid NDJSON record on line {line_number}: {str(e)}")
+        timestamps.append(timestamp)
+        for field, value in zip(BIOMECHANICS_VALUE_FIELDS, row):
+            values[field].append(value)
+        codes.append(categories.setdefault(movement_type, len(categories)))
+    
+    pending = b""
+    async for chunk in stream:
+        pending += chunk
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            add_line(line)
+    add_line(pending)
+    
+    return BiomechanicsColumns.from_codes(
+        timestamps=timestamps,
+        values={field: np.frombuffer(values[field], dtype=np.float64) for field in BIOMECHANICS_VALUE_FIELDS},
+        movement_codes=np.frombuffer(codes, dtype=np.uint16),
+        movement_categories=list(categories),
+    )
+
+BIOMECHANICS_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": _data_points_adapter.json_schema()},
+            "application/x-ndjson": {"schema": {"type": "string", "description": "One BiomechanicsDataPoint object per line"}},
+            "application/x-biomechanics-f32": {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+def bulk_insert_biomechanics(db: Session, session_id: int, columns: BiomechanicsColumns,
+                             risk_scores: np.ndarray):
+    """Insert samples with executemany in bounded chunks (no ORM identity map)"""
+    table = BiomechanicsData.__table__
+    for start in range(0, len(columns), BULK_INSERT_CHUNK_SIZE):
+        stop = start + BULK_INSERT_CHUNK_SIZE
+        rows = [
+            {
+                "session_id": session_id,
+                "timestamp": timestamp,
+                "knee_angle": knee_angle,
+                "hip_angle": hip_angle,
+                "ankle_angle": ankle_angle,
+                "knee_valgus": knee_valgus,
+                "ground_reaction_force": grf,
+                "movement_type": movement_type,
+                "risk_score": risk_score,
+            }
+            for timestamp, knee_angle, hip_angle, ankle_angle, knee_valgus, grf, movement_type, risk_score in zip(
+                columns.timestamps[start:stop],
+                columns.knee_angle[start:stop].tolist(),
+                columns.hip_angle[start:stop].tolist(),
+                columns.ankle_angle[start:stop].tolist(),
+                columns.knee_valgus[start:stop].tolist(),
+                columns.ground_reaction_force[start:stop].tolist(),
+                columns.movement_type[start:stop].tolist(),
+                risk_scores[start:stop].tolist(),
+            )
+        ]
+        db.execute(table.insert(), rows)
+
+def store_biomechanics(db: Session, session_id: int, columns: BiomechanicsColumns) -> int:
+    """Score and insert a batch and fold it into the session rollup; returns high-risk count"""
+    risk_scores, high_risk_count = score_biomechanics(columns.knee_valgus, columns.ground_reaction_force)
+    bulk_insert_biomechanics(db, session_id, columns, risk_scores)
+    update_session_rollup(db, session_id, columns, risk_scores)
+    if len(columns):
+        athlete_id = db.query(TrainingSession.athlete_id).filter(TrainingSession.id == session_id).scalar()
+        mark_assessment_inputs_changed(db, athlete_id)
+    return high_risk_count
+
+def ingest_biomechanics(db: Session, session: TrainingSession, columns: BiomechanicsColumns) -> int:
+    """Score, store and summarize a batch in one vectorized pass; returns high-risk count"""
+    high_risk_count = store_biomechanics(db, session.id, columns)
+    
+    # Update session summary
+    session.high_risk_movements = high_risk_count
+    if len(columns):
+        session.avg_knee_valgus = float(columns.knee_valgus.mean())
+        session.peak_impact_force = float(columns.ground_reaction_force.max())
+        session.avg_landing_force = float(columns.ground_reaction_force.mean())
+    
+    return high_risk_count
 
 # API Endpoints
 
@@ -499,7 +600,7 @@ async def root():
 
 # --- Cue APIs ---
 @app.get("/cues", response_model=List[CueOut])
-async def list_cues(
+def list_cues(
     context: Optional[str] = None,
     driver: Optional[str] = None,
     locale: Optional[str] = None,
@@ -519,7 +620,7 @@ async def list_cues(
     ) for r in rows]
 
 @app.post("/cues", response_model=CueOut)
-async def create_cue(cue: CueCreate, db: Session = Depends(get_db)):
+def create_cue(cue: CueCreate, db: Session = Depends(get_db)):
     row = Cue(**cue.dict())
     db.add(row)
     db.commit()
@@ -530,299 +631,91 @@ async def create_cue(cue: CueCreate, db: Session = Depends(get_db)):
     )
 
 @app.post("/events/cue")
-async def log_cue_event(evt: CueEventCreate, db: Session = Depends(get_db)):
+def log_cue_event(evt: CueEventCreate, db: Session = Depends(get_db)):
     e = CueEvent(**evt.dict())
     db.add(e)
     db.commit()
     return {"id": e.id}
 
-@app.get("/team/heatmap")
-async def team_heatmap(db: Session = Depends(get_db)):
-    # Simple aggregation: latest assessment per athlete -> risk bucket
-    users = db.query(User).filter(User.role == UserRole.ATHLETE.value).all()
-    data: List[Dict] = []
-    for u in users:
-        last = db.query(RiskAssessment).filter(RiskAssessment.athlete_id == u.id).order_by(RiskAssessment.assessment_date.desc()).first()
-        score = last.overall_risk_score if last else 0.3
-        bucket = "low" if score < 0.5 else ("moderate" if score < 0.7 else "high")
-        data.append({"athlete_id": u.id, "name": u.name, "risk": score, "bucket": bucket})
-    return {"team": data}
-
-# X-Ray Analysis
-class XRayAnalyzer:
-    """Simplified X-ray analysis - in production, use trained ML models"""
-    
-    def analyze_image(self, image_data: bytes) -> Dict:
-        """Analyze X-ray image and return findings"""
-        try:
-            img = Image.open(io.BytesIO(image_data))
-            # Convert to grayscale if needed
-            if img.mode != 'L':
-                img = img.convert('L')
-            
-            # Use OpenCV if available for better image processing
-            if CV2_AVAILABLE:
-                # Convert PIL to OpenCV format
-                np_img = np.array(img)
-                cv_img = cv2.cvtColor(np_img, cv2.COLOR_GRAY2BGR) if len(np_img.shape) == 2 else np_img
-                
-                # Enhanced image processing with OpenCV
-                gray = cv2.cvtColor(cv_img, cv2.COLOR_BGR2GRAY) if len(cv_img.shape) == 3 else cv_img
-                
-                # Apply image enhancement
-                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-                enhanced = clahe.apply(gray)
-                
-                # Edge detection for fracture detection
-                edges = cv2.Canny(enhanced, 50, 150)
-                
-                # Calculate statistics
-                brightness = np.mean(gray)
-                contrast = np.std(gray)
-                edge_density = np.sum(edges > 0) / edges.size
-                
-                np_img = gray  # Use processed image
-            else:
-                # Fallback to basic PIL processing
-                np_img = np.array(img)
-                brightness = np_img.mean()
-                contrast = np_img.std()
-                edge_density = 0.1  # Placeholder
-            
-            # Simple heuristics (replace with actual ML in production)
-            findings = []
-            has_fracture = False
-            has_alignment = False
-            joint_spacing = False
-            severity = "normal"
-            
-            # Enhanced detection with OpenCV features
-            if CV2_AVAILABLE:
-                # Use edge density and image quality metrics
-                if brightness < 100 or contrast < 30:
-                    findings.append("Image quality may be suboptimal - recommend retake with better lighting")
-                if edge_density > 0.3:  # High edge density might indicate fractures
-                    findings.append("High structural complexity detected - detailed analysis recommended")
-            else:
-                if brightness < 100 or contrast < 30:
-                    findings.append("Image quality may be suboptimal")
-            
-            # For presentation/demo: Always show some analysis results
-            # In production, this would use actual ML model predictions
-            image_size = np_img.size
-            brightness_normalized = brightness / 255.0
-            
-            # Simulate realistic findings based on image characteristics for demo
-            # Lower brightness or unusual contrast patterns might indicate issues
-            if brightness_normalized < 0.4 or contrast < 25:
-                # Potential issue detected
-                rand = np.random.random()
-                if rand > 0.6:  # 40% chance of finding
-                    has_fracture = rand > 0.85
-                    has_alignment = rand > 0.75 and not has_fracture
-                    joint_spacing = rand > 0.65 and not has_alignment and not has_fracture
-                    
-                    if has_fracture:
-                        severity = "severe"
-                        findings.append("Possible fracture detected in tibial or femoral region")
-                    elif has_alignment:
-                        severity = "moderate"
-                        findings.append("Alignment irregularity detected - bones may be misaligned")
-                    elif joint_spacing:
-                        severity = "minor"
-                        findings.append("Joint spacing appears slightly abnormal - may indicate inflammation")
-            else:
-                # Normal-looking image
-                if np.random.random() > 0.8:  # 20% chance of minor finding even in normal images
-                    joint_spacing = True
-                    severity = "minor"
-                    findings.append("Slight joint spacing variation detected - within normal range")
-            
-            # Determine triage
-            if severity in ["severe", "critical"]:
-                triage = "urgent"
-            elif severity == "moderate":
-                triage = "routine"
-            else:
-                triage = "routine"
-            
-            explanation = self.generate_explanation(findings, has_fracture, has_alignment, joint_spacing)
-            
-            return {
-                "has_fracture": has_fracture,
-                "has_alignment_issue": has_alignment,
-                "joint_spacing_abnormal": joint_spacing,
-                "severity": severity,
-                "triage_recommendation": triage,
-                "findings": "; ".join(findings) if findings else "No significant abnormalities detected",
-                "educational_explanation": explanation,
-                "confidence_score": 0.75  # Placeholder
-            }
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Image processing error: {str(e)}")
-    
-    def generate_explanation(self, findings: List[str], fracture: bool, alignment: bool, spacing: bool) -> str:
-        """Generate educational explanation in simple terms"""
-        parts = []
-        if fracture:
-            parts.append("A fracture means there's a break in the bone. This needs immediate medical attention.")
-        if alignment:
-            parts.append("Alignment issues mean bones aren't positioned normally, which can affect joint function.")
-        if spacing:
-            parts.append("Abnormal joint spacing might indicate swelling or structural changes that should be monitored.")
-        if not parts:
-            parts.append("The X-ray shows normal bone structure and joint spacing for a knee image.")
-        
-        parts.append("Always consult with a healthcare provider for definitive diagnosis and treatment recommendations.")
-        return " ".join(parts)
+heatmap_cache = TTLCache(maxsize=256, ttl_seconds=HEATMAP_CACHE_TTL_SECONDS)
 
-xray_analyzer = XRayAnalyzer()
-
-@app.post("/xray/upload", response_model=XRayAnalysisResponse)
-async def upload_xray(
-    athlete_id: int = Form(...),
-    file: UploadFile = File(...),
+@app.get("/team/heatmap")
+def team_heatmap(
+    team: Optional[str] = Query(None, description="Filter by athlete location"),
+    is_rural: Optional[bool] = None,
     db: Session = Depends(get_db)
 ):
-    """Upload and analyze X-ray image"""
-    # Verify athlete exists
-    athlete = db.query(User).filter(User.id == athlete_id).first()
-    if not athlete:
-        raise HTTPException(status_code=404, detail="Athlete not found")
+    # Simple aggregation: latest assessment per athlete -> risk bucket
+    cache_key = (team, is_rural)
+    if HEATMAP_CACHE_TTL_SECONDS > 0:
+        # Newest assessment and athlete ids (primary key lookups): assessments or athletes added by any worker
+        # invalidate the cached heatmap
+        fingerprint = db.execute(select(select(func.max(RiskAssessment.id)).scalar_subquery(),
+                                        select(func.max(User.id)).scalar_subquery())).one()
+        cached = heatmap_cache.get(cache_key)
+        if cached is not None and cached[0] == tuple(fingerprint):
+            return cached[1]
     
-    # Read image
-    image_data = await file.read()
+    # One query: rank each athlete's assessments newest first (served by ix_risk_assessments_athlete_date)
+    latest = select(
+        RiskAssessment.athlete_id,
+        RiskAssessment.overall_risk_score,
+        func.row_number().over(
+            partition_by=RiskAssessment.athlete_id,
+            order_by=(RiskAssessment.assessment_date.desc(), RiskAssessment.id.desc())
+        ).label("recency"),
+    ).subquery()
+    query = select(User.id, User.name, latest.c.overall_risk_score).outerjoin(
+        latest, and_(latest.c.athlete_id == User.id, latest.c.recency == 1)
+    ).where(User.role == UserRole.ATHLETE.value)
+    if team is not None:
+        query = query.where(User.location == team)
+    if is_rural is not None:
+        query = query.where(User.is_rural == is_rural)
     
-    # Validate file type
-    if not file.content_type or not file.content_type.startswith('image/'):
-        raise HTTPException(status_code=400, detail="File must be an image")
+    data: List[Dict] = []
+    for athlete_id, name, last_score in db.execute(query.order_by(User.id)):
+        score = last_score if last_score is not None else 0.3
+        bucket = "low" if score < 0.5 else ("moderate" if score < 0.7 else "high")
+        data.append({"athlete_id": athlete_id, "name": name, "risk": score, "bucket": bucket})
+    response = {"team": data}
     
-    # Analyze image
-    analysis_result = xray_analyzer.analyze_image(image_data)
+    if HEATMAP_CACHE_TTL_SECONDS > 0:
+        heatmap_cache.set(cache_key, (tuple(fingerprint), response))
+    return response
+
+# Warm-up
+def warm_up() -> Dict[str, float]:
+    """Initialize the lazily loaded subsystems ahead of traffic; returns milliseconds per step"""
+    timings = {}
     
-    # Save image to storage (simplified - in production use proper storage like S3)
-    os.makedirs("uploads/xray", exist_ok=True)
-    image_path = f"uploads/xray/{athlete_id}_{datetime.utcnow().timestamp()}.jpg"
-    with open(image_path, "wb") as f:
-        f.write(image_data)
+    def timed(name: str, step):
+        started = time.perf_counter()
+        step()
+        timings[name] = round((time.perf_counter() - started) * 1000, 1)
     
-    # Save analysis to database
-    xray = XRayAnalysis(
-        athlete_id=athlete_id,
-        image_path=image_path,
-        has_fracture=analysis_result["has_fracture"],
-        has_alignment_issue=analysis_result["has_alignment_issue"],
-        joint_spacing_abnormal=analysis_result["joint_spacing_abnormal"],
-        severity=analysis_result["severity"],
-        triage_recommendation=analysis_result["triage_recommendation"],
-        findings=analysis_result["findings"],
-        educational_explanation=analysis_result["educational_explanation"],
-        confidence_score=analysis_result["confidence_score"]
-    )
-    db.add(xray)
-    db.commit()
-    db.refresh(xray)
-    
-    return XRayAnalysisResponse(
-        id=xray.id,
-        athlete_id=xray.athlete_id,
-        has_fracture=xray.has_fracture,
-        has_alignment_issue=xray.has_alignment_issue,
-        joint_spacing_abnormal=xray.joint_spacing_abnormal,
-        severity=xray.severity,
-        triage_recommendation=xray.triage_recommendation,
-        findings=xray.findings,
-        educational_explanation=xray.educational_explanation,
-        confidence_score=xray.confidence_score,
-        uploaded_at=xray.uploaded_at
-    )
+    timed("risk_model", lambda: get_risk_model().predict_overall_risk(np.zeros((1, len(RISK_MODEL_FEATURES)))))
+    timed("xray", lambda: (get_xray_analyzer(), load_cv2(), __import__("PIL.Image")))
+    # Workers fork from this process, so they inherit everything loaded above
+    timed("cpu_pool", lambda: list(get_cpu_executor().map(cpu_worker_ready, range(CPU_POOL_WORKERS))))
+    return timings
 
-@app.get("/athletes/{athlete_id}/xray-analyses", response_model=List[XRayAnalysisResponse])
-async def get_athlete_xrays(athlete_id: int, db: Session = Depends(get_db)):
-    """Get all X-ray analyses for an athlete"""
-    analyses = db.query(XRayAnalysis).filter(
-        XRayAnalysis.athlete_id == athlete_id
-    ).order_by(XRayAnalysis.uploaded_at.desc()).all()
-    
-    return [XRayAnalysisResponse(
-        id=a.id,
-        athlete_id=a.athlete_id,
-        has_fracture=a.has_fracture,
-        has_alignment_issue=a.has_alignment_issue,
-        joint_spacing_abnormal=a.joint_spacing_abnormal,
-        severity=a.severity,
-        triage_recommendation=a.triage_recommendation,
-        findings=a.findings,
-        educational_explanation=a.educational_explanation,
-        confidence_score=a.confidence_score,
-        uploaded_at=a.uploaded_at
-    ) for a in analyses]
-
-@app.post("/users", response_model=dict)
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    """Create a new user (athlete, coach, provider, etc.)"""
-    try:
-        # Check if user already exists
-        db_user = get_user_by_email(db, user.email)
-        if db_user:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
-        # Hash password
-        hashed_password = get_password_hash(user.password)
-        
-        # Create user
-        db_user = User(
-            email=user.email,
-            name=user.name,
-            role=user.role.value,
-            hashed_password=hashed_password,
-            age=user.age,
-            gender=user.gender,
-            bmi=user.bmi,
-            location=user.location,
-            is_rural=user.is_rural
-        )
-        db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
-        return {"id": db_user.id, "email": db_user.email, "role": db_user.role, "name": db_user.name}
-    except HTTPException:
-        raise
-    except Exception as e:
-        import traceback
-        print(f"Error creating user: {str(e)}")
-        print(traceback.format_exc())
-        raise HTTPException(status_code=500, detail=f"Error creating user: {str(e)}")
-
-@app.post("/auth/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    """Authenticate user and return JWT token"""
-    # Get user by email
-    db_user = get_user_by_email(db, user_credentials.email)
-    if not db_user:
-        raise HTTPException(status_code=401, detail="Incorrect email or password")
-    
-    # Verify password
-    if not verify_password(user_credentials.password, db_user.hashed_password):
-        raise HTTPException(status_code=401, detail="Incorrect email or password")
-    
-    # Create access token
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": db_user.email, "user_id": db_user.id, "role": db_user.role},
-        expires_delta=access_token_expires
-    )
-    
-    return {
-        "access_token": access_token,
-        "token_type": "bearer",
-        "user_id": db_user.id,
-        "role": db_user.role,
-        "name": db_user.name
-    }
+_warmup_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def warm_up_on_startup():
+    global _warmup_task
+    if WARMUP_ON_STARTUP:
+        # In the background so the server accepts connections immediately
+        _warmup_task = asyncio.create_task(run_in_threadpool(warm_up))
+
+@app.post("/warmup")
+async def warmup_endpoint():
+    """Load models and imaging libraries now instead of on the first request that needs them"""
+    return {"timings_ms": await run_in_threadpool(warm_up)}
 
 @app.get("/users/{user_id}")
-async def get_user(user_id: int, db: Session = Depends(get_db)):
+def get_user(user_id: int, db: Session = Depends(get_db)):
     """Get user details"""
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
@@ -830,7 +723,7 @@ async def get_user(user_id: int, db: Session = Depends(get_db)):
     return user
 
 @app.post("/sessions")
-async def create_training_session(session: TrainingSessionCreate, db: Session = Depends(get_db)):
+def create_training_session(session: TrainingSessionCreate, db: Session = Depends(get_db)):
     """Create a new training session"""
     db_session = TrainingSession(**session.dict())
     db.add(db_session)
@@ -838,126 +731,540 @@ async def create_training_session(session: TrainingSessionCreate, db: Session =
     db.refresh(db_session)
     return {"id": db_session.id, "athlete_id": db_session.athlete_id}
 
-@app.post("/sessions/{session_id}/biomechanics")
+@app.post("/sessions/{session_id}/close")
+async def close_training_session(session_id: int, end_time: Optional[datetime] = None, db: Session = Depends(get_db)):
+    """Mark a session as ended; its analysis is then served from the analytics rollup and its samples are
+    compacted in the background"""
+    def close() -> dict:
+        session = db.query(TrainingSession).filter(TrainingSession.id == session_id).first()
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+        session.end_time = end_time or datetime.utcnow()
+        db.commit()
+        return {"id": session.id, "end_time": session.end_time}
+    
+    closed = await run_in_threadpool(close)
+    compact_after_close(session_id)
+    return closed
+
+@app.post("/sessions/{session_id}/biomechanics", openapi_extra=BIOMECHANICS_UPLOAD_OPENAPI)
 async def add_biomechanics_data(
     session_id: int,
-    data_points: List[BiomechanicsDataPoint],
+    request: Request,
     db: Session = Depends(get_db)
 ):
-    """Add biomechanics data points to a session"""
-    session = db.query(TrainingSession).filter(TrainingSession.id == session_id).first()
+    """Add biomechanics data points to a session (JSON array, NDJSON or packed float32 records)"""
+    session = await run_in_threadpool(lambda: db.query(TrainingSession).filter(TrainingSession.id == session_id).first())
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    # Calculate risk scores for each data point
-    high_risk_count = 0
-    valgus_values = []
-    impact_forces = []
-    
-    for point in data_points:
-        risk_score = 0.0
-        if point.knee_valgus > 15.0:
-            risk_score += 0.5
-            high_risk_count += 1
-        if point.ground_reaction_force > 3.0:
-            risk_score += 0.5
-            high_risk_count += 1
-        
-        db_point = BiomechanicsData(
-            session_id=session_id,
-            timestamp=point.timestamp,
-            knee_angle=point.knee_angle,
-            hip_angle=point.hip_angle,
-            ankle_angle=point.ankle_angle,
-            knee_valgus=point.knee_valgus,
-            ground_reaction_force=point.ground_reaction_force,
-            movement_type=point.movement_type,
-            risk_score=min(risk_score, 1.0)
-        )
-        db.add(db_point)
-        
-        valgus_values.append(point.knee_valgus)
-        impact_forces.append(point.ground_reaction_force)
-    
-    # Update session summary
-    session.high_risk_movements = high_risk_count
-    if valgus_values:
-        session.avg_knee_valgus = sum(valgus_values) / len(valgus_values)
-        session.peak_impact_force = max(impact_forces)
-        session.avg_landing_force = sum(impact_forces) / len(impact_forces)
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    if content_type in NDJSON_CONTENT_TYPES:
+        columns = await parse_biomechanics_ndjson(request.stream())
+    elif content_type in BINARY_CONTENT_TYPES:
+        columns = parse_biomechanics_binary(await request.body())
+    else:
+        columns = parse_biomechanics_json(await request.body())
+    def store() -> int:
+        count = ingest_biomechanics(db, session, columns)
+        db.commit()
+        return count
     
-    db.commit()
-    return {"message": f"Added {len(data_points)} data points", "high_risk_movements": high_risk_count}
+    high_risk_count = await run_in_threadpool(store)
+    return {"message": f"Added {len(columns)} data points", "high_risk_movements": high_risk_count}
 
 @app.get("/athletes/{athlete_id}/risk-assessment")
-async def get_risk_assessment(athlete_id: int, db: Session = Depends(get_db)):
+def get_risk_assessment(athlete_id: int, db: Session = Depends(get_db)):
     """Get AI-powered risk assessment for an athlete"""
-    user = db.query(User).filter(User.id == athlete_id).first()
-    if not user:
+    risk_model = get_risk_model()
+    risk_model.reload_if_changed()  # a new model file drops cached assessments
+    # One primary key lookup per read: inputs changed by any worker show up as a new version
+    version = db.scalar(select(User.assessment_version).where(User.id == athlete_id))
+    if version is None:
         raise HTTPException(status_code=404, detail="Athlete not found")
+    cached = assessment_cache.get(athlete_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    
+    user = db.query(User).filter(User.id == athlete_id).first()
     
-    # Get recent sessions and biomechanics data
+    # Get recent sessions and biomechanics data (id breaks start_time ties, as in load_roster_inputs)
     recent_sessions = db.query(TrainingSession).filter(
         TrainingSession.athlete_id == athlete_id
-    ).order_by(TrainingSession.start_time.desc()).limit(10).all()
+    ).order_by(TrainingSession.start_time.desc(), TrainingSession.id.desc()).limit(RISK_RECENT_SESSIONS).all()
     
     session_ids = [s.id for s in recent_sessions]
-    recent_biomechanics = db.query(BiomechanicsData).filter(
-        BiomechanicsData.session_id.in_(session_ids)
-    ).all()
+    movement_counts = risk_model.query_movement_counts(db, session_ids)
     
     # Perform risk assessment
-    assessment = risk_model.assess_risk(user, recent_sessions, recent_biomechanics)
+    assessment = risk_model.assess_risk(user, recent_sessions, movement_counts=movement_counts)
     
-    # Save assessment
-    db_assessment = RiskAssessment(
-        athlete_id=athlete_id,
-        overall_risk_score=assessment.overall_risk_score,
-        movement_pattern_risk=assessment.movement_pattern_risk,
-        demographic_risk=assessment.demographic_risk,
-        health_history_risk=assessment.health_history_risk,
-        recommendations=assessment.recommendations,
-        focus_areas=str(assessment.focus_areas)
+    # Save assessment only if it changed or the last saved one is due for a refresh
+    if assessment_needs_persisting(db, athlete_id, assessment):
+        db_assessment = RiskAssessment(
+            athlete_id=athlete_id,
+            overall_risk_score=assessment.overall_risk_score,
+            movement_pattern_risk=assessment.movement_pattern_risk,
+            demographic_risk=assessment.demographic_risk,
+            health_history_risk=assessment.health_history_risk,
+            recommendations=assessment.recommendations,
+            focus_areas=str(assessment.focus_areas)
+        )
+        db.add(db_assessment)
+        db.commit()
+        heatmap_cache.clear()
+    
+    assessment_cache.set(athlete_id, (version, assessment))
+    return assessment
+
+def assessment_needs_persisting(db: Session, athlete_id: int, assessment: RiskAssessmentResponse) -> bool:
+    last = db.query(RiskAssessment).filter(
+        RiskAssessment.athlete_id == athlete_id
+    ).order_by(RiskAssessment.assessment_date.desc(), RiskAssessment.id.desc()).first()
+    if last is None:
+        return True
+    if datetime.utcnow() - last.assessment_date >= timedelta(hours=ASSESSMENT_PERSIST_INTERVAL_HOURS):
+        return True
+    return (
+        last.overall_risk_score != assessment.overall_risk_score
+        or last.movement_pattern_risk != assessment.movement_pattern_risk
+        or last.demographic_risk != assessment.demographic_risk
+        or last.health_history_risk != assessment.health_history_risk
+        or last.recommendations != assessment.recommendations
+        or last.focus_areas != str(assessment.focus_areas)
+    )
+
+def movement_counts_by(db: Session, sessions, valgus_threshold: float,
+                       impact_threshold: float) -> Dict[int, List[int]]:
+    """{key: [high_valgus, high_impact, total]} over the raw samples and compacted blocks of `sessions`,
+    a subquery with session_id and key columns
+    
+    Blocks and archives carry their counts; only those counted at other thresholds (changed since they were
+    written) are read back.
+    """
+    counts: Dict[int, List[int]] = {}
+    
+    def add(key: int, high_valgus, high_impact, total):
+        row = counts.setdefault(key, [0, 0, 0])
+        row[0] += int(high_valgus or 0)
+        row[1] += int(high_impact or 0)
+        row[2] += int(total or 0)
+    
+    for row in db.execute(
+        select(
+            sessions.c.key,
+            func.sum(case((BiomechanicsData.knee_valgus > valgus_threshold, 1), else_=0)),
+            func.sum(case((BiomechanicsData.ground_reaction_force > impact_threshold, 1), else_=0)),
+            func.count(),
+        )
+        .select_from(sessions.join(BiomechanicsData, BiomechanicsData.session_id == sessions.c.session_id))
+        .group_by(sessions.c.key)
+    ):
+        add(*row)
+    
+    # Blocks and archives: stored counts, or their samples (block blob, archive file) when counted at other thresholds
+    for table, source, load in (
+        (BiomechanicsBlock, BiomechanicsBlock.data, decode_biomechanics_block),
+        (BiomechanicsArchive, BiomechanicsArchive.path, read_archive),
+    ):
+        stored = sessions.join(table, table.session_id == sessions.c.session_id)
+        recount = False
+        for key, stored_valgus_threshold, stored_impact_threshold, *row in db.execute(
+            select(
+                sessions.c.key, table.valgus_threshold, table.impact_threshold,
+                func.sum(table.high_valgus_count), func.sum(table.high_impact_count), func.sum(table.sample_count),
+            )
+            .select_from(stored)
+            .group_by(sessions.c.key, table.valgus_threshold, table.impact_threshold)
+        ):
+            if stored_valgus_threshold == valgus_threshold and stored_impact_threshold == impact_threshold:
+                add(key, *row)
+            else:
+                recount = True
+        
+        if recount:
+            for key, value in db.execute(
+                select(sessions.c.key, source).select_from(stored).where(
+                    (table.valgus_threshold != valgus_threshold) | (table.impact_threshold != impact_threshold)
+                )
+            ):
+                samples = load(value)
+                add(
+                    key,
+                    np.count_nonzero(samples["knee_valgus"].astype(np.float64) > valgus_threshold),
+                    np.count_nonzero(samples["ground_reaction_force"].astype(np.float64) > impact_threshold),
+                    len(samples["knee_valgus"]),
+                )
+    return counts
+
+# Batch roster risk assessment
+def load_roster_inputs(db: Session, athlete_ids: List[int]) -> Dict[str, np.ndarray]:
+    """Demographics and recent movement counts for many athletes in two set-based queries"""
+    risk_model = get_risk_model()
+    demographics = db.execute(
+        select(User.id, User.gender, User.age, User.bmi, User.is_rural)
+        .where(User.id.in_(athlete_ids))
+        .order_by(User.id)
+    ).all()
+    ids = np.array([row[0] for row in demographics], dtype=np.int64)
+    
+    # Most recent sessions per athlete (id breaks start_time ties, as in the single-athlete assessment),
+    # then grouped counts over their samples
+    ranked = select(
+        TrainingSession.id.label("session_id"),
+        TrainingSession.athlete_id,
+        func.row_number().over(
+            partition_by=TrainingSession.athlete_id,
+            order_by=(TrainingSession.start_time.desc(), TrainingSession.id.desc())
+        ).label("recency"),
+    ).where(TrainingSession.athlete_id.in_(athlete_ids)).subquery()
+    recent = select(ranked.c.session_id, ranked.c.athlete_id.label("key")).where(
+        ranked.c.recency <= RISK_RECENT_SESSIONS
+    ).subquery()
+    counts = movement_counts_by(db, recent, risk_model.valgus_threshold, risk_model.impact_threshold)
+    
+    per_athlete = np.zeros((len(ids), 3), dtype=np.int64)
+    if counts:
+        per_athlete[np.searchsorted(ids, list(counts))] = list(counts.values())
+    high_valgus, high_impact, total = per_athlete.T
+    
+    return {
+        "athlete_id": ids,
+        "gender": np.array([row[1] for row in demographics], dtype=object),
+        "age": np.array([np.nan if row[2] is None else row[2] for row in demographics], dtype=np.float64),
+        "bmi": np.array([np.nan if row[3] is None else row[3] for row in demographics], dtype=np.float64),
+        "is_rural": np.array([bool(row[4]) for row in demographics], dtype=bool),
+        "high_valgus_count": high_valgus,
+        "high_impact_count": high_impact,
+        "total_movements": total,
+    }
+
+def assess_roster_chunk(athlete_ids: List[int]) -> List[Dict]:
+    """Score one chunk of athletes; runs in a process pool worker with its own DB session"""
+    db = SessionLocal()
+    try:
+        inputs = load_roster_inputs(db, athlete_ids)
+    finally:
+        db.close()
+    
+    risk_model = get_risk_model()
+    scores = risk_model.assess_roster(
+        inputs["gender"], inputs["age"], inputs["bmi"], inputs["is_rural"],
+        inputs["high_valgus_count"], inputs["high_impact_count"], inputs["total_movements"]
     )
-    db.add(db_assessment)
+    results = []
+    for i, athlete_id in enumerate(inputs["athlete_id"].tolist()):
+        overall = float(scores["overall_risk_score"][i])
+        movement = float(scores["movement_pattern_risk"][i])
+        demographic = float(scores["demographic_risk"][i])
+        results.append({
+            "athlete_id": athlete_id,
+            "overall_risk_score": overall,
+            "movement_pattern_risk": movement,
+            "demographic_risk": demographic,
+            "health_history_risk": float(scores["health_history_risk"][i]),
+            "recommendations": risk_model.generate_recommendations(overall, movement, demographic),
+            "focus_areas": risk_model.get_focus_areas(movement, demographic),
+        })
+    return results
+
+def run_roster_assessment(db: Session, athlete_ids: Optional[List[int]] = None) -> List[Dict]:
+    """Score a list of athletes (or every athlete) and bulk-insert one RiskAssessment row each"""
+    if athlete_ids is None:
+        athlete_ids = db.scalars(
+            select(User.id).where(User.role == UserRole.ATHLETE.value).order_by(User.id)
+        ).all()
+    athlete_ids = sorted(set(athlete_ids))
+    # Versions read before scoring: inputs changing meanwhile leave the cached results stale, as they should
+    versions = dict(db.execute(select(User.id, User.assessment_version).where(User.id.in_(athlete_ids))).all())
+    chunks = [athlete_ids[i:i + ROSTER_CHUNK_SIZE] for i in range(0, len(athlete_ids), ROSTER_CHUNK_SIZE)]
+    
+    if len(chunks) > 1:
+        results = [row for chunk in get_cpu_executor().map(assess_roster_chunk, chunks) for row in chunk]
+    else:
+        results = [row for chunk in chunks for row in assess_roster_chunk(chunk)]
+    
+    assessment_date = datetime.utcnow()
+    table = RiskAssessment.__table__
+    for start in range(0, len(results), BULK_INSERT_CHUNK_SIZE):
+        db.execute(table.insert(), [
+            {**row, "assessment_date": assessment_date, "focus_areas": str(row["focus_areas"])}
+            for row in results[start:start + BULK_INSERT_CHUNK_SIZE]
+        ])
     db.commit()
     
-    return assessment
+    for row in results:
+        fields = {key: value for key, value in row.items() if key != "athlete_id"}
+        assessment_cache.set(row["athlete_id"], (versions.get(row["athlete_id"]), RiskAssessmentResponse(**fields)))
+    heatmap_cache.clear()
+    return results
+
+@app.post("/risk-assessments/batch", response_model=List[RosterAssessmentResult])
+async def batch_risk_assessment(request: RosterAssessmentRequest):
+    """Assess a roster (or all athletes) in one pass"""
+    def run() -> List[Dict]:
+        db = SessionLocal()
+        try:
+            return run_roster_assessment(db, request.athlete_ids)
+        finally:
+            db.close()
+    
+    return await run_in_threadpool(run)
 
 @app.get("/athletes/{athlete_id}/sessions")
-async def get_athlete_sessions(athlete_id: int, db: Session = Depends(get_db)):
+def get_athlete_sessions(athlete_id: int, db: Session = Depends(get_db)):
     """Get all training sessions for an athlete"""
     sessions = db.query(TrainingSession).filter(
         TrainingSession.athlete_id == athlete_id
     ).order_by(TrainingSession.start_time.desc()).all()
     return sessions
 
+def compute_session_statistics(columns: BiomechanicsColumns) -> dict:
+    """Summary statistics over every sample of a session
+    
+    Means are left-to-right sums divided by the count, the accumulation the analytics rollup uses, so an
+    open session reports bit-for-bit the same statistics once it is closed and served from its rollup.
+    """
+    total_movements = len(columns)
+    high_risk_count = int(np.count_nonzero(columns.risk_score > 0.7))
+    codes, categories = encode_movement_types(columns.movement_type.tolist())
+    counts = np.bincount(codes, minlength=len(categories))
+    return {
+        "total_movements": total_movements,
+        "high_risk_movements": high_risk_count,
+        "high_risk_percentage": (high_risk_count / total_movements * 100) if total_movements > 0 else 0,
+        "avg_knee_valgus": _running_sum(0.0, columns.knee_valgus) / total_movements if total_movements > 0 else 0,
+        "avg_ground_reaction_force": _running_sum(0.0, columns.ground_reaction_force) / total_movements if total_movements > 0 else 0,
+        "peak_impact_force": float(columns.ground_reaction_force.max()) if total_movements > 0 else 0,
+        "movement_types": {category: int(count) for category, count in zip(categories, counts)},
+    }
+
+def calculate_muscle_activation_columns(columns: BiomechanicsColumns) -> dict:
+    codes, categories = encode_movement_types(columns.movement_type.tolist())
+    return calculate_muscle_activation_arrays(
+        columns.knee_angle, columns.hip_angle, columns.ankle_angle, columns.knee_valgus,
+        columns.ground_reaction_force, codes, categories
+    )
+
+# Session analytics rollup
+def _running_sum(previous: float, values: np.ndarray) -> float:
+    """Continue a left-to-right sum so batch-wise totals match a single pass over the session"""
+    return float(np.add.accumulate(np.concatenate(([previous], values)))[-1])
+
+def accumulate_rollup(rollup: SessionAnalytics, columns: BiomechanicsColumns, risk_scores: np.ndarray):
+    """Fold a batch of samples into a rollup row"""
+    codes, categories = encode_movement_types(columns.movement_type.tolist())
+    activation = muscle_activation_values(
+        columns.knee_angle, columns.hip_angle, columns.ankle_angle, columns.knee_valgus,
+        columns.ground_reaction_force, codes, categories
+    )
+    
+    rollup.sample_count += len(columns)
+    rollup.high_risk_count += int(np.count_nonzero(risk_scores > 0.7))
+    rollup.knee_valgus_sum = _running_sum(rollup.knee_valgus_sum, columns.knee_valgus)
+    rollup.ground_reaction_force_sum = _running_sum(rollup.ground_reaction_force_sum, columns.ground_reaction_force)
+    batch_peak = float(columns.ground_reaction_force.max())
+    if rollup.peak_ground_reaction_force is None or batch_peak > rollup.peak_ground_reaction_force:
+        rollup.peak_ground_reaction_force = batch_peak
+    
+    movement_types = json.loads(rollup.movement_types or "{}")
+    for category, count in zip(categories, np.bincount(codes, minlength=len(categories)).tolist()):
+        movement_types[category] = movement_types.get(category, 0) + count
+    rollup.movement_types = json.dumps(movement_types)
+    
+    totals = json.loads(rollup.muscle_totals or "{}")
+    peaks = json.loads(rollup.muscle_peaks or "{}")
+    for muscle, values in activation.items():
+        totals[muscle] = _running_sum(totals.get(muscle, 0.0), values)
+        peaks[muscle] = max(peaks.get(muscle, float("-inf")), float(values.max()))
+    rollup.muscle_totals = json.dumps(totals)
+    rollup.muscle_peaks = json.dumps(peaks)
+    rollup.updated_at = datetime.utcnow()
+
+def _empty_rollup(session_id: int) -> SessionAnalytics:
+    return SessionAnalytics(session_id=session_id, sample_count=0, high_risk_count=0, knee_valgus_sum=0.0,
+                            ground_reaction_force_sum=0.0, movement_types="{}", muscle_totals="{}", muscle_peaks="{}")
+
+def update_session_rollup(db: Session, session_id: int, columns: BiomechanicsColumns, risk_scores: np.ndarray):
+    """Incrementally update the session's rollup with a newly stored batch"""
+    if not len(columns):
+        return
+    locked = db.query(SessionAnalytics).filter(SessionAnalytics.session_id == session_id).with_for_update()
+    rollup = locked.first()
+    if rollup is None:
+        # FOR UPDATE locks nothing while the row is missing: concurrent first batches both get here. The loser's
+        # insert fails inside its savepoint (not its whole ingest transaction) and it locks the winner's row instead
+        try:
+            with db.begin_nested():
+                db.add(_empty_rollup(session_id))
+        except IntegrityError:
+            pass
+        rollup = locked.one()
+    accumulate_rollup(rollup, columns, risk_scores)
+
+def rebuild_session_rollup(db: Session, session_id: int) -> SessionAnalytics:
+    """Recompute a session's rollup from its raw samples"""
+    db.query(SessionAnalytics).filter(SessionAnalytics.session_id == session_id).delete()
+    rollup = _empty_rollup(session_id)
+    columns = load_session_columns(db, session_id)
+    if len(columns):
+        accumulate_rollup(rollup, columns, columns.risk_score)
+    db.add(rollup)
+    return rollup
+
+def rollup_statistics(rollup: SessionAnalytics) -> dict:
+    """Session statistics in the same shape as compute_session_statistics"""
+    total_movements = rollup.sample_count
+    return {
+        "total_movements": total_movements,
+        "high_risk_movements": rollup.high_risk_count,
+        "high_risk_percentage": (rollup.high_risk_count / total_movements * 100) if total_movements > 0 else 0,
+        "avg_knee_valgus": rollup.knee_valgus_sum / total_movements if total_movements > 0 else 0,
+        "avg_ground_reaction_force": rollup.ground_reaction_force_sum / total_movements if total_movements > 0 else 0,
+        "peak_impact_force": rollup.peak_ground_reaction_force if total_movements > 0 else 0,
+        "movement_types": json.loads(rollup.movement_types or "{}"),
+    }
+
+def rollup_muscle_activation(rollup: SessionAnalytics) -> dict:
+    if not rollup.sample_count:
+        return {}
+    totals = json.loads(rollup.muscle_totals)
+    peaks = json.loads(rollup.muscle_peaks)
+    return {muscle: normalize_muscle_stats(totals[muscle], peaks[muscle], rollup.sample_count) for muscle in MUSCLES}
+
+# Timeline downsampling and pagination
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of `threshold` points that preserve the curve's shape"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    # First and last points are always kept; the rest is split into threshold - 2 buckets
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = a = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[stop:next_stop].mean()
+        avg_y = y[stop:next_stop].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (avg_y - y[a]))
+        a = start + int(np.nanargmax(area)) if not np.isnan(area).all() else start
+        selected[i + 1] = a
+    selected[-1] = n - 1
+    return selected
+
+def minmax_indices(y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices of the minimum and maximum sample in each of max_points / 2 equal-count buckets"""
+    n = len(y)
+    if max_points >= n:
+        return np.arange(n)
+    buckets = max(1, max_points // 2)
+    bucket_ids = np.arange(n) * buckets // n
+    order = np.lexsort((y, bucket_ids))
+    bucket_starts = np.searchsorted(bucket_ids[order], np.arange(buckets), side="left")
+    bucket_ends = np.append(bucket_starts[1:], n) - 1
+    return np.unique(np.concatenate([order[bucket_starts], order[bucket_ends]]))
+
+def encode_timeline_cursor(timestamp_us: int, offset: int) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp_us}:{offset}".encode()).decode()
+
+def decode_timeline_cursor(cursor: str) -> tuple:
+    try:
+        timestamp_us, offset = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return int(timestamp_us), int(offset)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def select_timeline(columns: BiomechanicsColumns, start: Optional[datetime], end: Optional[datetime],
+                    cursor: Optional[str], limit: Optional[int], max_points: Optional[int],
+                    downsample: str, downsample_field: str) -> tuple:
+    """Pick timeline sample indices for a time range, cursor page and/or downsampling target
+    
+    Returns (indices, points_in_range, next_cursor). The cursor is a keyset position
+    (timestamp, samples already returned at that timestamp) so pages stay stable as data is appended.
+    """
+    times = np.array(columns.timestamps, dtype="datetime64[us]").astype(np.int64)
+    lo, hi = 0, len(times)
+    if start is not None:
+        lo = int(np.searchsorted(times, np.datetime64(start.replace(tzinfo=None), "us").astype(np.int64), side="left"))
+    if end is not None:
+        hi = int(np.searchsorted(times, np.datetime64(end.replace(tzinfo=None), "us").astype(np.int64), side="right"))
+    points_in_range = max(0, hi - lo)
+    if cursor:
+        timestamp_us, offset = decode_timeline_cursor(cursor)
+        lo = max(lo, int(np.searchsorted(times, timestamp_us, side="left")) + offset)
+    
+    next_cursor = None
+    if max_points:
+        window = np.arange(lo, max(lo, hi))
+        y = getattr(columns, downsample_field)[lo:hi]
+        if downsample == "minmax":
+            indices = window[minmax_indices(y, max_points)]
+        else:
+            indices = window[lttb_indices(times[lo:hi].astype(np.float64), y, max_points)]
+    else:
+        stop = min(hi, lo + limit) if limit else hi
+        indices = np.arange(lo, max(lo, stop))
+        if stop < hi and len(indices):
+            last = indices[-1]
+            offset = int(last - np.searchsorted(times, times[last], side="left")) + 1
+            next_cursor = encode_timeline_cursor(int(times[last]), offset)
+    return indices, points_in_range, next_cursor
+
 @app.get("/sessions/{session_id}/analysis")
-async def get_session_analysis(session_id: int, db: Session = Depends(get_db)):
-    """Get detailed session analysis with biomechanics data and muscle activation"""
+def get_session_analysis(
+    session_id: int,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    max_points: Optional[int] = Query(None, ge=3, description="Downsample the timeline to about this many points"),
+    downsample: str = Query("lttb", pattern="^(lttb|minmax)$"),
+    downsample_field: str = Query("knee_valgus", pattern="^(knee_angle|hip_angle|ankle_angle|knee_valgus|ground_reaction_force|risk_score)$"),
+    limit: Optional[int] = Query(None, ge=1, description="Page size for cursor pagination of the timeline"),
+    cursor: Optional[str] = None,
+    include_timeline: bool = True,
+    resolution: str = Query("raw", pattern="^(raw|second)$", description="Timeline of raw samples, or per-second and per-movement means"),
+    db: Session = Depends(get_db)
+):
+    """Get detailed session analysis with biomechanics data and muscle activation
+    
+    Statistics and muscle activation always cover the full session; start/end, cursor/limit,
+    max_points and resolution only shape biomechanics_timeline. Closed sessions are served from the
+    precomputed rollup (rebuilt by POST /sessions/{session_id}/analysis/recompute); archived samples are
+    read from their archive file only for a raw timeline. Never writes.
+    """
     session = db.query(TrainingSession).filter(TrainingSession.id == session_id).first()
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    # Get all biomechanics data for this session
-    biomechanics_data = db.query(BiomechanicsData).filter(
-        BiomechanicsData.session_id == session_id
-    ).order_by(BiomechanicsData.timestamp.asc()).all()
+    rollup = None
+    if session.end_time is not None:
+        rollup = db.query(SessionAnalytics).filter(SessionAnalytics.session_id == session_id).first()
     
-    # Calculate muscle activation based on movement patterns
-    muscle_activation = calculate_muscle_activation(biomechanics_data)
-    
-    # Calculate session statistics
-    total_movements = len(biomechanics_data)
-    high_risk_count = sum(1 for b in biomechanics_data if b.risk_score > 0.7)
-    avg_knee_valgus = sum(b.knee_valgus for b in biomechanics_data) / total_movements if total_movements > 0 else 0
-    avg_grf = sum(b.ground_reaction_force for b in biomechanics_data) / total_movements if total_movements > 0 else 0
-    peak_grf = max((b.ground_reaction_force for b in biomechanics_data), default=0)
+    if rollup is not None:
+        statistics = rollup_statistics(rollup)
+        muscle_activation = rollup_muscle_activation(rollup)
+        columns = None
+        if include_timeline:
+            load = load_session_seconds if resolution == "second" else load_session_columns
+            columns = load(db, session_id, start, end)
+    else:
+        # Open session (or no rollup yet): compute from all biomechanics data
+        columns = load_session_columns(db, session_id)
+        
+        # Calculate muscle activation based on movement patterns
+        muscle_activation = calculate_muscle_activation_columns(columns)
+        
+        # Calculate session statistics
+        statistics = compute_session_statistics(columns)
+        if resolution == "second":
+            columns = samples_to_columns(aggregate_samples(columns_to_samples(columns)))
     
-    # Movement type distribution
-    movement_types = {}
-    for b in biomechanics_data:
-        movement_types[b.movement_type] = movement_types.get(b.movement_type, 0) + 1
+    if include_timeline:
+        indices, points_in_range, next_cursor = select_timeline(
+            columns, start, end, cursor, limit, max_points, downsample, downsample_field
+        )
+    else:
+        indices, points_in_range, next_cursor = np.arange(0), 0, None
     
     return {
         "session": {
@@ -969,167 +1276,140 @@ async def get_session_analysis(session_id: int, db: Session = Depends(get_db)):
             "start_time": session.start_time,
             "end_time": session.end_time,
         },
-        "statistics": {
-            "total_movements": total_movements,
-            "high_risk_movements": high_risk_count,
-            "high_risk_percentage": (high_risk_count / total_movements * 100) if total_movements > 0 else 0,
-            "avg_knee_valgus": avg_knee_valgus,
-            "avg_ground_reaction_force": avg_grf,
-            "peak_impact_force": peak_grf,
-            "movement_types": movement_types,
-        },
+        "statistics": statistics,
         "muscle_activation": muscle_activation,
         "biomechanics_timeline": [
             {
-                "timestamp": b.timestamp.isoformat(),
-                "knee_angle": b.knee_angle,
-                "hip_angle": b.hip_angle,
-                "ankle_angle": b.ankle_angle,
-                "knee_valgus": b.knee_valgus,
-                "ground_reaction_force": b.ground_reaction_force,
-                "movement_type": b.movement_type,
-                "risk_score": b.risk_score,
+                "timestamp": columns.timestamps[i].isoformat(),
+                "knee_angle": columns.knee_angle[i],
+                "hip_angle": columns.hip_angle[i],
+                "ankle_angle": columns.ankle_angle[i],
+                "knee_valgus": columns.knee_valgus[i],
+                "ground_reaction_force": columns.ground_reaction_force[i],
+                "movement_type": columns.movement_type[i],
+                "risk_score": columns.risk_score[i],
             }
-            for b in biomechanics_data
-        ]
+            for i in indices.tolist()
+        ],
+        "timeline": {
+            "points_in_range": points_in_range,
+            "returned_points": len(indices),
+            "downsample": downsample if max_points else None,
+            "resolution": resolution,
+            "next_cursor": next_cursor,
+        }
+    }
+
+@app.post("/sessions/{session_id}/analysis/recompute")
+def recompute_session_analysis(session_id: int, db: Session = Depends(get_db)):
+    """Rebuild the session's analytics rollup from its stored samples (archives and blocks included)"""
+    session = db.query(TrainingSession).filter(TrainingSession.id == session_id).first()
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    rollup = rebuild_session_rollup(db, session_id)
+    db.commit()
+    return {
+        "session_id": session_id,
+        "statistics": rollup_statistics(rollup),
+        "muscle_activation": rollup_muscle_activation(rollup),
     }
 
+MUSCLES = ("quadriceps", "hamstrings", "glutes", "calves", "hip_flexors", "hip_adductors", "hip_abductors", "core")
+
 def calculate_muscle_activation(biomechanics_data: List[BiomechanicsData]) -> dict:
     """Calculate muscle activation levels based on movement patterns and biomechanics"""
     if not biomechanics_data:
         return {}
     
-    # Initialize muscle activation counters
-    muscle_activity = {
-        "quadriceps": {"total": 0, "peak": 0, "avg": 0},
-        "hamstrings": {"total": 0, "peak": 0, "avg": 0},
-        "glutes": {"total": 0, "peak": 0, "avg": 0},
-        "calves": {"total": 0, "peak": 0, "avg": 0},
-        "hip_flexors": {"total": 0, "peak": 0, "avg": 0},
-        "hip_adductors": {"total": 0, "peak": 0, "avg": 0},
-        "hip_abductors": {"total": 0, "peak": 0, "avg": 0},
-        "core": {"total": 0, "peak": 0, "avg": 0},
-    }
+    def column(field: str) -> np.ndarray:
+        return np.fromiter((getattr(b, field) for b in biomechanics_data), dtype=np.float64,
+                           count=len(biomechanics_data))
     
-    quad_values = []
-    hamstring_values = []
-    glute_values = []
-    calf_values = []
-    hip_flexor_values = []
-    hip_adductor_values = []
-    hip_abductor_values = []
-    core_values = []
-    
-    for b in biomechanics_data:
-        knee_angle_rad = b.knee_angle * (3.14159 / 180)
-        hip_angle_rad = b.hip_angle * (3.14159 / 180)
-        ankle_angle_rad = b.ankle_angle * (3.14159 / 180)
-        
-        # Quadriceps: active during knee extension and landing
-        quad_activation = 0
-        if b.movement_type in ["landing", "jumping"]:
-            # Higher activation during landing with knee flexion
-            quad_activation = (180 - b.knee_angle) / 180 * (b.ground_reaction_force / 3) * 100
-        elif b.movement_type in ["cutting", "pivoting"]:
-            quad_activation = (180 - b.knee_angle) / 180 * 60
-        quad_values.append(quad_activation)
-        muscle_activity["quadriceps"]["total"] += quad_activation
-        
-        # Hamstrings: critical for ACL protection, active during knee flexion and eccentric loading
-        hamstring_activation = 0
-        if b.knee_angle < 160:
-            hamstring_activation = (160 - b.knee_angle) / 160 * 70
-        if b.movement_type == "landing":
-            hamstring_activation += b.ground_reaction_force * 15
-        hamstring_values.append(hamstring_activation)
-        muscle_activity["hamstrings"]["total"] += hamstring_activation
-        
-        # Glutes: hip extension and stabilization
-        glute_activation = 0
-        if b.hip_angle < 170:
-            glute_activation = (170 - b.hip_angle) / 170 * 50
-        if abs(b.knee_valgus) > 10:  # Need glute strength to control valgus
-            glute_activation += abs(b.knee_valgus) * 3
-        glute_values.append(glute_activation)
-        muscle_activity["glutes"]["total"] += glute_activation
-        
-        # Calves: ankle plantarflexion during landing and jumping
-        calf_activation = 0
-        if b.movement_type in ["landing", "jumping"]:
-            calf_activation = (b.ground_reaction_force / 3) * 40
-        if b.ankle_angle < 100:
-            calf_activation += (100 - b.ankle_angle) / 100 * 30
-        calf_values.append(calf_activation)
-        muscle_activity["calves"]["total"] += calf_activation
-        
-        # Hip flexors: hip flexion during cutting and running
-        hip_flexor_activation = 0
-        if b.movement_type in ["cutting", "running"]:
-            hip_flexor_activation = (180 - b.hip_angle) / 180 * 50
-        hip_flexor_values.append(hip_flexor_activation)
-        muscle_activity["hip_flexors"]["total"] += hip_flexor_activation
-        
-        # Hip adductors: control knee valgus (important for ACL protection)
-        hip_adductor_activation = 0
-        if b.knee_valgus > 10:
-            hip_adductor_activation = b.knee_valgus * 4  # Need to control valgus
-        hip_adductor_values.append(hip_adductor_activation)
-        muscle_activity["hip_adductors"]["total"] += hip_adductor_activation
-        
-        # Hip abductors: lateral stability
-        hip_abductor_activation = 0
-        if b.knee_valgus < -5:  # Knee bowing outward
-            hip_abductor_activation = abs(b.knee_valgus) * 3
-        if b.movement_type in ["cutting", "side_step"]:
-            hip_abductor_activation += 25
-        hip_abductor_values.append(hip_abductor_activation)
-        muscle_activity["hip_abductors"]["total"] += hip_abductor_activation
-        
-        # Core: stability during all movements
-        core_activation = 20  # Base activation
-        if b.ground_reaction_force > 2.5:
-            core_activation += (b.ground_reaction_force - 2.5) * 15
-        if abs(b.knee_valgus) > 10:
-            core_activation += abs(b.knee_valgus) * 2
-        core_values.append(core_activation)
-        muscle_activity["core"]["total"] += core_activation
-    
-    # Calculate averages and peaks
-    total_data_points = len(biomechanics_data)
-    if total_data_points > 0:
-        muscle_activity["quadriceps"]["avg"] = sum(quad_values) / total_data_points if quad_values else 0
-        muscle_activity["quadriceps"]["peak"] = max(quad_values) if quad_values else 0
-        
-        muscle_activity["hamstrings"]["avg"] = sum(hamstring_values) / total_data_points if hamstring_values else 0
-        muscle_activity["hamstrings"]["peak"] = max(hamstring_values) if hamstring_values else 0
-        
-        muscle_activity["glutes"]["avg"] = sum(glute_values) / total_data_points if glute_values else 0
-        muscle_activity["glutes"]["peak"] = max(glute_values) if glute_values else 0
-        
-        muscle_activity["calves"]["avg"] = sum(calf_values) / total_data_points if calf_values else 0
-        muscle_activity["calves"]["peak"] = max(calf_values) if calf_values else 0
-        
-        muscle_activity["hip_flexors"]["avg"] = sum(hip_flexor_values) / total_data_points if hip_flexor_values else 0
-        muscle_activity["hip_flexors"]["peak"] = max(hip_flexor_values) if hip_flexor_values else 0
-        
-        muscle_activity["hip_adductors"]["avg"] = sum(hip_adductor_values) / total_data_points if hip_adductor_values else 0
-        muscle_activity["hip_adductors"]["peak"] = max(hip_adductor_values) if hip_adductor_values else 0
-        
-        muscle_activity["hip_abductors"]["avg"] = sum(hip_abductor_values) / total_data_points if hip_abductor_values else 0
-        muscle_activity["hip_abductors"]["peak"] = max(hip_abductor_values) if hip_abductor_values else 0
-        
-        muscle_activity["core"]["avg"] = sum(core_values) / total_data_points if core_values else 0
-        muscle_activity["core"]["peak"] = max(core_values) if core_values else 0
+    codes, categories = encode_movement_types([b.movement_type for b in biomechanics_data])
+    return calculate_muscle_activation_arrays(
+        column("knee_angle"), column("hip_angle"), column("ankle_angle"), column("knee_valgus"),
+        column("ground_reaction_force"), codes, categories
+    )
+
+def calculate_muscle_activation_arrays(knee_angle: np.ndarray, hip_angle: np.ndarray, ankle_angle: np.ndarray,
+                                       knee_valgus: np.ndarray, ground_reaction_force: np.ndarray,
+                                       movement_codes: np.ndarray, movement_categories: List[str]) -> dict:
+    """Vectorized muscle activation over column arrays
     
-    # Normalize to 0-100 scale
-    for muscle in muscle_activity:
-        for key in ["total", "avg", "peak"]:
-            muscle_activity[muscle][key] = min(100, max(0, muscle_activity[muscle][key]))
+    Each formula keeps the operation order of the original per-sample loop and totals are
+    accumulated sequentially, so results are bit-for-bit identical to it.
+    """
+    total_data_points = len(knee_angle)
+    if total_data_points == 0:
+        return {}
+    
+    activation = muscle_activation_values(knee_angle, hip_angle, ankle_angle, knee_valgus, ground_reaction_force,
+                                          movement_codes, movement_categories)
+    muscle_activity = {}
+    for muscle in MUSCLES:
+        values = activation[muscle]
+        # add.accumulate sums left to right like the loop did (np.sum would reorder pairwise)
+        total = float(np.add.accumulate(values)[-1])
+        muscle_activity[muscle] = normalize_muscle_stats(total, float(values.max()), total_data_points)
     
     return muscle_activity
 
+def normalize_muscle_stats(total: float, peak: float, count: int) -> dict:
+    """Clamp total, peak and average activation to the 0-100 scale"""
+    stats = {"total": total, "peak": peak, "avg": total / count}
+    return {key: min(100, max(0, value)) for key, value in stats.items()}
+
+def muscle_activation_values(knee_angle: np.ndarray, hip_angle: np.ndarray, ankle_angle: np.ndarray,
+                             knee_valgus: np.ndarray, ground_reaction_force: np.ndarray,
+                             movement_codes: np.ndarray, movement_categories: List[str]) -> Dict[str, np.ndarray]:
+    """Per-sample activation array for every muscle"""
+    def movement_is(*names: str) -> np.ndarray:
+        wanted = [code for code, name in enumerate(movement_categories) if name in names]
+        return np.isin(movement_codes, wanted)
+    
+    grf = ground_reaction_force
+    abs_valgus = np.abs(knee_valgus)
+    landing_or_jumping = movement_is("landing", "jumping")
+    
+    activation = {}
+    
+    # Quadriceps: active during knee extension and landing
+    activation["quadriceps"] = np.where(
+        landing_or_jumping,
+        (180 - knee_angle) / 180 * (grf / 3) * 100,
+        np.where(movement_is("cutting", "pivoting"), (180 - knee_angle) / 180 * 60, 0.0)
+    )
+    
+    # Hamstrings: critical for ACL protection, active during knee flexion and eccentric loading
+    activation["hamstrings"] = (np.where(knee_angle < 160, (160 - knee_angle) / 160 * 70, 0.0)
+                                + np.where(movement_is("landing"), grf * 15, 0.0))
+    
+    # Glutes: hip extension and stabilization; need glute strength to control valgus
+    activation["glutes"] = (np.where(hip_angle < 170, (170 - hip_angle) / 170 * 50, 0.0)
+                            + np.where(abs_valgus > 10, abs_valgus * 3, 0.0))
+    
+    # Calves: ankle plantarflexion during landing and jumping
+    activation["calves"] = (np.where(landing_or_jumping, (grf / 3) * 40, 0.0)
+                            + np.where(ankle_angle < 100, (100 - ankle_angle) / 100 * 30, 0.0))
+    
+    # Hip flexors: hip flexion during cutting and running
+    activation["hip_flexors"] = np.where(movement_is("cutting", "running"), (180 - hip_angle) / 180 * 50, 0.0)
+    
+    # Hip adductors: control knee valgus (important for ACL protection)
+    activation["hip_adductors"] = np.where(knee_valgus > 10, knee_valgus * 4, 0.0)
+    
+    # Hip abductors: lateral stability (knee bowing outward)
+    activation["hip_abductors"] = (np.where(knee_valgus < -5, abs_valgus * 3, 0.0)
+                                   + np.where(movement_is("cutting", "side_step"), 25.0, 0.0))
+    
+    # Core: stability during all movements, base activation 20
+    activation["core"] = (20 + np.where(grf > 2.5, (grf - 2.5) * 15, 0.0)
+                          + np.where(abs_valgus > 10, abs_valgus * 2, 0.0))
+    
+    return activation
+
 @app.post("/rehabilitation-plans")
-async def create_rehabilitation_plan(
+def create_rehabilitation_plan(
     athlete_id: int,
     provider_id: int,
     phase: str,
@@ -1151,7 +1431,7 @@ async def create_rehabilitation_plan(
     return {"id": plan.id, "phase": plan.phase}
 
 @app.get("/rehabilitation-plans/{athlete_id}")
-async def get_rehabilitation_plans(athlete_id: int, db: Session = Depends(get_db)):
+def get_rehabilitation_plans(athlete_id: int, db: Session = Depends(get_db)):
     """Get active rehabilitation plans for an athlete"""
     plans = db.query(RehabilitationPlan).filter(
         RehabilitationPlan.athlete_id == athlete_id,
@@ -1159,12 +1439,248 @@ async def get_rehabilitation_plans(athlete_id: int, db: Session = Depends(get_db
     ).all()
     return plans
 
+# Live risk broadcast hub
+class BroadcastBackend(ABC):
+    """Transport between publishers and hubs; a Redis-style pub/sub can back this to span workers"""
+    
+    async def start(self, on_message):
+        self.on_message = on_message
+    
+    @abstractmethod
+    async def publish(self, channels: List[str], message: dict):
+        """Deliver message to every hub subscribed to any of channels"""
+    
+    async def stop(self):
+        pass
+
+class InProcessBroadcastBackend(BroadcastBackend):
+    """Delivers messages to the hub in the same process (single uvicorn worker)"""
+    
+    async def publish(self, channels: List[str], message: dict):
+        self.on_message(channels, message)
+
+class HubSubscription:
+    """Bounded per-subscriber queue; when full the oldest update is dropped"""
+    
+    def __init__(self, channels: List[str], maxsize: int):
+        self.channels = set(channels)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+    
+    def offer(self, message: dict):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(message)
+
+class RiskBroadcastHub:
+    """Pub/sub keyed by session and team that coalesces updates to one per stream per interval"""
+    
+    def __init__(self, backend: BroadcastBackend, coalesce_ms: int, queue_size: int):
+        self.backend = backend
+        self.interval = coalesce_ms / 1000.0
+        self.queue_size = queue_size
+        self.subscriptions: set = set()
+        self.pending: Dict[int, tuple] = {}
+        self._ticker: Optional[asyncio.Task] = None
+    
+    @staticmethod
+    def channels_for(session_id: int, team: Optional[str]) -> List[str]:
+        channels = [f"session:{session_id}"]
+        if team:
+            channels.append(f"team:{team}")
+        return channels
+    
+    async def _ensure_started(self):
+        if self._ticker is None:
+            await self.backend.start(self._receive)
+            self._ticker = asyncio.create_task(self._deliver_periodically())
+    
+    def _receive(self, channels: List[str], message: dict):
+        # Keep only the newest update per stream, carrying the window's peak and sample count
+        previous = self.pending.get(message["session_id"])
+        if previous:
+            _, earlier = previous
+            message = dict(message,
+                           peak_risk_score=max(earlier["peak_risk_score"], message["peak_risk_score"]),
+                           samples=earlier["samples"] + message["samples"])
+        self.pending[message["session_id"]] = (channels, message)
+    
+    async def publish(self, session_id: int, athlete_id: Optional[int], team: Optional[str], risk_score: float):
+        await self._ensure_started()
+        message = {
+            "session_id": session_id,
+            "athlete_id": athlete_id,
+            "team": team,
+            "risk_score": risk_score,
+            "peak_risk_score": risk_score,
+            "warning": risk_score > 0.7,
+            "samples": 1,
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        await self.backend.publish(self.channels_for(session_id, team), message)
+    
+    async def _deliver_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if not self.pending:
+                continue
+            pending, self.pending = self.pending, {}
+            for channels, message in pending.values():
+                for subscription in self.subscriptions:
+                    if subscription.channels.intersection(channels):
+                        subscription.offer(message)
+    
+    async def subscribe(self, channels: List[str]) -> HubSubscription:
+        await self._ensure_started()
+        subscription = HubSubscription(channels, self.queue_size)
+        self.subscriptions.add(subscription)
+        return subscription
+    
+    def unsubscribe(self, subscription: HubSubscription):
+        self.subscriptions.discard(subscription)
+    
+    async def stop(self):
+        if self._ticker is not None:
+            self._ticker.cancel()
+            self._ticker = None
+            await self.backend.stop()
+
+risk_hub = RiskBroadcastHub(InProcessBroadcastBackend(), HUB_COALESCE_MS, HUB_SUBSCRIBER_QUEUE_SIZE)
+
+@app.on_event("shutdown")
+async def stop_risk_hub():
+    await risk_hub.stop()
+
+@app.websocket("/ws/monitor")
+async def websocket_monitor(websocket: WebSocket):
+    """Coach view: coalesced live risk updates for a team and/or specific sessions
+    
+    Query parameters: team=<location>, session_id=<id> (repeatable)
+    """
+    await websocket.accept()
+    channels = [f"session:{sid}" for sid in websocket.query_params.getlist("session_id")]
+    team = websocket.query_params.get("team")
+    if team:
+        channels.append(f"team:{team}")
+    if not channels:
+        await websocket.close(code=1008, reason="Specify team or session_id")
+        return
+    
+    subscription = await risk_hub.subscribe(channels)
+    
+    async def forward_updates():
+        while True:
+            await websocket.send_json(await subscription.queue.get())
+    
+    sender = asyncio.create_task(forward_updates())
+    try:
+        while True:
+            # Nothing is expected from the coach; this only notices the disconnect
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        risk_hub.unsubscribe(subscription)
+
 # WebSocket for real-time biomechanics streaming
+class BiomechanicsWriteBuffer:
+    """Per-connection write buffer that flushes every N samples or T milliseconds.
+    Flushes run on a background task, so the receive loop never waits on a commit."""
+    
+    def __init__(self, db: Session, session_id: int, max_samples: int, interval_ms: int):
+        self.db = db
+        self.session_id = session_id
+        self.max_samples = max(1, max_samples)
+        self.interval = interval_ms / 1000.0
+        self.points: List[BiomechanicsDataPoint] = []
+        self.last_flush = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.failed = 0
+        self._wake = asyncio.Event()
+        self._closing = False
+        self._flusher: Optional[asyncio.Task] = None
+    
+    @classmethod
+    def from_settings(cls, db: Session, session_id: int) -> "BiomechanicsWriteBuffer":
+        if WS_DURABILITY_MODE == "sample":
+            return cls(db, session_id, max_samples=1, interval_ms=0)
+        return cls(db, session_id, max_samples=WS_FLUSH_MAX_SAMPLES, interval_ms=WS_FLUSH_INTERVAL_MS)
+    
+    def start(self):
+        self._flusher = asyncio.create_task(self._flush_in_background())
+    
+    def add(self, point: BiomechanicsDataPoint):
+        """Buffer a sample; wakes the background flusher when the batch is full (never waits)"""
+        self.points.append(point)
+        if self.due():
+            self._wake.set()
+    
+    def due(self) -> bool:
+        if not self.points:
+            return False
+        return len(self.points) >= self.max_samples or time.monotonic() - self.last_flush >= self.interval
+    
+    def write(self, points: List[BiomechanicsDataPoint]):
+        """Write samples in one bulk insert and commit (runs on the DB thread pool)"""
+        try:
+            store_biomechanics(self.db, self.session_id, BiomechanicsColumns.from_points(points))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+    
+    async def flush(self):
+        """Hand buffered samples to the DB thread pool; one write at a time per connection"""
+        async with self.lock:
+            self.last_flush = time.monotonic()
+            if not self.points:
+                return
+            points, self.points = self.points, []
+            await run_in_threadpool(self.write, points)
+    
+    async def _flush_in_background(self):
+        """Flush when add() fills the batch, or when samples have waited the interval on an idle stream"""
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval or None)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            if self.due() and not self._closing:
+                try:
+                    await self.flush()
+                except Exception as e:
+                    self.failed += 1
+                    print(f"Error storing biomechanics for session {self.session_id}: {str(e)}")
+    
+    async def close(self):
+        """Stop the background flusher (letting a write in progress finish) and flush what is left"""
+        self._closing = True
+        self._wake.set()
+        if self._flusher is not None:
+            await self._flusher
+        await self.flush()
+
+_closing_streams: set = set()  # final flushes of closed streams, referenced until done
+
 @app.websocket("/ws/biomechanics/{session_id}")
 async def websocket_biomechanics(websocket: WebSocket, session_id: int):
     """WebSocket endpoint for real-time biomechanics data streaming"""
     await websocket.accept()
     db = SessionLocal()
+    buffer = BiomechanicsWriteBuffer.from_settings(db, session_id)
+    
+    # Resolve athlete and team once so every sample can be broadcast to coaches
+    def lookup_stream():
+        row = db.query(TrainingSession.athlete_id, User.location).outerjoin(
+            User, User.id == TrainingSession.athlete_id
+        ).filter(TrainingSession.id == session_id).first()
+        return (row.athlete_id, row.location) if row else (None, None)
+    
+    athlete_id, team = await run_in_threadpool(lookup_stream)
+    buffer.start()
     
     try:
         while True:
@@ -1173,40 +1689,37 @@ async def websocket_biomechanics(websocket: WebSocket, session_id: int):
             # Process incoming biomechanics data
             point = BiomechanicsDataPoint(**data)
             
-            # Calculate risk score
-            risk_score = 0.0
-            if point.knee_valgus > 15.0:
-                risk_score += 0.5
-            if point.ground_reaction_force > 3.0:
-                risk_score += 0.5
+            # Score exactly as the stored sample will be (HIGH_VALGUS_THRESHOLD / HIGH_IMPACT_THRESHOLD)
+            risk_scores, _ = score_biomechanics(np.array([point.knee_valgus]), np.array([point.ground_reaction_force]))
+            risk_score = float(risk_scores[0])
             
-            # Save to database
-            db_point = BiomechanicsData(
-                session_id=session_id,
-                timestamp=point.timestamp,
-                knee_angle=point.knee_angle,
-                hip_angle=point.hip_angle,
-                ankle_angle=point.ankle_angle,
-                knee_valgus=point.knee_valgus,
-                ground_reaction_force=point.ground_reaction_force,
-                movement_type=point.movement_type,
-                risk_score=min(risk_score, 1.0)
-            )
-            db.add(db_point)
-            db.commit()
+            # Buffer the sample first, so it is stored (on disconnect at the latest) even if the reply fails;
+            # the buffer's background task does the database writes
+            buffer.add(point)
             
-            # Send feedback
+            # Send feedback before touching the database
             feedback = {
                 "risk_score": risk_score,
                 "warning": risk_score > 0.7,
                 "message": "High risk movement detected" if risk_score > 0.7 else "Movement within safe range"
             }
             await websocket.send_json(feedback)
+            await risk_hub.publish(session_id, athlete_id, team, risk_score)
             
     except WebSocketDisconnect:
         pass
     finally:
-        db.close()
+        async def finish():
+            try:
+                await buffer.close()
+            finally:
+                db.close()
+        
+        # Shielded: a cancelled handler (e.g. server shutdown) still stores every sample it received
+        closing = asyncio.create_task(finish())
+        _closing_streams.add(closing)
+        closing.add_done_callback(_closing_streams.discard)
+        await asyncio.shield(closing)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,41 @@
+"""
+Alembic environment for the Dear, Tear backend
+Runs on the API's own connection when database.migrate_database() applies migrations at startup,
+otherwise (alembic command line) on database.engine, i.e. DATABASE_URL
+"""
+
+import os
+from logging.config import fileConfig
+
+from alembic import context
+
+config = context.config
+connection = config.attributes.get("connection")
+
+if connection is None:
+    # Command line: log like Alembic's templates, and import the models for --autogenerate
+    if config.config_file_name is not None:
+        fileConfig(config.config_file_name)
+    os.environ["DB_MIGRATE_ON_STARTUP"] = "false"  # this process is the migration
+    from database import Base, engine
+    target_metadata = Base.metadata
+else:
+    target_metadata = None
+
+def run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite",  # SQLite alters tables by copying them
+        compare_type=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    raise SystemExit("Offline (--sql) migrations are not supported; run against a database")
+elif connection is not None:
+    run_migrations(connection)
+else:
+    with engine.connect() as connection:
+        run_migrations(connection)
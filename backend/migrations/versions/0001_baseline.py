@@ -0,0 +1,190 @@
+"""Baseline: the schema as Base.metadata.create_all built it before migrations
+
+Databases created by create_all at any earlier point are adopted as they are: only
+missing tables and indexes are created, so upgrading an existing database is safe.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def create_table(existing, name, *columns):
+    if name not in existing:
+        op.create_table(name, *columns)
+
+def create_index(name, table, columns, unique=False):
+    indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+    if name not in indexes:
+        op.create_index(name, table, columns, unique=unique)
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    create_table(
+        existing, "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String()),
+        sa.Column("name", sa.String()),
+        sa.Column("role", sa.String()),
+        sa.Column("hashed_password", sa.String()),
+        sa.Column("age", sa.Integer(), nullable=True),
+        sa.Column("gender", sa.String(), nullable=True),
+        sa.Column("bmi", sa.Float(), nullable=True),
+        sa.Column("location", sa.String(), nullable=True),
+        sa.Column("is_rural", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+    )
+    create_index("ix_users_id", "users", ["id"])
+    create_index("ix_users_email", "users", ["email"], unique=True)
+
+    create_table(
+        existing, "training_sessions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("athlete_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("session_type", sa.String()),
+        sa.Column("sport", sa.String()),
+        sa.Column("duration_minutes", sa.Integer()),
+        sa.Column("start_time", sa.DateTime()),
+        sa.Column("end_time", sa.DateTime()),
+        sa.Column("high_risk_movements", sa.Integer()),
+        sa.Column("avg_knee_valgus", sa.Float(), nullable=True),
+        sa.Column("avg_landing_force", sa.Float(), nullable=True),
+        sa.Column("peak_impact_force", sa.Float(), nullable=True),
+    )
+    create_index("ix_training_sessions_id", "training_sessions", ["id"])
+
+    create_table(
+        existing, "session_analytics",
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("training_sessions.id"), primary_key=True),
+        sa.Column("sample_count", sa.Integer()),
+        sa.Column("high_risk_count", sa.Integer()),
+        sa.Column("knee_valgus_sum", sa.Float()),
+        sa.Column("ground_reaction_force_sum", sa.Float()),
+        sa.Column("peak_ground_reaction_force", sa.Float(), nullable=True),
+        sa.Column("movement_types", sa.Text()),
+        sa.Column("muscle_totals", sa.Text()),
+        sa.Column("muscle_peaks", sa.Text()),
+        sa.Column("updated_at", sa.DateTime()),
+    )
+
+    create_table(
+        existing, "biomechanics_data",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("training_sessions.id")),
+        sa.Column("timestamp", sa.DateTime()),
+        sa.Column("knee_angle", sa.Float()),
+        sa.Column("hip_angle", sa.Float()),
+        sa.Column("ankle_angle", sa.Float()),
+        sa.Column("knee_valgus", sa.Float()),
+        sa.Column("ground_reaction_force", sa.Float()),
+        sa.Column("movement_type", sa.String()),
+        sa.Column("risk_score", sa.Float()),
+    )
+    create_index("ix_biomechanics_data_id", "biomechanics_data", ["id"])
+
+    create_table(
+        existing, "risk_assessments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("athlete_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("assessment_date", sa.DateTime()),
+        sa.Column("overall_risk_score", sa.Float()),
+        sa.Column("movement_pattern_risk", sa.Float()),
+        sa.Column("demographic_risk", sa.Float()),
+        sa.Column("health_history_risk", sa.Float()),
+        sa.Column("recommendations", sa.Text()),
+        sa.Column("focus_areas", sa.Text()),
+    )
+    create_index("ix_risk_assessments_id", "risk_assessments", ["id"])
+    create_index("ix_risk_assessments_athlete_date", "risk_assessments", ["athlete_id", "assessment_date"])
+
+    create_table(
+        existing, "injury_history",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("athlete_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("injury_type", sa.String()),
+        sa.Column("injury_date", sa.DateTime()),
+        sa.Column("recovery_status", sa.String()),
+        sa.Column("notes", sa.Text()),
+    )
+    create_index("ix_injury_history_id", "injury_history", ["id"])
+
+    create_table(
+        existing, "rehabilitation_plans",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("athlete_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("provider_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("phase", sa.String()),
+        sa.Column("exercises", sa.Text()),
+        sa.Column("duration_weeks", sa.Integer()),
+        sa.Column("progress_percentage", sa.Float()),
+        sa.Column("is_active", sa.Boolean()),
+    )
+    create_index("ix_rehabilitation_plans_id", "rehabilitation_plans", ["id"])
+
+    create_table(
+        existing, "xray_analyses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("athlete_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("image_path", sa.String()),
+        sa.Column("uploaded_at", sa.DateTime()),
+        sa.Column("has_fracture", sa.Boolean()),
+        sa.Column("has_alignment_issue", sa.Boolean()),
+        sa.Column("joint_spacing_abnormal", sa.Boolean()),
+        sa.Column("severity", sa.String()),
+        sa.Column("triage_recommendation", sa.String()),
+        sa.Column("findings", sa.Text()),
+        sa.Column("educational_explanation", sa.Text()),
+        sa.Column("confidence_score", sa.Float(), nullable=True),
+        sa.Column("injury_history_id", sa.Integer(), sa.ForeignKey("injury_history.id"), nullable=True),
+    )
+    create_index("ix_xray_analyses_id", "xray_analyses", ["id"])
+
+    create_table(
+        existing, "xray_images",
+        sa.Column("sha256", sa.String(64), primary_key=True),
+        sa.Column("image_path", sa.String()),
+        sa.Column("content_type", sa.String(), nullable=True),
+        sa.Column("size_bytes", sa.Integer()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("analysis_result", sa.Text(), nullable=True),
+    )
+
+    create_table(
+        existing, "cues",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("text", sa.String()),
+        sa.Column("modality", sa.String()),
+        sa.Column("movement_context", sa.String()),
+        sa.Column("risk_driver", sa.String()),
+        sa.Column("culture_tags", sa.String(), nullable=True),
+        sa.Column("locale", sa.String()),
+    )
+    create_index("ix_cues_id", "cues", ["id"])
+
+    create_table(
+        existing, "cue_events",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("athlete_id", sa.Integer(), sa.ForeignKey("users.id")),
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("training_sessions.id"), nullable=True),
+        sa.Column("timestamp", sa.DateTime()),
+        sa.Column("movement_context", sa.String()),
+        sa.Column("risk_driver", sa.String()),
+        sa.Column("cue_id", sa.Integer(), sa.ForeignKey("cues.id")),
+        sa.Column("delta_valgus", sa.Float(), nullable=True),
+        sa.Column("delta_grf", sa.Float(), nullable=True),
+    )
+    create_index("ix_cue_events_id", "cue_events", ["id"])
+
+def downgrade():
+    for name in ["cue_events", "cues", "xray_images", "xray_analyses", "rehabilitation_plans", "injury_history",
+                 "risk_assessments", "biomechanics_data", "session_analytics", "training_sessions", "users"]:
+        op.drop_table(name)
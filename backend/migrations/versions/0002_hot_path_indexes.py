@@ -0,0 +1,39 @@
+"""Composite indexes for the hot per-athlete / per-session queries
+
+Each serves a filter plus its ORDER BY, so the database reads rows in order
+instead of scanning the table and sorting:
+  biomechanics_data  session_id, timestamp, id  (session analysis, movement counts)
+  training_sessions  athlete_id, start_time     (session lists, recent sessions for risk)
+  xray_analyses      athlete_id, uploaded_at    (X-ray history)
+  cues               movement_context, risk_driver, locale  (GET /cues)
+risk_assessments (athlete_id, assessment_date) is already in the baseline.
+
+Revision ID: 0002_hot_path_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0002_hot_path_indexes"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_biomechanics_data_session_timestamp", "biomechanics_data", ["session_id", "timestamp", "id"]),
+    ("ix_training_sessions_athlete_start", "training_sessions", ["athlete_id", "start_time"]),
+    ("ix_xray_analyses_athlete_uploaded", "xray_analyses", ["athlete_id", "uploaded_at"]),
+    ("ix_cues_context_driver_locale", "cues", ["movement_context", "risk_driver", "locale"]),
+]
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+    # Give the planner statistics for the new indexes
+    if op.get_bind().dialect.name in ("sqlite", "postgresql"):
+        op.execute("ANALYZE")
+
+def downgrade():
+    for name, table, _ in INDEXES:
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,44 @@
+"""Compact biomechanics storage: compressed per-session sample blocks and the movement type lookup
+
+Closed sessions' samples move from biomechanics_data into biomechanics_blocks (see compact_session_samples
+in biomechanics_storage.py); movement types are stored in the blocks as small-int ids from movement_types.
+
+Revision ID: 0003_biomechanics_blocks
+Revises: 0002_hot_path_indexes
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_biomechanics_blocks"
+down_revision = "0002_hot_path_indexes"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "movement_types",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False, unique=True),
+    )
+    op.create_table(
+        "biomechanics_blocks",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("training_sessions.id"), nullable=False),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=False),
+        sa.Column("sample_count", sa.Integer(), nullable=False),
+        sa.Column("valgus_threshold", sa.Float(), nullable=False),
+        sa.Column("impact_threshold", sa.Float(), nullable=False),
+        sa.Column("high_valgus_count", sa.Integer(), nullable=False),
+        sa.Column("high_impact_count", sa.Integer(), nullable=False),
+        sa.Column("data", sa.LargeBinary(), nullable=False),
+    )
+    op.create_index("ix_biomechanics_blocks_session_start", "biomechanics_blocks", ["session_id", "start_time"])
+
+def downgrade():
+    # Samples still in blocks are dropped with them
+    op.drop_index("ix_biomechanics_blocks_session_start", table_name="biomechanics_blocks")
+    op.drop_table("biomechanics_blocks")
+    op.drop_table("movement_types")
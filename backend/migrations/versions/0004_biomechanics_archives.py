@@ -0,0 +1,57 @@
+"""Biomechanics retention: archive records and per-second aggregates of archived sessions
+
+The retention job moves old sessions' samples to archive files (see archive_session_samples in biomechanics_storage.py);
+biomechanics_archives points at each file and biomechanics_aggregates keeps per-second, per-movement-type
+means in the database.
+
+Revision ID: 0004_biomechanics_archives
+Revises: 0003_biomechanics_blocks
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_biomechanics_archives"
+down_revision = "0003_biomechanics_blocks"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "biomechanics_archives",
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("training_sessions.id"), primary_key=True),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=False),
+        sa.Column("sample_count", sa.Integer(), nullable=False),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("archived_at", sa.DateTime()),
+        sa.Column("valgus_threshold", sa.Float(), nullable=False),
+        sa.Column("impact_threshold", sa.Float(), nullable=False),
+        sa.Column("high_valgus_count", sa.Integer(), nullable=False),
+        sa.Column("high_impact_count", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "biomechanics_aggregates",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("session_id", sa.Integer(), sa.ForeignKey("training_sessions.id"), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("movement_type_id", sa.Integer(), sa.ForeignKey("movement_types.id"), nullable=True),
+        sa.Column("sample_count", sa.Integer(), nullable=False),
+        sa.Column("knee_angle", sa.Float()),
+        sa.Column("hip_angle", sa.Float()),
+        sa.Column("ankle_angle", sa.Float()),
+        sa.Column("knee_valgus", sa.Float()),
+        sa.Column("ground_reaction_force", sa.Float()),
+        sa.Column("risk_score", sa.Float()),
+        sa.Column("peak_knee_valgus", sa.Float()),
+        sa.Column("peak_ground_reaction_force", sa.Float()),
+    )
+    op.create_index("ix_biomechanics_aggregates_session_bucket", "biomechanics_aggregates", ["session_id", "bucket_start"])
+
+def downgrade():
+    # Archive files are left on disk; their samples are no longer visible to the API
+    op.drop_index("ix_biomechanics_aggregates_session_bucket", table_name="biomechanics_aggregates")
+    op.drop_table("biomechanics_aggregates")
+    op.drop_table("biomechanics_archives")
@@ -0,0 +1,23 @@
+"""Per-athlete assessment version, bumped with any change to the athlete's risk assessment inputs
+
+Cached assessments are keyed on it, so every API worker notices inputs changed by another one.
+
+Revision ID: 0005_assessment_versions
+Revises: 0004_biomechanics_archives
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_assessment_versions"
+down_revision = "0004_biomechanics_archives"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("users", sa.Column("assessment_version", sa.Integer(), nullable=False, server_default="0"))
+
+def downgrade():
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("assessment_version")
@@ -0,0 +1,102 @@
+"""
+Shared runtime pieces: the worker pools, in-process caching and the metrics registry
+"""
+
+from typing import Optional, Dict, Callable
+import numpy as np
+import os
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+# Concurrency: blocking DB work runs on a bounded thread pool, CPU-heavy work on a process pool
+DB_THREADPOOL_SIZE = int(os.getenv("DB_THREADPOOL_SIZE", "40"))
+CPU_POOL_WORKERS = int(os.getenv("CPU_POOL_WORKERS", str(os.cpu_count() or 1)))
+
+# Executors
+_cpu_executor: Optional[ProcessPoolExecutor] = None
+
+def _init_cpu_worker():
+    # Forked workers must not share the parent's DB connections or RNG state
+    from database import engine
+    engine.dispose(close=False)
+    np.random.seed()
+
+def get_cpu_executor() -> ProcessPoolExecutor:
+    global _cpu_executor
+    if _cpu_executor is None:
+        _cpu_executor = ProcessPoolExecutor(max_workers=CPU_POOL_WORKERS, initializer=_init_cpu_worker)
+    return _cpu_executor
+
+async def run_cpu_bound(func, *args):
+    """Run a CPU-heavy, picklable function on the process pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_cpu_executor(), func, *args)
+
+def cpu_worker_ready(_) -> int:
+    return os.getpid()
+
+async def shutdown_cpu_executor():
+    global _cpu_executor
+    if _cpu_executor is not None:
+        _cpu_executor.shutdown(wait=False, cancel_futures=True)
+        _cpu_executor = None
+
+# Lazily loaded subsystems: OpenCV, PIL, joblib/scikit-learn and the models are imported on first use
+lazy_init_lock = threading.Lock()
+
+# Metrics: each subsystem registers a callable returning its current figures
+metrics_sources: Dict[str, Callable[[], Dict]] = {}
+
+def summarize_durations(durations_ms) -> Dict[str, float]:
+    """Count and percentiles of recent durations in milliseconds"""
+    values = np.fromiter(durations_ms, dtype=np.float64)
+    if len(values) == 0:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        "count": len(values),
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "max_ms": round(float(values.max()), 1),
+    }
+
+# In-process caching
+class TTLCache:
+    """Small thread-safe LRU whose entries expire after ttl_seconds (or a per-entry deadline)"""
+    
+    def __init__(self, maxsize: int, ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl = ttl_seconds
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value, expires_at: Optional[float] = None):
+        with self._lock:
+            self._entries[key] = (expires_at if expires_at is not None else time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
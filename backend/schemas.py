@@ -0,0 +1,150 @@
+"""
+Request and response models
+"""
+
+from pydantic import BaseModel, EmailStr, field_validator
+from datetime import datetime, timezone
+from typing import List, Optional, Dict
+
+from database import UserRole
+
+# Pydantic Models
+class UserCreate(BaseModel):
+    email: EmailStr
+    name: str
+    password: str
+    role: UserRole
+    age: Optional[int] = None
+    gender: Optional[str] = None
+    bmi: Optional[float] = None
+    location: Optional[str] = None
+    is_rural: bool = False
+
+class UserLogin(BaseModel):
+    email: EmailStr
+    password: str
+
+class Token(BaseModel):
+    access_token: str
+    token_type: str
+    user_id: int
+    role: str
+    name: str
+
+class TokenData(BaseModel):
+    email: Optional[str] = None
+
+class TrainingSessionCreate(BaseModel):
+    athlete_id: int
+    session_type: str
+    sport: str
+    duration_minutes: int
+    start_time: datetime
+
+def naive_utc(value: datetime) -> datetime:
+    """Timestamps are stored as naive UTC: aware values are converted, naive ones are taken as UTC already"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+class BiomechanicsDataPoint(BaseModel):
+    timestamp: datetime
+    knee_angle: float
+    hip_angle: float
+    ankle_angle: float
+    knee_valgus: float
+    ground_reaction_force: float
+    movement_type: str
+    
+    @field_validator("timestamp")
+    @classmethod
+    def timestamp_as_naive_utc(cls, value: datetime) -> datetime:
+        return naive_utc(value)
+
+class RiskAssessmentResponse(BaseModel):
+    overall_risk_score: float
+    movement_pattern_risk: float
+    demographic_risk: float
+    health_history_risk: float
+    recommendations: str
+    focus_areas: List[str]
+
+class RosterAssessmentRequest(BaseModel):
+    athlete_ids: Optional[List[int]] = None  # None scores every athlete
+
+class RosterAssessmentResult(RiskAssessmentResponse):
+    athlete_id: int
+
+class CueCreate(BaseModel):
+    text: str
+    modality: str
+    movement_context: str
+    risk_driver: str
+    culture_tags: Optional[str] = None
+    locale: str = "en-US"
+
+class CueOut(BaseModel):
+    id: int
+    text: str
+    modality: str
+    movement_context: str
+    risk_driver: str
+    culture_tags: Optional[str]
+    locale: str
+
+class CueEventCreate(BaseModel):
+    athlete_id: int
+    session_id: Optional[int] = None
+    movement_context: str
+    risk_driver: str
+    cue_id: int
+    delta_valgus: Optional[float] = None
+    delta_grf: Optional[float] = None
+
+class XRayAnalysisResponse(BaseModel):
+    id: int
+    athlete_id: int
+    has_fracture: bool
+    has_alignment_issue: bool
+    joint_spacing_abnormal: bool
+    severity: str
+    triage_recommendation: str
+    findings: str
+    educational_explanation: str
+    confidence_score: Optional[float]
+    uploaded_at: datetime
+    image_url: Optional[str] = None
+    renditions: Dict[str, str] = {}  # rendition name -> URL, e.g. thumbnail, preview
+
+class CurrentUser(BaseModel):
+    user_id: int
+    email: str
+    role: str
+
+class XRayJobResponse(BaseModel):
+    job_id: str
+    status: str  # queued|running|succeeded|failed
+    athlete_id: int
+    submitted_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    timings_ms: Dict[str, float] = {}
+    duplicate: bool = False  # analysis reused from an identical image instead of recomputed
+    result: Optional[XRayAnalysisResponse] = None
+    error: Optional[str] = None
+
+class XRayStudyImage(BaseModel):
+    filename: Optional[str] = None
+    duplicate: bool = False
+    analysis: XRayAnalysisResponse
+
+class XRayStudyResponse(BaseModel):
+    athlete_id: int
+    severity: str  # most severe view
+    triage_recommendation: str  # most urgent view
+    has_fracture: bool
+    has_alignment_issue: bool
+    joint_spacing_abnormal: bool
+    summary: str
+    images: List[XRayStudyImage]
+    timings_ms: Dict[str, float] = {}
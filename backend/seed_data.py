@@ -10,9 +10,9 @@ import random
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
-# Import models from main.py
+# Import models from database.py
 sys.path.append('.')
-from main import Base, User, TrainingSession, BiomechanicsData, RiskAssessment, RehabilitationPlan
+from database import Base, User, TrainingSession, BiomechanicsData, RiskAssessment, RehabilitationPlan
 
 # Database setup
 SQLALCHEMY_DATABASE_URL = "sqlite:///./aclguard.db"
@@ -0,0 +1,71 @@
+"""
+Shared fixtures: the API runs in-process against a throwaway SQLite database, with uploads, archives and
+the model file under a temporary directory. Settings are environment variables read when main is imported,
+so they are set here first; tests that need another value patch the constant on the module that defines it.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from itertools import count
+
+_tmp = tempfile.mkdtemp(prefix="acl-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp}/test.db"
+os.environ["XRAY_STORAGE_DIR"] = os.path.join(_tmp, "xray")
+os.environ["BIOMECHANICS_ARCHIVE_DIR"] = os.path.join(_tmp, "archive")
+os.environ["RISK_MODEL_PATH"] = os.path.join(_tmp, "model.pkl")
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["WARMUP_ON_STARTUP"] = "false"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+
+import database
+import main
+
+_ids = count(1)
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def db():
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def athlete(db):
+    """A fresh athlete (own email) with no sessions"""
+    n = next(_ids)
+    user = database.User(email=f"athlete{n}@example.com", name=f"Athlete {n}", role="athlete", hashed_password="x",
+                     age=20, gender="female", bmi=22.0, location=f"team{n}", is_rural=False)
+    db.add(user)
+    db.commit()
+    return user
+
+@pytest.fixture
+def training_session(db, athlete):
+    """An open session of the athlete starting 2026-01-01"""
+    session = database.TrainingSession(athlete_id=athlete.id, session_type="practice", sport="soccer",
+                                   duration_minutes=60, start_time=datetime(2026, 1, 1))
+    db.add(session)
+    db.commit()
+    return session
+
+def sample(i: int, start: datetime = datetime(2026, 1, 1), **fields) -> dict:
+    """One biomechanics data point as the API accepts it, 10 ms apart by index"""
+    point = {
+        "timestamp": (start + timedelta(milliseconds=10 * i)).isoformat(),
+        "knee_angle": 150.0 + i % 7, "hip_angle": 165.0 - i % 5, "ankle_angle": 90.0 + i % 3,
+        "knee_valgus": float(5 + i % 17), "ground_reaction_force": 1.5 + (i % 11) / 4,
+        "movement_type": ("landing", "cutting", "pivoting")[i // 50 % 3],
+    }
+    point.update(fields)
+    return point
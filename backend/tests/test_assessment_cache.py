@@ -0,0 +1,68 @@
+from datetime import datetime
+
+from sqlalchemy import insert, update
+
+import database
+import main
+from tests.conftest import sample
+
+def assessment_rows(db, athlete_id: int) -> int:
+    db.expire_all()
+    return db.query(database.RiskAssessment).filter(database.RiskAssessment.athlete_id == athlete_id).count()
+
+def test_repeated_reads_are_served_from_cache(client, db, athlete, training_session):
+    first = client.get(f"/athletes/{athlete.id}/risk-assessment")
+    assert first.status_code == 200
+    assert client.get(f"/athletes/{athlete.id}/risk-assessment").json() == first.json()
+    assert assessment_rows(db, athlete.id) == 1
+
+def test_unknown_athlete_is_404(client):
+    assert client.get("/athletes/999999/risk-assessment").status_code == 404
+
+def test_ingest_bumps_the_stored_version(client, db, athlete, training_session):
+    client.get(f"/athletes/{athlete.id}/risk-assessment")
+    version = db.get(database.User, athlete.id).assessment_version
+    response = client.post(f"/sessions/{training_session.id}/biomechanics",
+                           json=[sample(i, knee_valgus=25.0, ground_reaction_force=4.0) for i in range(50)])
+    assert response.status_code == 200
+    db.expire_all()
+    assert db.get(database.User, athlete.id).assessment_version == version + 1
+    assessment = client.get(f"/athletes/{athlete.id}/risk-assessment").json()
+    assert assessment["movement_pattern_risk"] > 0
+
+def test_change_made_by_another_worker_invalidates_the_cache(client, db, athlete, training_session):
+    before = client.get(f"/athletes/{athlete.id}/risk-assessment").json()
+    # Another worker's ingest: high-risk samples committed on its own connection, so only the stored
+    # version tells this process about them (the local cache is left untouched)
+    with database.engine.begin() as conn:
+        conn.execute(insert(database.BiomechanicsData.__table__), [
+            {"session_id": training_session.id, "timestamp": datetime(2026, 1, 1, 0, 0, i), "knee_angle": 150.0,
+             "hip_angle": 165.0, "ankle_angle": 90.0, "knee_valgus": 25.0, "ground_reaction_force": 4.0,
+             "movement_type": "landing", "risk_score": 1.0} for i in range(30)])
+        conn.execute(update(database.User.__table__).where(database.User.id == athlete.id)
+                     .values(assessment_version=database.User.assessment_version + 1))
+    assert athlete.id in main.assessment_cache._entries
+    after = client.get(f"/athletes/{athlete.id}/risk-assessment").json()
+    assert after["movement_pattern_risk"] > before["movement_pattern_risk"]
+
+def test_orm_changes_bump_the_version(db, athlete, training_session):
+    db.add(database.InjuryHistory(athlete_id=athlete.id, injury_type="sprain", injury_date=datetime(2025, 1, 1),
+                              recovery_status="recovered"))
+    db.commit()
+    athlete.bmi = 30.0
+    db.commit()
+    db.expire_all()
+    # the session added by the fixture, the injury and the demographics change
+    assert db.get(database.User, athlete.id).assessment_version == 3
+
+def test_heatmap_sees_assessments_persisted_elsewhere(client, db, athlete, monkeypatch):
+    monkeypatch.setattr(main, "HEATMAP_CACHE_TTL_SECONDS", 3600.0)
+    team = {"team": athlete.location}
+    assert client.get("/team/heatmap", params=team).json()["team"][0]["risk"] == 0.3
+    with database.engine.begin() as conn:
+        conn.execute(insert(database.RiskAssessment.__table__).values(
+            athlete_id=athlete.id, assessment_date=datetime.utcnow(), overall_risk_score=0.9,
+            movement_pattern_risk=0.9, demographic_risk=0.5, health_history_risk=0.0, recommendations="",
+            focus_areas="[]"))
+    row = client.get("/team/heatmap", params=team).json()["team"][0]
+    assert (row["risk"], row["bucket"]) == (0.9, "high")
@@ -0,0 +1,77 @@
+"""Bearer-token checks with AUTH_REQUIRED on: bad tokens are a 401 (never a 500), sign-up only mints athletes
+unless an admin asks, and image URLs accept the token as a query parameter."""
+
+import time
+
+import pytest
+from jose import jwt
+
+import auth
+import database
+
+@pytest.fixture(autouse=True)
+def auth_required(monkeypatch):
+    monkeypatch.setattr(auth, "AUTH_REQUIRED", True)
+    auth.verified_tokens.clear()
+
+def token_for(user, **claims) -> str:
+    payload = {"sub": user.email, "user_id": user.id, "role": user.role}
+    payload.update(claims)
+    return jwt.encode(payload, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+
+def get_user(client, user, token):
+    return client.get(f"/users/{user.id}", headers={"Authorization": f"Bearer {token}"})
+
+def test_valid_token_is_accepted(client, athlete):
+    token = auth.create_access_token({"sub": athlete.email, "user_id": athlete.id, "role": athlete.role})
+    assert get_user(client, athlete, token).status_code == 200
+
+def test_missing_token_is_rejected(client, athlete):
+    response = client.get(f"/users/{athlete.id}")
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Not authenticated"
+
+def test_token_without_exp_is_cached_for_the_ttl(client, athlete):
+    token = token_for(athlete)
+    assert get_user(client, athlete, token).status_code == 200
+    expires_at, _ = auth.verified_tokens._entries[token]
+    assert expires_at <= time.time() + auth.verified_tokens.ttl
+
+def test_expired_token_is_rejected(client, athlete):
+    token = token_for(athlete, exp=int(time.time()) - 60)
+    response = get_user(client, athlete, token)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Invalid or expired token"
+
+def test_token_missing_claims_is_rejected(client, athlete):
+    token = jwt.encode({"sub": athlete.email, "exp": int(time.time()) + 60}, auth.SECRET_KEY,
+                       algorithm=auth.ALGORITHM)
+    assert get_user(client, athlete, token).status_code == 401
+
+def test_token_signed_with_another_key_is_rejected(client, athlete):
+    token = jwt.encode({"sub": athlete.email, "user_id": athlete.id, "role": athlete.role}, "not-the-key",
+                       algorithm=auth.ALGORITHM)
+    assert get_user(client, athlete, token).status_code == 401
+
+def test_sign_up_other_roles_needs_an_admin(client, db, athlete):
+    account = {"email": f"coach-of-{athlete.email}", "password": "secret123", "name": "Coach", "role": "coach"}
+    assert client.post("/users", json=account).status_code == 403
+    assert client.post("/users", json=account,
+                       headers={"Authorization": f"Bearer {token_for(athlete)}"}).status_code == 403
+    admin = database.User(email=f"admin-{athlete.email}", name="Admin", role="admin", hashed_password="x")
+    db.add(admin)
+    db.commit()
+    response = client.post("/users", json=account, headers={"Authorization": f"Bearer {token_for(admin)}"})
+    assert response.status_code == 200
+    assert response.json()["role"] == "coach"
+
+def test_sign_up_as_athlete_is_public(client, athlete):
+    account = {"email": f"new-{athlete.email}", "password": "secret123", "name": "New", "role": "athlete"}
+    assert client.post("/users", json=account).status_code == 200
+
+def test_query_token_only_for_image_urls(client, athlete):
+    token = token_for(athlete)
+    # Unknown image, but authenticated: 404 rather than 401
+    assert client.get(f"/xray/images/{'0' * 64}?token={token}").status_code == 404
+    assert client.get(f"/xray/images/{'0' * 64}").status_code == 401
+    assert client.get(f"/users/{athlete.id}?token={token}").status_code == 401
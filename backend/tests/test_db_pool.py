@@ -0,0 +1,44 @@
+import threading
+
+import database
+
+def test_pool_stats_count_every_checkout_across_threads():
+    stats = database.PoolStats()
+    threads, per_thread = 8, 5000
+    errors = []
+    done = threading.Event()
+    
+    def check_out():
+        for i in range(per_thread):
+            stats.checked_out(float(i % 50))
+            if i % 10 == 0:
+                stats.timed_out()
+    
+    def read_metrics():
+        # Summarizing while other threads append must not trip over a mutating deque
+        while not done.is_set():
+            try:
+                stats.metrics()
+            except RuntimeError as e:
+                errors.append(e)
+    
+    reader = threading.Thread(target=read_metrics)
+    reader.start()
+    writers = [threading.Thread(target=check_out) for _ in range(threads)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    done.set()
+    reader.join()
+    
+    assert errors == []
+    metrics = stats.metrics()
+    assert metrics["checkouts"] == threads * per_thread
+    assert metrics["timeouts"] == threads * per_thread // 10
+    assert metrics["wait"]["count"] == 1000
+
+def test_metrics_report_pool_checkouts(client):
+    before = client.get("/metrics").json()["db_pool"]["checkouts"]
+    client.get("/users/0")
+    assert client.get("/metrics").json()["db_pool"]["checkouts"] > before
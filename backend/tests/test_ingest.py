@@ -0,0 +1,129 @@
+import json
+import struct
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import biomechanics_storage
+import database
+import main
+import schemas
+from tests.conftest import sample
+
+START = datetime(2026, 1, 1)
+MOVEMENTS = ["landing", "cutting", "pivoting"]
+
+def stored_samples(db, session_id: int):
+    return db.query(database.BiomechanicsData).filter(
+        database.BiomechanicsData.session_id == session_id
+    ).order_by(database.BiomechanicsData.timestamp, database.BiomechanicsData.id).all()
+
+def upload(client, session_id: int, body, content_type: str):
+    return client.post(f"/sessions/{session_id}/biomechanics", content=body, headers={"content-type": content_type})
+
+def binary_payload(points, magic: bytes = b"BIO2", base: datetime = START) -> bytes:
+    header = magic + struct.pack("<d", base.replace(tzinfo=timezone.utc).timestamp()) + bytes([len(MOVEMENTS)])
+    header += b"".join(bytes([len(name)]) + name.encode() for name in MOVEMENTS)
+    records = np.zeros(len(points), dtype=main.BINARY_RECORD_DTYPES[magic])
+    for i, point in enumerate(points):
+        offset = datetime.fromisoformat(point["timestamp"]) - base
+        records[i]["t"] = offset / timedelta(microseconds=1) if magic == b"BIO2" else offset.total_seconds()
+        for field in biomechanics_storage.BIOMECHANICS_VALUE_FIELDS:
+            records[i][field] = point[field]
+        records[i]["movement_type"] = MOVEMENTS.index(point["movement_type"])
+    return header + records.tobytes()
+
+def assert_round_trip(db, session_id: int, points):
+    rows = stored_samples(db, session_id)
+    assert [row.timestamp for row in rows] == [datetime.fromisoformat(p["timestamp"]) for p in points]
+    for field in biomechanics_storage.BIOMECHANICS_VALUE_FIELDS:
+        assert [getattr(row, field) for row in rows] == pytest.approx([p[field] for p in points], rel=1e-6)
+    assert [row.movement_type for row in rows] == [p["movement_type"] for p in points]
+
+def test_json_round_trip(client, db, training_session):
+    points = [sample(i) for i in range(120)]
+    response = client.post(f"/sessions/{training_session.id}/biomechanics", json=points)
+    assert response.status_code == 200
+    assert_round_trip(db, training_session.id, points)
+
+def test_ndjson_round_trip(client, db, training_session):
+    points = [sample(i) for i in range(120)]
+    body = "\n".join(json.dumps(p) for p in points) + "\n"
+    assert upload(client, training_session.id, body, "application/x-ndjson").status_code == 200
+    assert_round_trip(db, training_session.id, points)
+
+def test_binary_round_trip(client, db, training_session):
+    points = [sample(i) for i in range(120)]
+    assert upload(client, training_session.id, binary_payload(points), "application/x-biomechanics-f32").status_code == 200
+    assert_round_trip(db, training_session.id, points)
+
+def test_binary_offsets_stay_exact_on_long_captures(client, db, training_session):
+    # Ten hours in, float32 seconds are only good to about 4 ms; int64 microseconds are exact
+    late = START + timedelta(hours=10, microseconds=1250)
+    points = [sample(i, start=late) for i in range(5)]
+    assert upload(client, training_session.id, binary_payload(points), "application/x-biomechanics-f32").status_code == 200
+    assert_round_trip(db, training_session.id, points)
+
+def test_legacy_float32_binary_is_still_accepted(client, db, training_session):
+    points = [sample(i) for i in range(20)]
+    body = binary_payload(points, magic=b"BIO1")
+    assert upload(client, training_session.id, body, "application/x-biomechanics-f32").status_code == 200
+    assert_round_trip(db, training_session.id, points)
+
+def test_timestamps_are_stored_as_naive_utc(client, db, training_session):
+    aware = sample(0, timestamp="2026-01-01T02:00:00+02:00")
+    naive = sample(1, timestamp="2026-01-01T00:00:01")
+    epoch = sample(2, timestamp=datetime(2026, 1, 1, 0, 0, 2, tzinfo=timezone.utc).timestamp())
+    assert client.post(f"/sessions/{training_session.id}/biomechanics", json=[aware, naive]).status_code == 200
+    body = "\n".join(json.dumps(p) for p in (aware, naive, epoch))
+    assert upload(client, training_session.id, body, "application/x-ndjson").status_code == 200
+    stored = [row.timestamp for row in stored_samples(db, training_session.id)]
+    assert stored == [datetime(2026, 1, 1, 0, 0, s) for s in (0, 0, 1, 1, 2)]
+    assert all(t.tzinfo is None for t in stored)
+
+@pytest.mark.parametrize("body", [
+    "not json\n",
+    json.dumps({"knee_angle": 150.0}) + "\n",
+    json.dumps(sample(0, timestamp="yesterday")) + "\n",
+    json.dumps(sample(0, timestamp=1e20)) + "\n",
+    json.dumps(sample(0, knee_angle="bent")) + "\n",
+])
+def test_malformed_ndjson_is_rejected(client, db, training_session, body):
+    response = upload(client, training_session.id, json.dumps(sample(0)) + "\n" + body, "application/x-ndjson")
+    assert response.status_code == 422
+    assert "line 2" in response.json()["detail"]
+    assert stored_samples(db, training_session.id) == []
+
+@pytest.mark.parametrize("corrupt", [
+    lambda payload: b"BIO9" + payload[4:],
+    lambda payload: payload[:10],
+    lambda payload: payload[:-3],
+    lambda payload: payload[:-1] + bytes([len(MOVEMENTS)]),
+])
+def test_malformed_binary_is_rejected(client, db, training_session, corrupt):
+    payload = binary_payload([sample(i) for i in range(3)])
+    response = upload(client, training_session.id, corrupt(payload), "application/x-biomechanics-f32")
+    assert response.status_code == 422
+    assert stored_samples(db, training_session.id) == []
+
+def test_malformed_json_is_rejected(client, db, training_session):
+    response = client.post(f"/sessions/{training_session.id}/biomechanics", json=[sample(0), {"timestamp": "x"}])
+    assert response.status_code == 422
+    assert stored_samples(db, training_session.id) == []
+
+def test_json_validation_errors_match_a_declared_body(client, training_session):
+    reference = FastAPI()
+    
+    @reference.post("/points")
+    def points(body: List[schemas.BiomechanicsDataPoint]):
+        return {}
+    
+    invalid = [sample(0), sample(1, timestamp="x", knee_angle="bent"), {"movement_type": "landing"}]
+    expected = TestClient(reference).post("/points", json=invalid)
+    response = client.post(f"/sessions/{training_session.id}/biomechanics", json=invalid)
+    assert response.status_code == expected.status_code == 422
+    assert response.json() == expected.json()
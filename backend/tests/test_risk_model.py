@@ -0,0 +1,35 @@
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+import main
+
+def fitted(labels, tmp_path):
+    rng = np.random.default_rng(0)
+    features = rng.normal(size=(60, len(main.RISK_MODEL_FEATURES)))
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(features, np.resize(labels, 60))
+    path = tmp_path / "model.pkl"
+    joblib.dump(model, path)
+    return main.ACLRiskAssessmentModel(model_path=str(path)), features
+
+def test_binary_model_predicts_the_injury_class(tmp_path):
+    risk_model, features = fitted([0, 1], tmp_path)
+    assert risk_model.model is not None
+    probabilities = risk_model.predict_overall_risk(features)
+    expected = risk_model.model.predict_proba(features)[:, list(risk_model.model.classes_).index(1)]
+    np.testing.assert_allclose(probabilities, expected)
+
+@pytest.mark.parametrize("labels", [[0, 2], ["0", "1"]])
+def test_model_without_injury_class_is_ignored(tmp_path, labels):
+    risk_model, features = fitted(labels, tmp_path)
+    risk_model.load_model()
+    assert risk_model.model is None
+    assert risk_model.predict_overall_risk(features) is None  # rule-based scoring instead of a 500
+
+def test_model_with_wrong_feature_count_is_ignored(tmp_path):
+    model = RandomForestClassifier(n_estimators=5).fit(np.zeros((4, 2)), [0, 1, 0, 1])
+    joblib.dump(model, tmp_path / "model.pkl")
+    risk_model = main.ACLRiskAssessmentModel(model_path=str(tmp_path / "model.pkl"))
+    risk_model.load_model()
+    assert risk_model.model is None
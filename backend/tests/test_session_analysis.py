@@ -0,0 +1,94 @@
+import pytest
+
+import biomechanics_storage
+import database
+from tests.conftest import sample
+
+def upload(client, session_id: int, points):
+    assert client.post(f"/sessions/{session_id}/biomechanics", json=points).status_code == 200
+
+def timeline(client, session_id: int, **params) -> dict:
+    response = client.get(f"/sessions/{session_id}/analysis", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+def test_analysis_get_never_rebuilds_the_rollup(client, db, training_session, monkeypatch):
+    monkeypatch.setattr(biomechanics_storage, "BIOMECHANICS_COMPACT_ON_CLOSE", False)
+    upload(client, training_session.id, [sample(i) for i in range(100)])
+    assert client.post(f"/sessions/{training_session.id}/close").status_code == 200
+    rollup = db.get(database.SessionAnalytics, training_session.id)
+    rollup.sample_count = 1
+    db.commit()
+    
+    stale = timeline(client, training_session.id, include_timeline="false", recompute="true")
+    assert stale["statistics"]["total_movements"] == 1
+    db.expire_all()
+    assert db.get(database.SessionAnalytics, training_session.id).sample_count == 1
+    
+    rebuilt = client.post(f"/sessions/{training_session.id}/analysis/recompute")
+    assert rebuilt.status_code == 200
+    assert rebuilt.json()["statistics"]["total_movements"] == 100
+    assert timeline(client, training_session.id, include_timeline="false")["statistics"]["total_movements"] == 100
+
+def test_recompute_unknown_session(client):
+    assert client.post("/sessions/999999/analysis/recompute").status_code == 404
+
+@pytest.mark.parametrize("downsample", ["lttb", "minmax"])
+@pytest.mark.parametrize("max_points", [3, 50, 51, 999, 1000, 5000])
+def test_downsampled_point_counts(client, training_session, downsample, max_points):
+    points = [sample(i, knee_valgus=float((i * 37) % 101)) for i in range(1000)]
+    upload(client, training_session.id, points)
+    body = timeline(client, training_session.id, max_points=max_points, downsample=downsample)
+    returned = body["biomechanics_timeline"]
+    assert body["timeline"]["points_in_range"] == 1000
+    assert body["timeline"]["returned_points"] == len(returned)
+    if max_points >= 1000:
+        assert len(returned) == 1000
+    elif downsample == "lttb":
+        # Exactly max_points, always keeping the first and last sample
+        assert len(returned) == max_points
+        assert returned[0]["timestamp"] == points[0]["timestamp"]
+        assert returned[-1]["timestamp"] == points[-1]["timestamp"]
+    else:
+        # A minimum and a maximum per bucket of max_points // 2, so the extremes always survive
+        assert len(returned) == max_points // 2 * 2
+        values = [p["knee_valgus"] for p in returned]
+        assert min(values) == 0.0 and max(values) == 100.0
+    timestamps = [p["timestamp"] for p in returned]
+    assert timestamps == sorted(timestamps)
+
+def test_cursor_pages_cover_every_sample_once(client, training_session):
+    # Three samples share each timestamp, so page boundaries fall between samples with equal timestamps
+    points = [sample(i // 3, knee_valgus=float(i)) for i in range(100)]
+    upload(client, training_session.id, points)
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 7, **({"cursor": cursor} if cursor else {})}
+        body = timeline(client, training_session.id, **params)
+        page = body["biomechanics_timeline"]
+        assert len(page) == 7 or body["timeline"]["next_cursor"] is None
+        seen += [p["knee_valgus"] for p in page]
+        cursor = body["timeline"]["next_cursor"]
+        pages += 1
+        if pages == 5:
+            # Samples appended mid-iteration (later timestamps) show up on later pages without shifting earlier ones
+            upload(client, training_session.id, [sample(i // 3, knee_valgus=float(i)) for i in range(100, 110)])
+        if cursor is None:
+            break
+    assert seen == [float(i) for i in range(110)]
+    assert pages == 16
+
+def test_cursor_pages_within_a_time_range(client, training_session):
+    points = [sample(i, knee_valgus=float(i)) for i in range(50)]
+    upload(client, training_session.id, points)
+    start, end = points[10]["timestamp"], points[29]["timestamp"]
+    first = timeline(client, training_session.id, start=start, end=end, limit=15)
+    assert first["timeline"]["points_in_range"] == 20
+    second = timeline(client, training_session.id, start=start, end=end, limit=15, cursor=first["timeline"]["next_cursor"])
+    assert second["timeline"]["next_cursor"] is None
+    values = [p["knee_valgus"] for p in first["biomechanics_timeline"] + second["biomechanics_timeline"]]
+    assert values == [float(i) for i in range(10, 30)]
+
+def test_invalid_cursor(client, training_session):
+    response = client.get(f"/sessions/{training_session.id}/analysis", params={"limit": 5, "cursor": "%%%"})
+    assert response.status_code == 400
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import biomechanics_storage
+import database
+from tests.conftest import sample
+
+def analysis(client, session_id: int) -> dict:
+    response = client.get(f"/sessions/{session_id}/analysis", params={"include_timeline": "false"})
+    assert response.status_code == 200
+    body = response.json()
+    return {"statistics": body["statistics"], "muscle_activation": body["muscle_activation"]}
+
+def upload_batches(client, session_id: int, values: np.ndarray, batch_size: int):
+    """Samples in time order, in several batches so the rollup accumulates across them"""
+    for start in range(0, len(values), batch_size):
+        points = [sample(i, knee_valgus=float(values[i, 0]), ground_reaction_force=float(values[i, 1]),
+                         knee_angle=float(values[i, 2]))
+                  for i in range(start, min(start + batch_size, len(values)))]
+        assert client.post(f"/sessions/{session_id}/biomechanics", json=points).status_code == 200
+
+def test_open_closed_and_archived_statistics_match(client, db, training_session, monkeypatch):
+    monkeypatch.setattr(biomechanics_storage, "BIOMECHANICS_COMPACT_ON_CLOSE", False)
+    # Values with long binary expansions, where pairwise and sequential sums round differently
+    rng = np.random.default_rng(8)
+    values = np.column_stack([rng.uniform(0, 20, 2000), rng.uniform(0.5, 4.5, 2000), rng.uniform(120, 175, 2000)])
+    upload_batches(client, training_session.id, values, batch_size=300)
+    
+    open_session = analysis(client, training_session.id)
+    assert client.post(f"/sessions/{training_session.id}/close").status_code == 200
+    closed = analysis(client, training_session.id)
+    assert closed == open_session
+    
+    biomechanics_storage.archive_session_samples(db, training_session.id)
+    assert db.query(database.BiomechanicsArchive).filter(database.BiomechanicsArchive.session_id == training_session.id).count() == 1
+    assert analysis(client, training_session.id) == open_session
+
+def test_recomputed_statistics_match_the_rollup(client, db, training_session, monkeypatch):
+    monkeypatch.setattr(biomechanics_storage, "BIOMECHANICS_COMPACT_ON_CLOSE", False)
+    # float32-exact values: compacted blocks and archives store float32, so a rebuild reads the same numbers
+    rng = np.random.default_rng(9)
+    values = np.column_stack([rng.integers(0, 80, 1500) / 4, rng.integers(2, 18, 1500) / 4, rng.integers(480, 700, 1500) / 4])
+    upload_batches(client, training_session.id, values, batch_size=400)
+    assert client.post(f"/sessions/{training_session.id}/close").status_code == 200
+    closed = analysis(client, training_session.id)
+    
+    biomechanics_storage.compact_session_samples(db, training_session.id)
+    biomechanics_storage.archive_session_samples(db, training_session.id)
+    rebuilt = client.post(f"/sessions/{training_session.id}/analysis/recompute").json()
+    assert {"statistics": rebuilt["statistics"], "muscle_activation": rebuilt["muscle_activation"]} == closed
+    assert closed["statistics"]["total_movements"] == 1500
+    assert closed["statistics"]["avg_knee_valgus"] == pytest.approx(values[:, 0].mean())
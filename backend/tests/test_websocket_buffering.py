@@ -0,0 +1,68 @@
+import threading
+import time
+
+import biomechanics_storage
+import database
+import main
+from tests.conftest import sample
+
+def stored_count(db, session_id: int, expected: int = 0) -> int:
+    """Stored samples, waiting up to 5 s for expected (the final flush finishes after the handler returns)"""
+    deadline = time.monotonic() + 5
+    while True:
+        db.expire_all()
+        stored = db.query(database.BiomechanicsData).filter(database.BiomechanicsData.session_id == session_id).count()
+        if stored >= expected or time.monotonic() > deadline:
+            return stored
+        time.sleep(0.02)
+
+def test_replies_never_wait_on_a_commit(client, db, training_session, monkeypatch):
+    monkeypatch.setattr(main, "WS_FLUSH_MAX_SAMPLES", 20)
+    commit_released = threading.Event()
+    writes = []
+    write = main.BiomechanicsWriteBuffer.write
+    
+    def slow_write(self, points):
+        writes.append(len(points))
+        commit_released.wait(10)  # a commit stuck on the database
+        write(self, points)
+    
+    monkeypatch.setattr(main.BiomechanicsWriteBuffer, "write", slow_write)
+    total = 3 * main.WS_FLUSH_MAX_SAMPLES + 7
+    with client.websocket_connect(f"/ws/biomechanics/{training_session.id}") as ws:
+        started = time.perf_counter()
+        for i in range(total):
+            ws.send_json(sample(i))
+            assert "risk_score" in ws.receive_json()
+        elapsed = time.perf_counter() - started
+        assert writes, "a full batch should have started a flush"
+        commit_released.set()
+    assert elapsed < 5, f"replies waited on the blocked commit ({elapsed:.1f}s)"
+    assert stored_count(db, training_session.id, total) == total
+
+def test_sample_durability_mode_stores_every_sample(client, db, training_session, monkeypatch):
+    monkeypatch.setattr(main, "WS_DURABILITY_MODE", "sample")
+    with client.websocket_connect(f"/ws/biomechanics/{training_session.id}") as ws:
+        for i in range(25):
+            ws.send_json(sample(i))
+            ws.receive_json()
+    assert stored_count(db, training_session.id, 25) == 25
+
+def test_idle_stream_flushes_after_the_interval(client, db, training_session, monkeypatch):
+    monkeypatch.setattr(main, "WS_FLUSH_INTERVAL_MS", 50)
+    with client.websocket_connect(f"/ws/biomechanics/{training_session.id}") as ws:
+        for i in range(3):
+            ws.send_json(sample(i))
+            ws.receive_json()
+        # Still connected: only the interval flush can have stored them
+        assert stored_count(db, training_session.id, 3) == 3
+
+def test_feedback_uses_configured_thresholds(client, db, training_session, monkeypatch):
+    monkeypatch.setattr(biomechanics_storage, "HIGH_VALGUS_THRESHOLD", 10.0)
+    with client.websocket_connect(f"/ws/biomechanics/{training_session.id}") as ws:
+        ws.send_json(sample(0, knee_valgus=12.0, ground_reaction_force=1.0))
+        feedback = ws.receive_json()
+    assert feedback["risk_score"] == 0.5
+    stored_count(db, training_session.id, 1)
+    stored = db.query(database.BiomechanicsData).filter(database.BiomechanicsData.session_id == training_session.id).one()
+    assert stored.risk_score == feedback["risk_score"]
@@ -0,0 +1,38 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import xray_jobs
+import xray_storage
+
+def radiograph_16bit(side: int) -> bytes:
+    """16-bit grayscale PNG using only part of the range (values 1000..4000), as exported radiographs do"""
+    ramp = np.linspace(1000, 4000, side * side).reshape(side, side).astype(np.uint16)
+    buffer = io.BytesIO()
+    Image.fromarray(ramp).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+@pytest.mark.parametrize("max_side", [0, 64])
+def test_16bit_images_are_rescaled_not_clipped(monkeypatch, max_side):
+    monkeypatch.setattr(xray_jobs, "XRAY_WORKING_MAX_SIDE", max_side)
+    img = xray_jobs.XRayAnalyzer().load_working_image(radiograph_16bit(256))
+    pixels = np.asarray(img)
+    assert img.mode == "L"
+    assert max(img.size) == (max_side or 256)
+    assert pixels.min() <= 5 and pixels.max() >= 250
+
+def test_working_image_and_renditions_share_the_rescaling():
+    image_data = radiograph_16bit(128)
+    path = xray_storage.write_xray_image(xray_storage.hash_xray_image(image_data), image_data)
+    xray_storage.render_xray_renditions(path, {"full": 128})
+    rendition = np.asarray(Image.open(f"{path}.full.jpg"))
+    working = np.asarray(xray_jobs.XRayAnalyzer().load_working_image(image_data))
+    # JPEG is lossy, but both come from the same stretched 8-bit image
+    assert np.abs(rendition.astype(int) - working.astype(int)).mean() < 2
+
+def test_flat_16bit_image_is_black():
+    buffer = io.BytesIO()
+    Image.fromarray(np.full((32, 32), 3000, dtype=np.uint16)).save(buffer, format="PNG")
+    assert np.asarray(xray_storage.grayscale_8bit(Image.open(buffer))).max() == 0
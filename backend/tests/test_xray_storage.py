@@ -0,0 +1,83 @@
+import io
+import os
+
+import numpy as np
+from PIL import Image
+
+import database
+import xray_jobs
+import xray_storage
+
+def png_bytes(side: int = 600, seed: int = 0) -> bytes:
+    pixels = np.random.default_rng(seed).integers(0, 256, (side, side), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, mode="L").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def legacy_xray(db, athlete, tmp_path, image_data: bytes, name: str) -> database.XRayAnalysis:
+    """An analysis as stored before content hashing: one file per upload, outside XRAY_STORAGE_DIR"""
+    path = tmp_path / name
+    path.write_bytes(image_data)
+    xray = database.XRayAnalysis(athlete_id=athlete.id, image_path=str(path), severity="normal",
+                             triage_recommendation="routine", findings="[]", educational_explanation="")
+    db.add(xray)
+    db.commit()
+    return xray
+
+def test_legacy_images_get_urls_and_renditions_after_backfill(client, db, athlete, tmp_path):
+    image_data = png_bytes()
+    first = legacy_xray(db, athlete, tmp_path, image_data, f"{athlete.id}_1.png")
+    second = legacy_xray(db, athlete, tmp_path, image_data, f"{athlete.id}_2.png")
+    gone = legacy_xray(db, athlete, tmp_path, png_bytes(seed=1), f"{athlete.id}_3.png")
+    os.remove(gone.image_path)
+    
+    listed = client.get(f"/athletes/{athlete.id}/xray-analyses").json()
+    assert all(item["image_url"] is None and item["renditions"] == {} for item in listed)
+    
+    assert xray_storage.adopt_legacy_xray_images(db) == {"analyses": 2, "images": 1, "missing": 1}
+    assert xray_storage.adopt_legacy_xray_images(db) == {"analyses": 0, "images": 0, "missing": 1}
+    
+    sha256 = xray_storage.hash_xray_image(image_data)
+    by_id = {item["id"]: item for item in client.get(f"/athletes/{athlete.id}/xray-analyses").json()}
+    for xray in (first, second):
+        assert by_id[xray.id]["image_url"] == f"/xray/images/{sha256}"
+        assert set(by_id[xray.id]["renditions"]) == set(xray_storage.XRAY_RENDITIONS)
+    assert by_id[gone.id]["image_url"] is None
+    
+    original = client.get(f"/xray/images/{sha256}")
+    assert original.status_code == 200
+    assert original.content == image_data
+    assert original.headers["content-type"] == "image/png"
+    for name, side in xray_storage.XRAY_RENDITIONS.items():
+        rendition = client.get(by_id[first.id]["renditions"][name])
+        assert rendition.status_code == 200
+        assert rendition.headers["content-type"] == "image/jpeg"
+        assert max(Image.open(io.BytesIO(rendition.content)).size) == min(side, 600)
+
+def test_study_with_repeated_views_claims_one_slot_per_image(client, db, athlete, monkeypatch):
+    reserved, analyzed = [], []
+    reserve, analyze = xray_jobs.xray_jobs.reserve, xray_jobs.xray_jobs.analyze
+    
+    def counting_reserve(count=1):
+        reserved.append(count)
+        return reserve(count)
+    
+    def counting_analyze(sha256, *args, **kwargs):
+        analyzed.append(sha256)
+        return analyze(sha256, *args, **kwargs)
+    
+    monkeypatch.setattr(xray_jobs.xray_jobs, "reserve", counting_reserve)
+    monkeypatch.setattr(xray_jobs.xray_jobs, "analyze", counting_analyze)
+    unfinished = xray_jobs.xray_jobs.unfinished
+    front, side = png_bytes(300, seed=athlete.id * 10), png_bytes(300, seed=athlete.id * 10 + 1)
+    files = [("files", (name, data, "image/png")) for name, data in (("front.png", front), ("again.png", front), ("side.png", side))]
+    
+    response = client.post("/xray/studies", data={"athlete_id": str(athlete.id)}, files=files)
+    assert response.status_code == 200
+    assert reserved == [2]
+    assert sorted(analyzed) == sorted({xray_storage.hash_xray_image(front), xray_storage.hash_xray_image(side)})
+    assert xray_jobs.xray_jobs.unfinished == unfinished
+    images = response.json()["images"]
+    assert [image["duplicate"] for image in images] == [False, True, False]
+    assert images[0]["analysis"]["image_url"] == images[1]["analysis"]["image_url"] != images[2]["analysis"]["image_url"]
+    assert db.get(database.XRayImage, xray_storage.hash_xray_image(front)).size_bytes == len(front)
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Risk model trainer for Dear, Tear
+Fits the ACL risk classifier on local historical data: athlete demographics and recent
+movement counts as features, recorded ACL injuries as labels
+"""
+
+import argparse
+import os
+import sys
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sqlalchemy import select, func
+
+# Import models and feature pipeline from the API modules (uses DATABASE_URL like the API)
+sys.path.append('.')
+from database import SessionLocal, User, UserRole, InjuryHistory
+from main import RISK_MODEL_PATH, ROSTER_CHUNK_SIZE, RISK_MODEL_FEATURES, load_roster_inputs, risk_features
+
+def load_training_data(db, injury_type: str):
+    athlete_ids = db.scalars(
+        select(User.id).where(User.role == UserRole.ATHLETE.value).order_by(User.id)
+    ).all()
+    injured = set(db.scalars(
+        select(InjuryHistory.athlete_id).where(func.lower(InjuryHistory.injury_type).contains(injury_type.lower()))
+    ).all())
+
+    features, labels = [], []
+    for start in range(0, len(athlete_ids), ROSTER_CHUNK_SIZE):
+        inputs = load_roster_inputs(db, athlete_ids[start:start + ROSTER_CHUNK_SIZE])
+        features.append(risk_features(
+            inputs["gender"], inputs["age"], inputs["bmi"], inputs["is_rural"],
+            inputs["high_valgus_count"], inputs["high_impact_count"], inputs["total_movements"]
+        ))
+        labels.append(np.isin(inputs["athlete_id"], list(injured)).astype(np.int64))
+
+    if not features:
+        return np.empty((0, len(RISK_MODEL_FEATURES))), np.empty(0, dtype=np.int64)
+    return np.vstack(features), np.concatenate(labels)
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the ACL risk model on local data")
+    parser.add_argument("--output", default=RISK_MODEL_PATH, help=f"Model file (default: {RISK_MODEL_PATH})")
+    parser.add_argument("--injury-type", default="acl", help="Injury history entries containing this count as positives")
+    parser.add_argument("--n-estimators", type=int, default=100)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        X, y = load_training_data(db, args.injury_type)
+    finally:
+        db.close()
+
+    positives = int(y.sum())
+    if positives == 0 or positives == len(y):
+        print(f"Need both injured and uninjured athletes to train (found {positives} of {len(y)} injured)")
+        sys.exit(1)
+
+    model = RandomForestClassifier(
+        n_estimators=args.n_estimators, class_weight="balanced", oob_score=True, random_state=42
+    )
+    model.fit(X, y)
+
+    # Uncompressed so the API can memory-map it; replaced atomically so running workers hot-reload cleanly
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    tmp_path = f"{args.output}.tmp"
+    joblib.dump(model, tmp_path)
+    os.replace(tmp_path, args.output)
+
+    print(f"✓ Trained on {len(y)} athletes ({positives} injured), out-of-bag accuracy {model.oob_score_:.3f}")
+    for name, importance in sorted(zip(RISK_MODEL_FEATURES, model.feature_importances_), key=lambda x: -x[1]):
+        print(f"  - {name}: {importance:.3f}")
+    print(f"✓ Saved model to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,631 @@
+"""
+X-ray analysis and the job queue that runs it on the process pool
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect, File, UploadFile, Form
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List, Optional, Dict, Tuple, Callable, Awaitable
+import numpy as np
+import os
+import io
+import math
+import time
+import asyncio
+import uuid
+from collections import deque
+from functools import lru_cache
+
+from runtime import CPU_POOL_WORKERS, TTLCache, lazy_init_lock, metrics_sources, run_cpu_bound, summarize_durations
+from database import User, get_db
+from schemas import XRayAnalysisResponse, XRayJobResponse, XRayStudyImage, XRayStudyResponse
+from xray_storage import (XRAY_RENDITIONS_ON_UPLOAD, grayscale_8bit, hash_xray_image, load_cached_xray_analyses,
+                          load_cached_xray_analysis, store_xray_result, store_xray_study, xray_renditions)
+
+# X-ray analysis jobs: at most XRAY_MAX_CONCURRENT_JOBS analyses on the process pool, at most
+# XRAY_MAX_PENDING_JOBS waiting (further uploads get 503); finished jobs are kept for polling
+XRAY_MAX_CONCURRENT_JOBS = int(os.getenv("XRAY_MAX_CONCURRENT_JOBS", str(CPU_POOL_WORKERS)))
+XRAY_MAX_PENDING_JOBS = int(os.getenv("XRAY_MAX_PENDING_JOBS", "100"))
+XRAY_JOB_TIMEOUT_SECONDS = float(os.getenv("XRAY_JOB_TIMEOUT_SECONDS", "120"))
+XRAY_JOB_RETENTION_SECONDS = float(os.getenv("XRAY_JOB_RETENTION_SECONDS", "3600"))
+
+# Multi-view X-ray studies: views accepted per upload
+XRAY_STUDY_MAX_IMAGES = int(os.getenv("XRAY_STUDY_MAX_IMAGES", "12"))
+
+# X-ray decoding: images are decoded/reduced so the longest side is at most XRAY_WORKING_MAX_SIDE
+# (0 keeps full resolution); working images larger than XRAY_TILE_SIZE are enhanced tile by tile
+XRAY_WORKING_MAX_SIDE = int(os.getenv("XRAY_WORKING_MAX_SIDE", "2048"))
+XRAY_TILE_SIZE = int(os.getenv("XRAY_TILE_SIZE", "2048"))
+XRAY_TILE_OVERLAP = 32  # pixels of context around each tile so CLAHE/Canny see across seams
+
+router = APIRouter()
+
+# X-Ray Analysis (OpenCV and PIL are imported on first use)
+@lru_cache(maxsize=None)
+def load_cv2():
+    """OpenCV module, or None if it is not installed"""
+    try:
+        import cv2
+        return cv2
+    except ImportError:
+        return None
+
+class XRayAnalyzer:
+    """Simplified X-ray analysis - in production, use trained ML models"""
+    
+    def load_working_image(self, image_data: bytes):
+        """Decode to an 8-bit grayscale PIL image no larger than XRAY_WORKING_MAX_SIDE"""
+        from PIL import Image
+        img = Image.open(io.BytesIO(image_data))
+        max_side = XRAY_WORKING_MAX_SIDE
+        if max_side > 0 and max(img.size) > max_side:
+            # JPEG decodes straight to grayscale at 1/2, 1/4 or 1/8 scale; other formats are reduced after decoding
+            scale = max_side / max(img.size)
+            img.draft("L", (max(1, int(img.width * scale)), max(1, int(img.height * scale))))
+            if img.mode not in ("L", "RGB", "RGBA"):
+                img = grayscale_8bit(img)
+            factor = math.ceil(max(img.size) / max_side)
+            if factor > 1:
+                img = img.reduce(factor)
+        # Convert to grayscale if needed
+        if img.mode != 'L':
+            img = grayscale_8bit(img)
+        return img
+    
+    def edge_density(self, gray: np.ndarray, cv2) -> float:
+        """Share of Canny edge pixels after CLAHE, tile by tile for images larger than XRAY_TILE_SIZE"""
+        height, width = gray.shape
+        tile = XRAY_TILE_SIZE
+        if tile <= 0 or max(height, width) <= tile:
+            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+            edges = cv2.Canny(clahe.apply(gray), 50, 150)
+            return np.count_nonzero(edges) / edges.size
+        
+        edge_pixels = 0
+        for y in range(0, height, tile):
+            for x in range(0, width, tile):
+                y0, x0 = max(y - XRAY_TILE_OVERLAP, 0), max(x - XRAY_TILE_OVERLAP, 0)
+                y1, x1 = min(y + tile + XRAY_TILE_OVERLAP, height), min(x + tile + XRAY_TILE_OVERLAP, width)
+                block = gray[y0:y1, x0:x1]
+                # Keep CLAHE cells about the size they would have on the whole image (8x8 grid)
+                grid = (max(1, round(8 * block.shape[1] / width)), max(1, round(8 * block.shape[0] / height)))
+                edges = cv2.Canny(cv2.createCLAHE(clipLimit=2.0, tileGridSize=grid).apply(block), 50, 150)
+                # Count only the tile itself, not its overlap with neighbours
+                edge_pixels += np.count_nonzero(edges[y - y0:y - y0 + tile, x - x0:x - x0 + tile])
+        return edge_pixels / (height * width)
+    
+    def image_statistics(self, image_data: bytes) -> Tuple[float, float, float, bool]:
+        """(brightness, contrast, edge_density, used_opencv) of the working image"""
+        from PIL import ImageStat
+        cv2 = load_cv2()
+        img = self.load_working_image(image_data)
+        # Histogram-based mean/std: no float copies of the image
+        stat = ImageStat.Stat(img)
+        brightness, contrast = stat.mean[0], stat.stddev[0]
+        
+        # Use OpenCV if available for better image processing
+        if cv2 is not None:
+            edge_density = self.edge_density(np.asarray(img), cv2)
+        else:
+            edge_density = 0.1  # Placeholder
+        return brightness, contrast, edge_density, cv2 is not None
+    
+    def analyze_image(self, image_data: bytes) -> Dict:
+        """Analyze X-ray image and return findings"""
+        try:
+            brightness, contrast, edge_density, cv2_available = self.image_statistics(image_data)
+            
+            # Simple heuristics (replace with actual ML in production)
+            findings = []
+            has_fracture = False
+            has_alignment = False
+            joint_spacing = False
+            severity = "normal"
+            
+            # Enhanced detection with OpenCV features
+            if cv2_available:
+                # Use edge density and image quality metrics
+                if brightness < 100 or contrast < 30:
+                    findings.append("Image quality may be suboptimal - recommend retake with better lighting")
+                if edge_density > 0.3:  # High edge density might indicate fractures
+                    findings.append("High structural complexity detected - detailed analysis recommended")
+            else:
+                if brightness < 100 or contrast < 30:
+                    findings.append("Image quality may be suboptimal")
+            
+            # For presentation/demo: Always show some analysis results
+            # In production, this would use actual ML model predictions
+            brightness_normalized = brightness / 255.0
+            
+            # Simulate realistic findings based on image characteristics for demo
+            # Lower brightness or unusual contrast patterns might indicate issues
+            if brightness_normalized < 0.4 or contrast < 25:
+                # Potential issue detected
+                rand = np.random.random()
+                if rand > 0.6:  # 40% chance of finding
+                    has_fracture = rand > 0.85
+                    has_alignment = rand > 0.75 and not has_fracture
+                    joint_spacing = rand > 0.65 and not has_alignment and not has_fracture
+                    
+                    if has_fracture:
+                        severity = "severe"
+                        findings.append("Possible fracture detected in tibial or femoral region")
+                    elif has_alignment:
+                        severity = "moderate"
+                        findings.append("Alignment irregularity detected - bones may be misaligned")
+                    elif joint_spacing:
+                        severity = "minor"
+                        findings.append("Joint spacing appears slightly abnormal - may indicate inflammation")
+            else:
+                # Normal-looking image
+                if np.random.random() > 0.8:  # 20% chance of minor finding even in normal images
+                    joint_spacing = True
+                    severity = "minor"
+                    findings.append("Slight joint spacing variation detected - within normal range")
+            
+            # Determine triage
+            if severity in ["severe", "critical"]:
+                triage = "urgent"
+            elif severity == "moderate":
+                triage = "routine"
+            else:
+                triage = "routine"
+            
+            explanation = self.generate_explanation(findings, has_fracture, has_alignment, joint_spacing)
+            
+            return {
+                "has_fracture": has_fracture,
+                "has_alignment_issue": has_alignment,
+                "joint_spacing_abnormal": joint_spacing,
+                "severity": severity,
+                "triage_recommendation": triage,
+                "findings": "; ".join(findings) if findings else "No significant abnormalities detected",
+                "educational_explanation": explanation,
+                "confidence_score": 0.75  # Placeholder
+            }
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Image processing error: {str(e)}")
+    
+    def generate_explanation(self, findings: List[str], fracture: bool, alignment: bool, spacing: bool) -> str:
+        """Generate educational explanation in simple terms"""
+        parts = []
+        if fracture:
+            parts.append("A fracture means there's a break in the bone. This needs immediate medical attention.")
+        if alignment:
+            parts.append("Alignment issues mean bones aren't positioned normally, which can affect joint function.")
+        if spacing:
+            parts.append("Abnormal joint spacing might indicate swelling or structural changes that should be monitored.")
+        if not parts:
+            parts.append("The X-ray shows normal bone structure and joint spacing for a knee image.")
+        
+        parts.append("Always consult with a healthcare provider for definitive diagnosis and treatment recommendations.")
+        return " ".join(parts)
+
+_xray_analyzer: Optional[XRayAnalyzer] = None
+
+def get_xray_analyzer() -> XRayAnalyzer:
+    global _xray_analyzer
+    if _xray_analyzer is None:
+        with lazy_init_lock:
+            if _xray_analyzer is None:
+                _xray_analyzer = XRayAnalyzer()
+    return _xray_analyzer
+
+def analyze_xray_image(image_data: bytes) -> Dict:
+    """Process-pool entry point for X-ray analysis"""
+    try:
+        return get_xray_analyzer().analyze_image(image_data)
+    except HTTPException as e:
+        # HTTPException does not survive pickling back to the parent
+        raise ValueError(e.detail)
+
+# X-ray analysis jobs
+class XRayJob:
+    """One X-ray analysis; status moves queued -> running -> succeeded|failed"""
+    
+    def __init__(self, athlete_id: int, image_data: bytes, content_type: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.athlete_id = athlete_id
+        self.image_data: Optional[bytes] = image_data
+        self.content_type = content_type
+        self.sha256: Optional[str] = None
+        self.duplicate = False
+        self.status = "queued"
+        self.submitted_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.timings_ms: Dict[str, float] = {}
+        self.result: Optional[XRayAnalysisResponse] = None
+        self.error: Optional[str] = None
+        self.error_status_code = 500
+        self._changed = asyncio.Condition()
+    
+    @property
+    def finished(self) -> bool:
+        return self.status in ("succeeded", "failed")
+    
+    async def set_status(self, status: str):
+        async with self._changed:
+            self.status = status
+            self._changed.notify_all()
+    
+    async def wait_for_change(self, seen_status: str):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.status != seen_status)
+    
+    async def wait_finished(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.finished)
+    
+    def to_response(self) -> XRayJobResponse:
+        return XRayJobResponse(
+            job_id=self.id,
+            status=self.status,
+            athlete_id=self.athlete_id,
+            submitted_at=self.submitted_at,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            timings_ms=self.timings_ms,
+            duplicate=self.duplicate,
+            result=self.result,
+            error=self.error
+        )
+
+class XRayJobQueue:
+    """In-process job queue: bounded backlog, at most max_concurrent analyses on the process pool.
+    Images already analyzed (same SHA-256) reuse the stored findings, and identical images
+    arriving together share one analysis."""
+    
+    def __init__(self, max_concurrent: int, max_pending: int, timeout_seconds: float, retention_seconds: float):
+        self.max_concurrent = max_concurrent
+        self.max_pending = max_pending
+        self.timeout_seconds = timeout_seconds
+        self.jobs = TTLCache(maxsize=max(10000, max_pending * 10), ttl_seconds=retention_seconds)
+        self.unfinished = 0
+        self.running = 0
+        self.overrunning = 0  # timed-out analyses still holding a slot until their worker finishes
+        self.completed = {"succeeded": 0, "failed": 0}
+        self.rejected = 0
+        self.duplicates = 0
+        self.durations_ms = {step: deque(maxlen=1000) for step in ("lookup", "queued", "analysis", "store", "total")}
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._analyses: Dict[str, Tuple[asyncio.Task, asyncio.Event]] = {}  # sha256 -> (analysis, slot acquired)
+        self._tasks = set()
+    
+    @classmethod
+    def from_settings(cls) -> "XRayJobQueue":
+        return cls(XRAY_MAX_CONCURRENT_JOBS, XRAY_MAX_PENDING_JOBS, XRAY_JOB_TIMEOUT_SECONDS,
+                   XRAY_JOB_RETENTION_SECONDS)
+    
+    @property
+    def pending(self) -> int:
+        return self.unfinished - self.running
+    
+    def reserve(self, count: int = 1):
+        """Claim backlog room for count images; raises 503 when the backlog is full"""
+        if self.pending + count > self.max_pending:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="X-ray analysis queue is full, retry later")
+        self.unfinished += count
+    
+    def release(self, count: int = 1):
+        self.unfinished -= count
+    
+    def submit(self, athlete_id: int, image_data: bytes, content_type: Optional[str] = None) -> XRayJob:
+        """Queue an analysis and return immediately; raises 503 when the backlog is full"""
+        self.reserve()
+        job = XRayJob(athlete_id, image_data, content_type)
+        self.jobs.set(job.id, job)
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+    
+    def get(self, job_id: str) -> Optional[XRayJob]:
+        return self.jobs.get(job_id)
+    
+    def _record(self, job: XRayJob, step: str, elapsed_ms: float, aggregate: bool = True):
+        job.timings_ms[step] = round(elapsed_ms, 1)
+        if aggregate:
+            self.durations_ms[step].append(elapsed_ms)
+    
+    async def _analyze(self, sha256: str, image_data: bytes, started: asyncio.Event):
+        """Analyze under a concurrency slot (setting started once it has one); returns (result, queued_ms, analysis_ms)"""
+        queued = time.perf_counter()
+        try:
+            await self._slots.acquire()
+            self.running += 1
+            started.set()
+            began = time.perf_counter()
+            # A worker process cannot be interrupted: on timeout the job fails, but the slot stays taken until the
+            # analysis really ends, so hung analyses cannot pile up on the pool while new ones are admitted
+            analysis = asyncio.ensure_future(run_cpu_bound(analyze_xray_image, image_data))
+            analysis.add_done_callback(lambda _: self._slots.release())
+            try:
+                result = await asyncio.wait_for(asyncio.shield(analysis), self.timeout_seconds)
+            except asyncio.TimeoutError:
+                self.overrunning += 1
+                analysis.add_done_callback(self._overrun_finished)
+                raise
+            finally:
+                self.running -= 1
+            return result, (began - queued) * 1000, (time.perf_counter() - began) * 1000
+        finally:
+            self._analyses.pop(sha256, None)
+    
+    def _overrun_finished(self, analysis: asyncio.Future):
+        self.overrunning -= 1
+        if not analysis.cancelled():
+            analysis.exception()  # retrieved: the job already failed with a timeout
+    
+    async def analyze(self, sha256: str, image_data: bytes,
+                      on_start: Optional[Callable[[], Awaitable]] = None) -> Tuple[Dict, float, float, bool]:
+        """Analyze an image not in storage, sharing the work with identical images in flight; on_start is awaited
+        once the analysis holds a slot. Returns (result, queued_ms, analysis_ms, shared)"""
+        shared = sha256 in self._analyses
+        if not shared:
+            started = asyncio.Event()
+            self._analyses[sha256] = (asyncio.create_task(self._analyze(sha256, image_data, started)), started)
+        analysis, started = self._analyses[sha256]
+        if on_start is not None:
+            waiting = asyncio.create_task(started.wait())
+            try:
+                await asyncio.wait({analysis, waiting}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiting.cancel()
+            if started.is_set():
+                await on_start()
+        result, queued_ms, analysis_ms = await asyncio.shield(analysis)
+        if not shared:
+            # A shared analysis counts once in the aggregate timings
+            self.durations_ms["queued"].append(queued_ms)
+            self.durations_ms["analysis"].append(analysis_ms)
+        return result, queued_ms, analysis_ms, shared
+    
+    async def _run(self, job: XRayJob):
+        submitted = time.perf_counter()
+        status = "failed"
+        job.error = "Analysis was cancelled"
+        
+        async def start():
+            # Running from when the analysis holds a slot (or is found in storage), not while it waits for one
+            job.started_at = datetime.utcnow()
+            await job.set_status("running")
+        
+        try:
+            started = time.perf_counter()
+            job.sha256 = await run_in_threadpool(hash_xray_image, job.image_data)
+            analysis_result = await run_in_threadpool(load_cached_xray_analysis, job.sha256)
+            self._record(job, "lookup", (time.perf_counter() - started) * 1000)
+            
+            if analysis_result is not None:
+                job.duplicate = True
+                await start()
+            else:
+                analysis_result, queued_ms, analysis_ms, job.duplicate = await self.analyze(job.sha256, job.image_data,
+                                                                                            start)
+                self._record(job, "queued", queued_ms, aggregate=False)
+                self._record(job, "analysis", analysis_ms, aggregate=False)
+            if job.duplicate:
+                self.duplicates += 1
+            
+            started = time.perf_counter()
+            job.result = await run_in_threadpool(store_xray_result, job.athlete_id, job.sha256, job.image_data,
+                                                 job.content_type, analysis_result)
+            self._record(job, "store", (time.perf_counter() - started) * 1000)
+            if XRAY_RENDITIONS_ON_UPLOAD and not job.duplicate:
+                xray_renditions.render_in_background([job.sha256])
+            status, job.error = "succeeded", None
+        except ValueError as e:
+            job.error, job.error_status_code = str(e), 400
+        except asyncio.TimeoutError:
+            job.error, job.error_status_code = f"Analysis timed out after {self.timeout_seconds:g}s", 504
+        except Exception as e:
+            job.error = f"Analysis failed: {str(e)}"
+        finally:
+            self.release()
+            job.image_data = None
+            job.finished_at = datetime.utcnow()
+            self._record(job, "total", (time.perf_counter() - submitted) * 1000)
+            self.completed[status] += 1
+            self.jobs.set(job.id, job)  # keep for polling from completion onwards
+            await job.set_status(status)
+    
+    def metrics(self) -> Dict:
+        return {
+            "pending": self.pending,
+            "running": self.running,
+            "overrunning": self.overrunning,
+            "max_concurrent": self.max_concurrent,
+            "max_pending": self.max_pending,
+            "completed": dict(self.completed),
+            "rejected": self.rejected,
+            "duplicates": self.duplicates,
+            "timings": {step: summarize_durations(values) for step, values in self.durations_ms.items()},
+        }
+    
+    async def stop(self):
+        for task in list(self._tasks) + [analysis for analysis, _ in self._analyses.values()]:
+            task.cancel()
+
+xray_jobs = XRayJobQueue.from_settings()
+metrics_sources["xray_jobs"] = xray_jobs.metrics
+
+@router.on_event("shutdown")
+async def stop_xray_jobs():
+    await xray_jobs.stop()
+
+async def read_xray_upload(athlete_id: int, file: UploadFile, db: Session, check_athlete: bool = True) -> bytes:
+    """Check the athlete and content type, then read the uploaded image"""
+    # Verify athlete exists
+    if check_athlete:
+        athlete = await run_in_threadpool(lambda: db.query(User).filter(User.id == athlete_id).first())
+        if not athlete:
+            raise HTTPException(status_code=404, detail="Athlete not found")
+    
+    # Read image
+    image_data = await file.read()
+    
+    # Validate file type
+    if not file.content_type or not file.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    return image_data
+
+@router.post("/xray/upload", response_model=XRayAnalysisResponse)
+async def upload_xray(
+    athlete_id: int = Form(...),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    """Upload and analyze X-ray image"""
+    image_data = await read_xray_upload(athlete_id, file, db)
+    
+    # Analyze through the job queue so synchronous uploads share its concurrency limits
+    job = xray_jobs.submit(athlete_id, image_data, file.content_type)
+    await job.wait_finished()
+    if job.status == "failed":
+        raise HTTPException(status_code=job.error_status_code, detail=job.error)
+    return job.result
+
+@router.post("/xray/jobs", response_model=XRayJobResponse, status_code=202)
+async def submit_xray_job(
+    athlete_id: int = Form(...),
+    file: UploadFile = File(...),
+    db: Session = Depends(get_db)
+):
+    """Queue an X-ray for analysis; poll GET /xray/jobs/{job_id} or subscribe on /ws/xray/jobs/{job_id}"""
+    image_data = await read_xray_upload(athlete_id, file, db)
+    return xray_jobs.submit(athlete_id, image_data, file.content_type).to_response()
+
+XRAY_SEVERITY_ORDER = ["normal", "minor", "moderate", "severe", "critical"]
+XRAY_TRIAGE_ORDER = ["routine", "urgent", "emergency"]
+
+def triage_xray_study(athlete_id: int, images: List[XRayStudyImage]) -> XRayStudyResponse:
+    """Study-level triage: the most severe and most urgent view decide for the whole study"""
+    def rank(order: List[str], value: str) -> int:
+        return order.index(value) if value in order else 0
+    
+    analyses = [image.analysis for image in images]
+    severity = max((a.severity for a in analyses), key=lambda v: rank(XRAY_SEVERITY_ORDER, v))
+    triage = max((a.triage_recommendation for a in analyses), key=lambda v: rank(XRAY_TRIAGE_ORDER, v))
+    
+    abnormal = [image for image in images if image.analysis.severity != "normal"]
+    if abnormal:
+        summary = f"{len(abnormal)} of {len(images)} views with findings: " + "; ".join(
+            f"{image.filename or 'view'}: {image.analysis.findings}" for image in abnormal
+        )
+    else:
+        summary = f"No significant abnormalities detected in {len(images)} views"
+    
+    return XRayStudyResponse(
+        athlete_id=athlete_id,
+        severity=severity,
+        triage_recommendation=triage,
+        has_fracture=any(a.has_fracture for a in analyses),
+        has_alignment_issue=any(a.has_alignment_issue for a in analyses),
+        joint_spacing_abnormal=any(a.joint_spacing_abnormal for a in analyses),
+        summary=summary,
+        images=images
+    )
+
+@router.post("/xray/studies", response_model=XRayStudyResponse)
+async def upload_xray_study(
+    athlete_id: int = Form(...),
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db)
+):
+    """Upload every view of a study: analyzed in parallel, stored in one transaction, triaged as a whole"""
+    if len(files) > XRAY_STUDY_MAX_IMAGES:
+        raise HTTPException(status_code=400, detail=f"A study can have at most {XRAY_STUDY_MAX_IMAGES} images")
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    
+    images = []
+    for i, file in enumerate(files):
+        try:
+            images.append(await read_xray_upload(athlete_id, file, db, check_athlete=(i == 0)))
+        except HTTPException as e:
+            if e.status_code != 400:
+                raise
+            raise HTTPException(status_code=400, detail=f"{file.filename or f'image {i + 1}'}: {e.detail}")
+    hashes = await run_in_threadpool(lambda: [hash_xray_image(image_data) for image_data in images])
+    cached = await run_in_threadpool(load_cached_xray_analyses, hashes)
+    timings["lookup"] = round((time.perf_counter() - started) * 1000, 1)
+    
+    # Analyze the new images in parallel on the process pool; identical views claim one backlog slot and
+    # share one analysis (first_view maps each new hash to the first view that has it)
+    first_view: Dict[str, int] = {}
+    for i, sha256 in enumerate(hashes):
+        if sha256 not in cached:
+            first_view.setdefault(sha256, i)
+    pending = list(first_view.values())
+    analyzed = time.perf_counter()
+    xray_jobs.reserve(len(pending))
+    try:
+        outcomes = await asyncio.gather(
+            *(xray_jobs.analyze(hashes[i], images[i]) for i in pending), return_exceptions=True
+        )
+    finally:
+        xray_jobs.release(len(pending))
+    timings["analysis"] = round((time.perf_counter() - analyzed) * 1000, 1)
+    
+    for i, outcome in zip(pending, outcomes):
+        name = files[i].filename or f"image {i + 1}"
+        if isinstance(outcome, ValueError):
+            raise HTTPException(status_code=400, detail=f"{name}: {str(outcome)}")
+        if isinstance(outcome, asyncio.TimeoutError):
+            raise HTTPException(status_code=504, detail=f"{name}: analysis timed out")
+        if isinstance(outcome, BaseException):
+            raise HTTPException(status_code=500, detail=f"{name}: analysis failed: {str(outcome)}")
+        cached[hashes[i]] = outcome[0]
+    # Views after the first with the same content reuse its findings, so they count as duplicates
+    results = [cached[sha256] for sha256 in hashes]
+    duplicates = [first_view.get(sha256) != i for i, sha256 in enumerate(hashes)]
+    for i, outcome in zip(pending, outcomes):
+        duplicates[i] = outcome[3]
+    
+    stored = time.perf_counter()
+    analyses = await run_in_threadpool(store_xray_study, athlete_id, [
+        (sha256, image_data, file.content_type, result)
+        for sha256, image_data, file, result in zip(hashes, images, files, results)
+    ])
+    timings["store"] = round((time.perf_counter() - stored) * 1000, 1)
+    timings["total"] = round((time.perf_counter() - started) * 1000, 1)
+    if XRAY_RENDITIONS_ON_UPLOAD:
+        xray_renditions.render_in_background([hashes[i] for i in pending])
+    
+    study = triage_xray_study(athlete_id, [
+        XRayStudyImage(filename=file.filename, duplicate=duplicate, analysis=analysis)
+        for file, duplicate, analysis in zip(files, duplicates, analyses)
+    ])
+    study.timings_ms = timings
+    return study
+
+@router.get("/xray/jobs/{job_id}", response_model=XRayJobResponse)
+def get_xray_job(job_id: str):
+    """Status, timings and (once finished) the analysis of an X-ray job"""
+    job = xray_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_response()
+
+@router.websocket("/ws/xray/jobs/{job_id}")
+async def websocket_xray_job(websocket: WebSocket, job_id: str):
+    """Push every status change of an X-ray job until it finishes"""
+    await websocket.accept()
+    job = xray_jobs.get(job_id)
+    if job is None:
+        await websocket.close(code=4404, reason="Job not found")
+        return
+    
+    try:
+        while True:
+            seen_status = job.status
+            await websocket.send_json(job.to_response().model_dump(mode="json"))
+            if job.finished:
+                break
+            await job.wait_for_change(seen_status)
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
@@ -0,0 +1,450 @@
+"""
+X-ray image storage: content-addressed originals, stored analyses and cached renditions
+"""
+
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from typing import List, Optional, Dict, Tuple
+import numpy as np
+import os
+import json
+import asyncio
+import threading
+import uuid
+import hashlib
+import mimetypes
+import re
+from collections import OrderedDict
+
+from runtime import metrics_sources, run_cpu_bound
+from database import SessionLocal, XRayAnalysis, XRayImage, get_db
+from schemas import XRayAnalysisResponse
+
+# X-ray images are stored once per content hash under XRAY_STORAGE_DIR/<sha256[:2]>/<sha256>
+XRAY_STORAGE_DIR = os.getenv("XRAY_STORAGE_DIR", "uploads/xray")
+
+# X-ray renditions: downscaled progressive JPEGs stored next to the original as <sha256>.<name>.jpg,
+# rendered after upload (or on first request) and evicted least recently used beyond XRAY_RENDITION_CACHE_MB
+XRAY_RENDITIONS = {
+    name.strip(): int(side)
+    for name, side in (item.split(":") for item in os.getenv("XRAY_RENDITIONS", "thumbnail:256,preview:1024").split(",") if item.strip())
+}
+XRAY_RENDITION_CACHE_MB = float(os.getenv("XRAY_RENDITION_CACHE_MB", "512"))
+XRAY_RENDITIONS_ON_UPLOAD = os.getenv("XRAY_RENDITIONS_ON_UPLOAD", "true").lower() == "true"
+XRAY_RENDITION_QUALITY = 85
+
+router = APIRouter()
+
+# Decoding
+def grayscale_8bit(img):
+    """8-bit grayscale ("L") copy of a PIL image. 16-bit / 32-bit grayscale (exported radiographs) has its
+    min..max stretched to 0..255, since convert("L") would clip it to white."""
+    from PIL import Image
+    if not img.mode.startswith(("I", "F")):
+        return img.convert("L")
+    pixels = np.asarray(img, dtype=np.float32)
+    low, high = float(pixels.min()), float(pixels.max())
+    scaled = (pixels - low) * np.float32(255.0 / (high - low)) if high > low else np.zeros_like(pixels)
+    return Image.fromarray(np.round(scaled).astype(np.uint8), mode="L")
+
+def xray_image_path(sha256: str) -> str:
+    return os.path.join(XRAY_STORAGE_DIR, sha256[:2], sha256)
+
+def hash_xray_image(image_data: bytes) -> str:
+    return hashlib.sha256(image_data).hexdigest()
+
+XRAY_SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+def xray_image_sha256(image_path: Optional[str]) -> Optional[str]:
+    """Content hash of an image stored under XRAY_STORAGE_DIR (None for legacy paths)"""
+    name = os.path.basename(image_path or "")
+    return name if XRAY_SHA256_PATTERN.match(name) else None
+
+def xray_rendition_path(sha256: str, name: str) -> str:
+    return f"{xray_image_path(sha256)}.{name}.jpg"
+
+def write_xray_image(sha256: str, image_data: bytes) -> str:
+    """Write an image to its content-addressed path (atomically, once per hash)"""
+    image_path = xray_image_path(sha256)
+    if not os.path.exists(image_path):
+        os.makedirs(os.path.dirname(image_path), exist_ok=True)
+        tmp_path = f"{image_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(image_data)
+        os.replace(tmp_path, image_path)
+    return image_path
+
+def adopt_legacy_xray_images(db: Session) -> Dict[str, int]:
+    """Move analyses whose image predates content hashing (one file per upload) onto content-addressed storage,
+    so they get image URLs and renditions like new uploads. Old files are left in place; each row commits
+    on its own, so the backfill can be interrupted and rerun."""
+    totals = {"analyses": 0, "images": 0, "missing": 0}
+    legacy_ids = [
+        xray_id for xray_id, image_path in db.execute(select(XRayAnalysis.id, XRayAnalysis.image_path).order_by(XRayAnalysis.id))
+        if xray_image_sha256(image_path) is None
+    ]
+    for xray_id in legacy_ids:
+        xray = db.get(XRayAnalysis, xray_id)
+        if not xray.image_path or not os.path.exists(xray.image_path):
+            totals["missing"] += 1
+            continue
+        with open(xray.image_path, "rb") as f:
+            image_data = f.read()
+        sha256 = hash_xray_image(image_data)
+        image = db.get(XRayImage, sha256)
+        if image is None:
+            # Findings stay on the analysis row; the next identical upload is analyzed afresh
+            image = XRayImage(sha256=sha256, image_path=write_xray_image(sha256, image_data),
+                              content_type=mimetypes.guess_type(xray.image_path)[0], size_bytes=len(image_data))
+            db.add(image)
+            totals["images"] += 1
+        xray.image_path = image.image_path
+        db.commit()
+        totals["analyses"] += 1
+    return totals
+
+def load_cached_xray_analyses(hashes: List[str]) -> Dict[str, Dict]:
+    """Analyses stored for identical images, keyed by SHA-256 (one query)"""
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(XRayImage.sha256, XRayImage.analysis_result).where(
+                XRayImage.sha256.in_(set(hashes)), XRayImage.analysis_result.isnot(None)
+            )
+        ).all()
+        return {sha256: json.loads(analysis_result) for sha256, analysis_result in rows}
+    finally:
+        db.close()
+
+def load_cached_xray_analysis(sha256: str) -> Optional[Dict]:
+    """Analysis stored for an identical image, if any"""
+    return load_cached_xray_analyses([sha256]).get(sha256)
+
+def add_xray_analysis(db: Session, athlete_id: int, sha256: str, image_data: bytes,
+                      content_type: Optional[str], analysis_result: Dict) -> XRayAnalysis:
+    """Stage the image (once per content hash) and a new analysis row linked to its findings"""
+    image = db.get(XRayImage, sha256)
+    if image is None:
+        # Save image to storage (simplified - in production use proper storage like S3)
+        image = XRayImage(
+            sha256=sha256,
+            image_path=write_xray_image(sha256, image_data),
+            content_type=content_type,
+            size_bytes=len(image_data),
+            analysis_result=json.dumps(analysis_result)
+        )
+        db.add(image)
+        db.flush()
+    elif image.analysis_result is None:
+        image.analysis_result = json.dumps(analysis_result)
+    
+    findings = json.loads(image.analysis_result)
+    
+    # Save analysis to database
+    xray = XRayAnalysis(
+        athlete_id=athlete_id,
+        image_path=image.image_path,
+        has_fracture=findings["has_fracture"],
+        has_alignment_issue=findings["has_alignment_issue"],
+        joint_spacing_abnormal=findings["joint_spacing_abnormal"],
+        severity=findings["severity"],
+        triage_recommendation=findings["triage_recommendation"],
+        findings=findings["findings"],
+        educational_explanation=findings["educational_explanation"],
+        confidence_score=findings["confidence_score"]
+    )
+    db.add(xray)
+    return xray
+
+def save_xray_analyses(db: Session, athlete_id: int,
+                       items: List[Tuple[str, bytes, Optional[str], Dict]]) -> List[XRayAnalysis]:
+    """Store (sha256, image_data, content_type, analysis_result) items in one transaction"""
+    for attempt in range(2):
+        try:
+            xrays = [add_xray_analysis(db, athlete_id, *item) for item in items]
+            db.commit()
+            break
+        except IntegrityError:
+            # An identical image was stored concurrently; the retry links to its findings
+            db.rollback()
+            if attempt:
+                raise
+    for xray in xrays:
+        db.refresh(xray)
+    return xrays
+
+def save_xray_analysis(db: Session, athlete_id: int, sha256: str, image_data: bytes,
+                       content_type: Optional[str], analysis_result: Dict) -> XRayAnalysis:
+    """Store the image once per content hash and link a new analysis row to its findings"""
+    return save_xray_analyses(db, athlete_id, [(sha256, image_data, content_type, analysis_result)])[0]
+
+def xray_analysis_response(xray: XRayAnalysis) -> XRayAnalysisResponse:
+    sha256 = xray_image_sha256(xray.image_path)
+    return XRayAnalysisResponse(
+        id=xray.id,
+        athlete_id=xray.athlete_id,
+        has_fracture=xray.has_fracture,
+        has_alignment_issue=xray.has_alignment_issue,
+        joint_spacing_abnormal=xray.joint_spacing_abnormal,
+        severity=xray.severity,
+        triage_recommendation=xray.triage_recommendation,
+        findings=xray.findings,
+        educational_explanation=xray.educational_explanation,
+        confidence_score=xray.confidence_score,
+        uploaded_at=xray.uploaded_at,
+        image_url=f"/xray/images/{sha256}" if sha256 else None,
+        renditions={name: f"/xray/images/{sha256}/{name}" for name in XRAY_RENDITIONS} if sha256 else {}
+    )
+
+def store_xray_study(athlete_id: int,
+                     items: List[Tuple[str, bytes, Optional[str], Dict]]) -> List[XRayAnalysisResponse]:
+    db = SessionLocal()
+    try:
+        return [xray_analysis_response(xray) for xray in save_xray_analyses(db, athlete_id, items)]
+    finally:
+        db.close()
+
+def store_xray_result(athlete_id: int, sha256: str, image_data: bytes, content_type: Optional[str],
+                      analysis_result: Dict) -> XRayAnalysisResponse:
+    """Persist a finished analysis from a job (outside any request's DB session)"""
+    db = SessionLocal()
+    try:
+        xray = save_xray_analysis(db, athlete_id, sha256, image_data, content_type, analysis_result)
+        return xray_analysis_response(xray)
+    finally:
+        db.close()
+
+# X-ray renditions
+def render_xray_renditions(image_path: str, renditions: Dict[str, int]) -> Dict[str, int]:
+    """Write each rendition (name -> longest side) of a stored image; returns name -> file size.
+    Decodes once at the largest size needed and derives the smaller ones from it."""
+    from PIL import Image
+    sizes = {}
+    with Image.open(image_path) as img:
+        largest = max(renditions.values())
+        if img.format == "JPEG":
+            # JPEG originals decode straight at 1/2, 1/4 or 1/8 scale
+            img.draft(img.mode if img.mode in ("L", "RGB") else "RGB", (largest, largest))
+        if img.mode.startswith(("I", "F")):
+            img = grayscale_8bit(img)
+        img = img.convert("RGB" if img.mode in ("RGB", "RGBA", "P", "CMYK") else "L")
+        for name, side in sorted(renditions.items(), key=lambda item: -item[1]):
+            img.thumbnail((side, side), Image.LANCZOS, reducing_gap=3.0)
+            path = xray_rendition_path(os.path.basename(image_path), name)
+            tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+            # Progressive so slow connections show a coarse image early
+            img.save(tmp_path, format="JPEG", quality=XRAY_RENDITION_QUALITY, optimize=True, progressive=True)
+            os.replace(tmp_path, path)
+            sizes[name] = os.path.getsize(path)
+    return sizes
+
+class XRayRenditionCache:
+    """Size-bounded LRU over the rendition files on disk (originals are never evicted).
+    Recency survives restarts through the files' mtimes, which are bumped on use."""
+    
+    FILE_PATTERN = re.compile(r"^[0-9a-f]{64}\.(\w+)\.jpg$")
+    
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._files: Optional[OrderedDict] = None  # path -> size, least recently used first
+        self._lock = threading.Lock()
+        self._renders: Dict[str, asyncio.Task] = {}
+    
+    @classmethod
+    def from_settings(cls) -> "XRayRenditionCache":
+        return cls(XRAY_STORAGE_DIR, int(XRAY_RENDITION_CACHE_MB * 1024 * 1024))
+    
+    def _index(self) -> OrderedDict:
+        """Rendition files on disk, scanned on first use"""
+        if self._files is None:
+            found = []
+            for directory, _, names in os.walk(self.root):
+                for name in names:
+                    if self.FILE_PATTERN.match(name):
+                        st = os.stat(os.path.join(directory, name))
+                        found.append((st.st_mtime, os.path.join(directory, name), st.st_size))
+            self._files = OrderedDict((path, size) for _, path, size in sorted(found))
+            self.bytes = sum(self._files.values())
+        return self._files
+    
+    def lookup(self, sha256: str, name: str) -> Optional[str]:
+        """Path of the rendition if it is on disk, marked as most recently used"""
+        path = xray_rendition_path(sha256, name)
+        with self._lock:
+            files = self._index()
+            if path not in files:
+                self.misses += 1
+                return None
+            files.move_to_end(path)
+            self.hits += 1
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            # Evicted by another process sharing the storage directory
+            self._forget(path)
+            return None
+        return path
+    
+    def _forget(self, path: str):
+        with self._lock:
+            size = self._index().pop(path, None)
+            if size is not None:
+                self.bytes -= size
+    
+    def add(self, sha256: str, sizes: Dict[str, int]):
+        """Register freshly rendered files and evict the least recently used beyond max_bytes"""
+        evicted = []
+        with self._lock:
+            files = self._index()
+            for name, size in sizes.items():
+                path = xray_rendition_path(sha256, name)
+                self.bytes += size - files.pop(path, 0)
+                files[path] = size
+            while self.bytes > self.max_bytes and len(files) > len(sizes):
+                path, size = files.popitem(last=False)
+                self.bytes -= size
+                self.evictions += 1
+                evicted.append(path)
+        for path in evicted:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    async def _render(self, sha256: str) -> Dict[str, int]:
+        try:
+            image_path = xray_image_path(sha256)
+            sizes = await run_cpu_bound(render_xray_renditions, image_path, XRAY_RENDITIONS)
+            await run_in_threadpool(self.add, sha256, sizes)
+            return sizes
+        finally:
+            self._renders.pop(sha256, None)
+    
+    async def render(self, sha256: str) -> Dict[str, int]:
+        """Render every rendition of a stored image; concurrent requests for one image share the work"""
+        task = self._renders.get(sha256)
+        if task is None:
+            task = asyncio.create_task(self._render(sha256))
+            self._renders[sha256] = task
+        return await asyncio.shield(task)
+    
+    def render_in_background(self, hashes: List[str]):
+        """Pre-render after upload without holding up the response"""
+        for sha256 in set(hashes):
+            if sha256 not in self._renders:
+                task = asyncio.create_task(self.render(sha256))
+                task.add_done_callback(self._log_failure)
+    
+    @staticmethod
+    def _log_failure(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error rendering X-ray previews: {task.exception()}")
+    
+    async def get(self, sha256: str, name: str) -> str:
+        """Path of a rendition, rendering it first if it is missing or was evicted"""
+        path = await run_in_threadpool(self.lookup, sha256, name)
+        if path is None:
+            await self.render(sha256)
+            path = xray_rendition_path(sha256, name)
+        return path
+    
+    def metrics(self) -> Dict:
+        with self._lock:
+            files = len(self._files) if self._files is not None else None
+        return {
+            "files": files,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "rendering": len(self._renders),
+        }
+    
+    async def stop(self):
+        for task in list(self._renders.values()):
+            task.cancel()
+
+xray_renditions = XRayRenditionCache.from_settings()
+metrics_sources["xray_renditions"] = xray_renditions.metrics
+
+@router.on_event("shutdown")
+async def stop_xray_renditions():
+    await xray_renditions.stop()
+
+def file_response(request: Request, path: str, media_type: Optional[str], etag: str) -> Response:
+    """Serve an immutable file with a strong ETag: 304 on If-None-Match, 206 for a single byte Range"""
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable", "Accept-Ranges": "bytes"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [t.strip() for t in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    
+    size = os.path.getsize(path)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        match = re.fullmatch(r"bytes=(\d*)-(\d*)", range_header.strip())
+        if match and match.group(1):
+            start = int(match.group(1))
+            end = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+        elif match and match.group(2):
+            start, end = max(size - int(match.group(2)), 0), size - 1  # suffix range: last N bytes
+        else:
+            start, end = 0, -1  # multiple or malformed ranges are not supported
+        if start > end or start >= size:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+        with open(path, "rb") as f:
+            f.seek(start)
+            body = f.read(end - start + 1)
+        return Response(body, status_code=206, media_type=media_type,
+                        headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}"})
+    return FileResponse(path, media_type=media_type, headers=headers)
+
+def load_xray_image(sha256: str) -> XRayImage:
+    db = SessionLocal()
+    try:
+        image = db.get(XRayImage, sha256)
+    finally:
+        db.close()
+    if image is None or not os.path.exists(image.image_path):
+        raise HTTPException(status_code=404, detail="Image not found")
+    return image
+
+@router.get("/xray/images/{sha256}")
+async def get_xray_image(sha256: str, request: Request):
+    """Original stored X-ray (content-addressed, so cacheable forever); supports ETag and Range"""
+    image = await run_in_threadpool(load_xray_image, sha256)
+    return await run_in_threadpool(file_response, request, image.image_path,
+                                   image.content_type or "application/octet-stream", f'"{sha256}"')
+
+@router.get("/xray/images/{sha256}/{rendition}")
+async def get_xray_rendition(sha256: str, rendition: str, request: Request):
+    """Downscaled JPEG of a stored X-ray (see XRAY_RENDITIONS), rendered on first request if needed"""
+    if rendition not in XRAY_RENDITIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown rendition, expected one of: {', '.join(XRAY_RENDITIONS)}")
+    await run_in_threadpool(load_xray_image, sha256)
+    try:
+        path = await xray_renditions.get(sha256, rendition)
+    except OSError as e:
+        raise HTTPException(status_code=500, detail=f"Could not render image: {str(e)}")
+    # The ETag covers the size too, so changing XRAY_RENDITIONS invalidates client caches
+    etag = f'"{sha256}-{rendition}-{XRAY_RENDITIONS[rendition]}"'
+    return await run_in_threadpool(file_response, request, path, "image/jpeg", etag)
+
+@router.get("/athletes/{athlete_id}/xray-analyses", response_model=List[XRayAnalysisResponse])
+def get_athlete_xrays(athlete_id: int, db: Session = Depends(get_db)):
+    """Get all X-ray analyses for an athlete"""
+    analyses = db.query(XRayAnalysis).filter(
+        XRayAnalysis.athlete_id == athlete_id
+    ).order_by(XRayAnalysis.uploaded_at.desc()).all()
+    
+    return [xray_analysis_response(a) for a in analyses]
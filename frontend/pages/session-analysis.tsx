@@ -383,7 +383,9 @@ export default function SessionAnalysis() {
     const fetchAnalysis = async () => {
       try {
         setLoading(true)
-        const response = await axios.get(`${API_URL}/sessions/${sessionId}/analysis`)
+        const response = await axios.get(`${API_URL}/sessions/${sessionId}/analysis`, {
+          params: { max_points: 1000 },
+        })
         setAnalysis(response.data)
       } catch (err: any) {
         setError(err.response?.data?.detail || 'Failed to load session analysis')